@@ -111,6 +111,7 @@ interface EpisodeSearchResponse {
     url?: string;
     episode_number?: string;
     episode_title?: string;
+    chapters?: string[];
     error?: string;
     tried_urls?: string[];
     fallback_message?: string;
@@ -380,7 +381,7 @@ const EpisodesInformation = ({setSearchQuery, setSearchResults, setIsLoading: se
         return date.toLocaleDateString();
     };
 
-    const findEpisodePage = async (subdomain: string, episodeTitle: string, episodeNumber: string): Promise<{ url: string | null, fallbackData?: { message: string, links: Array<{ title: string, url: string }> } }> => {
+    const findEpisodePage = async (subdomain: string, episodeTitle: string, episodeNumber: string): Promise<{ url: string | null, chapters?: string[], fallbackData?: { message: string, links: Array<{ title: string, url: string }> } }> => {
         try {
             console.log(`Searching for episode page: ${episodeNumber} - "${episodeTitle}" in ${subdomain}.fandom.com`);
 
@@ -402,7 +403,7 @@ const EpisodesInformation = ({setSearchQuery, setSearchResults, setIsLoading: se
 
             if (response.ok && data.success && data.url) {
                 console.log(`Found episode page: ${data.url}`);
-                return { url: data.url };
+                return { url: data.url, chapters: data.chapters };
             } else if (response.status === 404 && data.anime_series_links) {
                 console.log(`No episode found, but got anime series links:`, data.anime_series_links);
                 console.log(`Fallback message: ${data.fallback_message}`);
@@ -480,7 +481,8 @@ const EpisodesInformation = ({setSearchQuery, setSearchResults, setIsLoading: se
 
         if (result.url) {
             setSuccessfulUrls((prev) => ({ ...prev, [episodeId]: result.url! }));
-            const chaptersData = await getEpisodeContent(result.url);
+            // The search response already carries the chapters parsed during validation
+            const chaptersData = result.chapters ?? await getEpisodeContent(result.url);
             setChapters((prev) => ({ ...prev, [episodeId]: chaptersData }));
         } else if (result.fallbackData) {
             setFallbackData((prev) => ({ ...prev, [episodeId]: result.fallbackData! }));
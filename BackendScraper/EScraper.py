@@ -1,55 +1,48 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
+import json
+import os
 import re
+import threading
 from urllib.parse import quote_plus, urlparse, unquote
 import time
-
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-
-
-def create_driver():
-    """Create a new Chrome driver instance with enhanced stability"""
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-plugins")
-    options.add_argument("--disable-images")
-    options.add_argument("--disable-javascript")  # Disable JS for faster loading
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-    # Add prefs to reduce resource usage
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.notifications": 2
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    try:
-        driver = webdriver.Chrome(options=options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        return driver
-    except Exception as e:
-        print(f"[DRIVER] ❌ Failed to create driver: {e}")
-        return None
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache import MemoryTTLCache, ResolutionCache, normalize_key
+from deadline import DeadlineExceeded, clamp, deadline, has_budget, requested_budget
+from driverPool import driver_pool, needs_js_render
+from episodeIndex import HTML_LIST_PAGES, EpisodeIndex, episode_number_from
+from fetcher import DUCKDUCKGO_SEARCH_URL, GOOGLE_SEARCH_URL, WIKI_URL_SCHEME, fetch, get_session, requests_module, wiki_url
+from hostHealth import CircuitOpenError, health_report, host_available, host_of
+from metrics import CONTENT_TYPE, TIMING_HEADER, begin_request, current_breakdown, record_http_request, record_resolution, render, timed
+from pageStore import fetch_page, page_store
+from parsing import EPISODE_PAGE_STRAINER, WIKI_HEADER_STRAINER, fetch_episode_html, make_soup
+from patterns import PatternStats
+from prober import ProbeCancelled, host_semaphore, probe_cancelled, probe_in_order
+from refresher import refresher
+from rateLimit import SEARCH_MAX_WAIT, engine_bucket
+from singleflight import SingleFlight
+from titleIndex import TITLE_CONTAINMENT_THRESHOLD, TitleIndex, containment
 
 app = Flask(__name__)
 CORS(app)
 
-# 1. Update the main search function to handle the new return format:
+WIKI_CACHE_TTL = float(os.environ.get('SCRAPER_WIKI_CACHE_TTL', 7 * 24 * 3600))
+WIKI_CACHE_NEGATIVE_TTL = float(os.environ.get('SCRAPER_WIKI_CACHE_NEGATIVE_TTL', 3600))
+WIKI_CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPER_WIKI_CACHE_MAX_ENTRIES', 5000))
+
+wiki_cache = ResolutionCache('wiki_resolution', WIKI_CACHE_TTL, WIKI_CACHE_NEGATIVE_TTL, WIKI_CACHE_MAX_ENTRIES)
+
+# Concurrent lookups of the same anime name share one discovery run
+wiki_flight = SingleFlight('wiki')
+
+# Admin endpoints are disabled unless an operator token is configured
+ADMIN_TOKEN = os.environ.get('SCRAPER_ADMIN_TOKEN', '')
+
+
+def admin_authorized():
+    return bool(ADMIN_TOKEN) and request.headers.get('X-Admin-Token', '') == ADMIN_TOKEN
+
 
 @app.route('/search-anime-wiki', methods=['POST'])
 def search_anime_wiki():
@@ -63,30 +56,155 @@ def search_anime_wiki():
         if not anime_name:
             return jsonify({"success": False, "error": "Empty anime name"}), 400
 
-        print(f"[MAIN] 🔍 Searching fandom wiki for: {anime_name}")
-
-        # Try direct method first - now returns immediately when found
-        direct_url = find_fandom_wiki_direct(anime_name)
-        if direct_url:
-            print(f"[MAIN] ✅ Found via DIRECT method: {direct_url}")
-            return jsonify({"success": True, "url": direct_url, "method": "direct"})
-
-        # Only continue to fallback if no direct URL was found
-        print("[MAIN] 🔍 Trying fallback search methods...")
-        fallback_urls = fallback_search_methods(anime_name)
-        for url in fallback_urls:
-            if validate_anime_wiki(url, anime_name):
-                print(f"[MAIN] ✅ Found via FALLBACK: {url}")
-                return jsonify({"success": True, "url": url, "method": "fallback"})
-
-        print(f"[MAIN] ❌ No valid Fandom wiki found for: {anime_name}")
-        return jsonify({"success": False, "error": "No valid Fandom wiki found"}), 404
+        payload, status = lookup_anime_wiki(anime_name)
+        return jsonify(payload), status
 
     except Exception as e:
         print(f"[MAIN] 💥 Error: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def lookup_anime_wiki(anime_name):
+    """Return (payload, status) for anime_name, running the discovery chain only on a cache miss"""
+    cache_key = normalize_key(anime_name)
+    cached = wiki_cache.get(cache_key, allow_stale=True)
+    if cached:
+        return wiki_cache_hit(anime_name, cache_key, cached)
+
+    (payload, status), shared = wiki_flight.do(
+        cache_key, lambda: resolve_and_cache_anime_wiki(anime_name, cache_key),
+        recheck=lambda: wiki_cache.get_value(cache_key)
+    )
+    record_resolution('wiki', payload.get('method'), shared)
+    if shared:
+        return {**payload, "cached": True}, status
+    return payload, status
+
+
+def resolve_and_cache_anime_wiki(anime_name, cache_key):
+    payload, status = resolve_anime_wiki(anime_name)
+    if status in (200, 404):
+        wiki_cache.set(cache_key, [payload, status], negative=status == 404)
+    return [payload, status]
+
+
+def wiki_cache_hit(anime_name, cache_key, entry):
+    """Return (payload, status) for a cached wiki entry, queueing a background refresh when it is stale"""
+    payload, status = entry['value']
+    if entry['stale']:
+        print(f"[MAIN] ♻️ Serving stale entry for: {anime_name}, refreshing in the background")
+        refresher.submit(f"wiki|{cache_key}", payload.get('url') or wiki_search_url(anime_name),
+                         lambda: refresh_anime_wiki(anime_name, cache_key, entry))
+        payload = {**payload, "stale": True}
+    else:
+        print(f"[MAIN] ⚡ Cache hit for: {anime_name}")
+    record_resolution('wiki', payload.get('method'), True)
+    return {**payload, "cached": True}, status
+
+
+def replaces_stale(found, stale_entry):
+    # A refresh that found nothing must not replace a stale positive entry; the upstream may just be down
+    return found or stale_entry['negative']
+
+
+def refresh_anime_wiki(anime_name, cache_key, stale_entry):
+    payload, status = resolve_anime_wiki(anime_name)
+    if status in (200, 404) and replaces_stale(status == 200, stale_entry):
+        wiki_cache.set(cache_key, [payload, status], negative=status == 404)
+
+
+def resolve_anime_wiki(anime_name):
+    """Run the full wiki discovery chain for anime_name and return (payload, status)"""
+    print(f"[MAIN] 🔍 Searching fandom wiki for: {anime_name}")
+
+    # Try direct method first - now returns immediately when found
+    direct_url = find_fandom_wiki_direct(anime_name)
+    if direct_url:
+        print(f"[MAIN] ✅ Found via DIRECT method: {direct_url}")
+        return {"success": True, "url": direct_url, "method": "direct"}, 200
+
+    # Only continue to fallback if no direct URL was found
+    print("[MAIN] 🔍 Trying fallback search methods...")
+    with timed('wiki_fallback'):
+        already_probed = set(direct_wiki_candidates(anime_name))
+        fallback_urls = [url for url in dict.fromkeys(fallback_search_methods(anime_name)) if url not in already_probed]
+        hit = probe_in_order(fallback_urls, lambda url: validate_anime_wiki(url, anime_name))
+    if hit:
+        print(f"[MAIN] ✅ Found via FALLBACK: {hit[1]}")
+        return {"success": True, "url": hit[1], "method": "fallback"}, 200
+
+    print(f"[MAIN] ❌ No valid Fandom wiki found for: {anime_name}")
+    return {"success": False, "error": "No valid Fandom wiki found"}, 404
+
+
+@app.route('/admin/wiki-cache/warm', methods=['POST'])
+def warm_wiki_cache():
+    """Resolve the given anime names now and store the results, replacing any cached entry"""
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+
+    data = request.get_json() or {}
+    anime_names = [name.strip() for name in data.get('anime_names', []) if name and name.strip()]
+    if not anime_names:
+        return jsonify({"success": False, "error": "Missing 'anime_names' in request"}), 400
+
+    results = {}
+    for anime_name in anime_names:
+        payload, status = resolve_anime_wiki(anime_name)
+        if status in (200, 404):
+            wiki_cache.set(normalize_key(anime_name), [payload, status], negative=status == 404)
+        results[anime_name] = payload.get('url')
+
+    return jsonify({"success": True, "warmed": results})
+
+
+@app.route('/admin/wiki-cache/invalidate', methods=['POST'])
+def invalidate_wiki_cache():
+    """Drop cached entries for the given anime names, or every entry when 'all' is set"""
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+
+    data = request.get_json() or {}
+    if data.get('all'):
+        return jsonify({"success": True, "invalidated": wiki_cache.clear()})
+
+    anime_names = data.get('anime_names', [])
+    if not anime_names:
+        return jsonify({"success": False, "error": "Missing 'anime_names' or 'all' in request"}), 400
+
+    invalidated = sum(wiki_cache.delete(normalize_key(name)) for name in anime_names)
+    return jsonify({"success": True, "invalidated": invalidated})
+
+
+EPISODE_CACHE_TTL = float(os.environ.get('SCRAPER_EPISODE_CACHE_TTL', 30 * 24 * 3600))
+EPISODE_CACHE_NEGATIVE_TTL = float(os.environ.get('SCRAPER_EPISODE_CACHE_NEGATIVE_TTL', 6 * 3600))
+EPISODE_CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPER_EPISODE_CACHE_MAX_ENTRIES', 50000))
+
+episode_cache = ResolutionCache('episode_resolution', EPISODE_CACHE_TTL, EPISODE_CACHE_NEGATIVE_TTL, EPISODE_CACHE_MAX_ENTRIES)
+episode_flight = SingleFlight('episode')
+
+
+# Chapters parsed while validating an episode page, so /get-episode-content can skip the refetch
+PARSED_PAGE_TTL = float(os.environ.get('SCRAPER_PARSED_PAGE_TTL', 600))
+parsed_page_cache = MemoryTTLCache(PARSED_PAGE_TTL, max_entries=2048)
+
+# Chapters extracted by /get-episode-content, keyed by page URL
+CONTENT_CACHE_TTL = float(os.environ.get('SCRAPER_CONTENT_CACHE_TTL', 24 * 3600))
+CONTENT_CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPER_CONTENT_CACHE_MAX_ENTRIES', 50000))
+
+content_cache = ResolutionCache('episode_content', CONTENT_CACHE_TTL, CONTENT_CACHE_TTL, CONTENT_CACHE_MAX_ENTRIES)
+
+# After an episode resolves, the next PREFETCH_EPISODES episodes of the wiki are resolved in the
+# background with the URL template that just matched, so stepping through episodes hits the cache
+PREFETCH_EPISODES = int(os.environ.get('SCRAPER_PREFETCH_EPISODES', 0))
+
+
+def episode_cache_key(subdomain, episode_title, episode_number):
+    number_match = re.search(r'\d+', str(episode_number or ''))
+    number = str(int(number_match.group())) if number_match else ''
+    return f"{subdomain.lower()}|{number}|{normalize_key(episode_title)}"
+
+
 @app.route('/search-episode-page', methods=['POST'])
 def search_episode_page():
     print("starting episode search")
@@ -106,172 +224,474 @@ def search_episode_page():
         if not episode_title and not episode_number:
             return jsonify({"success": False, "error": "Missing both episode_title and episode_number"}), 400
 
-        print(f"[EPISODE_SEARCH] 🎯 Searching for episode in {subdomain}.fandom.com")
-        print(f"[EPISODE_SEARCH] Episode: {episode_number} - '{episode_title}'")
+        with deadline(requested_budget(data)):
+            resolution, cached = lookup_episode_page(subdomain, episode_title, episode_number)
+        if cached:
+            return jsonify({**resolution['payload'], "cached": True}), resolution['status']
+        return jsonify(resolution['payload']), resolution['status']
 
-        # Method 1: Try direct URL generation
-        print("[EPISODE_SEARCH] 🔧 Trying direct URL generation...")
-        possible_urls = generate_episode_urls(subdomain, episode_title, episode_number)
-
-        for url in possible_urls:
-            print(f"[EPISODE_SEARCH] 🔗 Testing direct URL: {url}")
-            if test_episode_url(url, episode_title, episode_number):
-                print(f"[EPISODE_SEARCH] ✅ Found via DIRECT: {url}")
-                return jsonify({
-                    "success": True,
-                    "url": url,
-                    "episode_number": episode_number,
-                    "episode_title": episode_title,
-                    "method": "direct"
-                })
-            time.sleep(0.2)
+    except Exception as e:
+        print(f"[EPISODE_SEARCH] 💥 Error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def lookup_episode_page(subdomain, episode_title, episode_number, preferred_templates=None):
+    """
+    Return (resolution, cached) for an episode, running the pipeline only on a cache miss.
+    cached is also True when the resolution was shared by a concurrent identical lookup.
+    """
+    cache_key = episode_cache_key(subdomain, episode_title, episode_number)
+    cached = episode_cache.get(cache_key, allow_stale=True)
+    if cached:
+        resolution = episode_cache_hit(subdomain, episode_title, episode_number, cache_key, cached)
+        prefetch_following_episodes(subdomain, episode_number, resolution)
+        return resolution, True
+
+    prefetched = prefetched_episode(subdomain, episode_title, episode_number, cache_key)
+    if prefetched:
+        prefetch_following_episodes(subdomain, episode_number, prefetched)
+        return prefetched, True
+
+    def resolve():
+        resolution = resolve_episode_page(subdomain, episode_title, episode_number, preferred_templates)
+        if cacheable_resolution(resolution):
+            episode_cache.set(cache_key, resolution, negative=resolution['status'] != 200)
+        return resolution
+
+    # Identical lookups already in flight (here or, when shared, in another worker) are joined
+    try:
+        resolution, shared = episode_flight.do(cache_key, resolve, recheck=lambda: episode_cache.get_value(cache_key))
+    except DeadlineExceeded:
+        print(f"[EPISODE_SEARCH] ⏰ Deadline passed waiting on the in-flight lookup of {cache_key}")
+        return deadline_resolution([], [], [], [], []), False
+    record_resolution('episode', resolution['method'], shared)
+    prefetch_following_episodes(subdomain, episode_number, resolution)
+    return resolution, shared
+
+
+def episode_cache_hit(subdomain, episode_title, episode_number, cache_key, entry):
+    """Return the cached resolution, flagged stale and refreshed in the background when it has expired"""
+    resolution = entry['value']
+    if entry['stale']:
+        print(f"[EPISODE_SEARCH] ♻️ Serving stale entry for {cache_key}, refreshing in the background")
+        refresher.submit(f"episode|{cache_key}", wiki_url(subdomain),
+                         lambda: refresh_episode_page(subdomain, episode_title, episode_number, cache_key, entry))
+        resolution = {**resolution, 'payload': {**resolution['payload'], "stale": True}}
+    else:
+        print(f"[EPISODE_SEARCH] ⚡ Cache hit for {cache_key}")
+    record_resolution('episode', resolution['method'], True)
+    return resolution
+
+
+def refresh_episode_page(subdomain, episode_title, episode_number, cache_key, stale_entry):
+    resolution = resolve_episode_page(subdomain, episode_title, episode_number)
+    if cacheable_resolution(resolution) and replaces_stale(resolution['status'] == 200, stale_entry):
+        episode_cache.set(cache_key, resolution, negative=resolution['status'] != 200)
+
+
+def prefetch_following_episodes(subdomain, episode_number, resolution):
+    """
+    Queue low-priority background resolution of the PREFETCH_EPISODES episodes after a
+    successful lookup. The titles of the following episodes are not known here, so they
+    are probed through the number-based template that just matched or, when the match did
+    not come from one, looked up in the wiki's episode index.
+    """
+    number_match = re.search(r'\d+', str(episode_number or ''))
+    if not PREFETCH_EPISODES or resolution['status'] != 200 or not number_match:
+        return
+
+    template = resolution.get('template')
+    if template and '{title}' in template:
+        template = None
+    number = int(number_match.group())
+    for following in range(number + 1, number + 1 + PREFETCH_EPISODES):
+        cache_key = episode_cache_key(subdomain, '', following)
+        if episode_cache.get_value(cache_key) is None:
+            refresher.submit(f"prefetch|{cache_key}", wiki_url(subdomain),
+                             lambda following=following, cache_key=cache_key: prefetch_episode(subdomain, template, following, cache_key),
+                             low_priority=True)
+
+
+def prefetch_episode(subdomain, template, number, cache_key):
+    """Resolve episode number with a single probe, caching it under its number-only key"""
+    if episode_cache.get_value(cache_key) is not None:
+        return
+
+    if template:
+        url = f"{wiki_url(subdomain)}/wiki/" + template.format(num=number, num02=f"{number:02d}")
+        method = "direct"
+    else:
+        indexed_urls = episode_index.lookup(subdomain, '', number)
+        if not indexed_urls:
+            return
+        url = indexed_urls[0]
+        method = "fallback_search"
+
+    with host_semaphore(url):
+        page = test_episode_url(url, "", str(number))
+    if not page:
+        # Not remembered as a miss: a real lookup still runs the whole pipeline
+        print(f"[PREFETCH] ⚠️ Episode {number} is not at {url}")
+        return
+
+    resolution = with_skipped_stages(episode_resolution(page, method, template, "", str(number), []), [])
+    resolution['prefetched'] = True
+    episode_cache.set(cache_key, resolution)
+    content_cache.set(page['url'], page['chapters'])
+    print(f"[PREFETCH] ✅ Episode {number} of {subdomain}: {page['url']}")
+
+
+def prefetched_episode(subdomain, episode_title, episode_number, cache_key):
+    """
+    Return a prefetched resolution of the same episode number for a lookup that missed
+    cache_key, stored under cache_key too, or None.
+    """
+    number_key = episode_cache_key(subdomain, '', episode_number)
+    if number_key == cache_key:
+        return None
+    resolution = episode_cache.get_value(number_key)
+    if not resolution or not resolution.get('prefetched'):
+        return None
+
+    print(f"[EPISODE_SEARCH] ⚡ Prefetched hit for {cache_key}")
+    resolution = {**resolution, 'payload': {**resolution['payload'], "episode_title": episode_title, "episode_number": episode_number}, 'prefetched': False}
+    episode_cache.set(cache_key, resolution)
+    record_resolution('episode', resolution['method'], True)
+    return resolution
+
+
+def cacheable_resolution(resolution):
+    # A miss while some stages were skipped for a degraded upstream must not be remembered
+    return resolution['status'] == 200 or not resolution.get('skipped')
 
-        # Method 2: Try Google search for episode
-        print("[EPISODE_SEARCH] 🌐 Trying Google search for episode...")
-        google_urls = google_episode_search(subdomain, episode_title, episode_number)
-
-        for url in google_urls:
-            print(f"[EPISODE_SEARCH] 🔗 Testing Google result: {url}")
-            if test_episode_url(url, episode_title, episode_number):
-                print(f"[EPISODE_SEARCH] ✅ Found via GOOGLE: {url}")
-                return jsonify({
-                    "success": True,
-                    "url": url,
-                    "episode_number": episode_number,
-                    "episode_title": episode_title,
-                    "method": "google_search"
-                })
 
-        # Method 3: Try fallback search method (scraping episode lists)
+def resolve_episode_page(subdomain, episode_title, episode_number, preferred_templates=None):
+    """
+    Run the full episode search pipeline.
+
+    Returns {'payload', 'status', 'method', 'url', 'template', 'rejected', 'skipped'} where
+    template is the EPISODE_URL_TEMPLATES entry that matched (direct method only), rejected
+    lists every candidate URL that was fetched and failed validation and skipped lists the
+    stages not run because every host they depend on has an open circuit breaker or because
+    the request deadline left too little time to start them.
+    """
+    rejected = []
+    skipped = []
+    possible_urls, google_urls, search_urls = [], [], []
+
+    def resolved(page, method, template=None):
+        return with_skipped_stages(episode_resolution(page, method, template, episode_title, episode_number, rejected), skipped)
+
+    print(f"[EPISODE_SEARCH] 🎯 Searching for episode in {subdomain}.fandom.com")
+    print(f"[EPISODE_SEARCH] Episode: {episode_number} - '{episode_title}'")
+
+    if skip_stage(EPISODE_STAGES, [wiki_url(subdomain)], skipped):
+        return wiki_unavailable_resolution(subdomain, rejected, skipped)
+
+    # Method 1: Try direct URL generation
+    if out_of_time(EPISODE_STAGES, skipped):
+        return deadline_resolution(possible_urls, google_urls, search_urls, rejected, skipped)
+    with timed('direct'):
+        print("[EPISODE_SEARCH] 🔧 Trying direct URL generation...")
+        candidates = generate_episode_candidates(subdomain, episode_title, episode_number, preferred_templates)
+        possible_urls = [url for _, url in candidates]
+
+        hit = None
+        skip = 0
+
+        # On a wiki whose naming convention is known, probe that template alone first
+        lead_template = preferred_templates[0] if preferred_templates else pattern_stats.confident_template(subdomain)
+        if candidates and candidates[0][0] == lead_template:
+            print(f"[EPISODE_SEARCH] 🎯 Trying learned template first: {lead_template}")
+            page = test_episode_url(possible_urls[0], episode_title, episode_number)
+            if page:
+                hit = (0, possible_urls[0], page)
+            else:
+                rejected.append(possible_urls[0])
+                skip = 1
+
+        if not hit:
+            print(f"[EPISODE_SEARCH] 🔗 Probing {len(possible_urls) - skip} direct URLs concurrently")
+            hit = probe_in_order(possible_urls[skip:], lambda url: test_episode_url(url, episode_title, episode_number), rejected=rejected)
+            if hit:
+                hit = (hit[0] + skip, hit[1], hit[2])
+
+        template_by_url = {url: template for template, url in candidates}
+        hit_template = candidates[hit[0]][0] if hit else None
+        pattern_stats.record(subdomain, hit_template, [template_by_url[url] for url in rejected if url in template_by_url])
+
+        if hit:
+            print(f"[EPISODE_SEARCH] ✅ Found via DIRECT: {hit[1]}")
+            return resolved(hit[2], "direct", hit_template)
+
+    # Method 2: Try Google search for episode
+    if out_of_time(EPISODE_STAGES[1:], skipped):
+        return deadline_resolution(possible_urls, google_urls, search_urls, rejected, skipped)
+    with timed('google_search'):
+        print("[EPISODE_SEARCH] 🌐 Trying Google search for episode...")
+        google_urls = []
+        if not skip_stage(["google_search"], SEARCH_ENGINE_HOSTS, skipped):
+            google_urls = google_episode_search(subdomain, episode_title, episode_number)
+
+        print(f"[EPISODE_SEARCH] 🔗 Testing {len(google_urls)} Google results concurrently")
+        hit = probe_in_order(google_urls, lambda url: test_episode_url(url, episode_title, episode_number), rejected=rejected)
+        if hit:
+            print(f"[EPISODE_SEARCH] ✅ Found via GOOGLE: {hit[1]}")
+            return resolved(hit[2], "google_search")
+
+    # Method 3: Try fallback search method (scraping episode lists)
+    if out_of_time(EPISODE_STAGES[2:], skipped):
+        return deadline_resolution(possible_urls, google_urls, search_urls, rejected, skipped)
+    with timed('fallback_search'):
         print("[Episode FALLBACK] 🔍 Trying fallback search method...")
         search_urls = fallback_episode_search(subdomain, episode_title, episode_number)
 
-        for url in search_urls:
-            print(f"[EPISODE_SEARCH] 🔗 Testing search result: {url}")
-            if test_episode_url(url, episode_title, episode_number):
-                print(f"[EPISODE_SEARCH] ✅ Found via FALLBACK: {url}")
-                return jsonify({
-                    "success": True,
-                    "url": url,
-                    "episode_number": episode_number,
-                    "episode_title": episode_title,
-                    "method": "fallback_search"
-                })
+        print(f"[EPISODE_SEARCH] 🔗 Testing {len(search_urls)} search results concurrently")
+        hit = probe_in_order(search_urls, lambda url: test_episode_url(url, episode_title, episode_number), rejected=rejected)
+        if hit:
+            print(f"[EPISODE_SEARCH] ✅ Found via FALLBACK: {hit[1]}")
+            return resolved(hit[2], "fallback_search")
 
-        # Last resort: Get anime series links from navigation
+    # Last resort: Get anime series links from navigation
+    if out_of_time(EPISODE_STAGES[3:], skipped):
+        return deadline_resolution(possible_urls, google_urls, search_urls, rejected, skipped)
+    with timed('anime_series_links'):
         print(f"[EPISODE_SEARCH] 🔗 Last resort: Getting anime series links...")
         anime_links = get_anime_series_links(subdomain)
 
         if anime_links:
             print(f"[EPISODE_SEARCH] 📚 Found {len(anime_links)} anime series links as fallback")
-            return jsonify({
-                "success": False,
-                "error": "Episode not found, but anime series available",
-                "fallback_message": "Chapter scrape couldn't be done, please look for it below:",
-                "anime_series_links": anime_links,
-                "method": "anime_series_fallback"
-            }), 404
-
-        print(f"[EPISODE_SEARCH] ❌ No working episode page found")
-        return jsonify({
-            "success": False,
-            "error": "No valid episode page found",
-            "tried_direct_urls": possible_urls[:5],
-            "tried_google_urls": google_urls[:3],
-            "tried_search_urls": search_urls[:3]
-        }), 404
+            return with_skipped_stages(anime_series_resolution(anime_links, rejected), skipped)
 
-    except Exception as e:
-        print(f"[EPISODE_SEARCH] 💥 Error: {str(e)}")
-        return jsonify({"success": False, "error": str(e)}), 500
+    print(f"[EPISODE_SEARCH] ❌ No working episode page found")
+    return with_skipped_stages(episode_not_found_resolution(possible_urls, google_urls, search_urls, rejected), skipped)
 
 
-def google_episode_search(subdomain, episode_title, episode_number):
-    """Use Google search to find specific episode pages"""
+EPISODE_STAGES = ["direct", "google_search", "fallback_search", "anime_series_links"]
+SEARCH_ENGINE_HOSTS = [GOOGLE_SEARCH_URL, DUCKDUCKGO_SEARCH_URL]
+
+
+def skip_stage(stages, urls, skipped):
+    """
+    Return True, recording stages in skipped, when the circuit breaker is open for every
+    host in urls; the stages would only wait out timeouts against degraded upstreams.
+    """
+    hosts = [host_of(url) for url in urls]
+    if any(host_available(host) for host in hosts):
+        return False
+    print(f"[EPISODE_SEARCH] ⛔ Skipping {', '.join(stages)}: circuit open for {', '.join(hosts)}")
+    skipped.extend({"stage": stage, "hosts": hosts} for stage in stages)
+    return True
+
+
+def out_of_time(stages, skipped):
+    """
+    Return True, recording stages in skipped, when the request deadline leaves too little
+    budget to start the first of them.
+    """
+    if has_budget():
+        return False
+    print(f"[EPISODE_SEARCH] ⏱️ Skipping {', '.join(stages)}: request deadline reached")
+    skipped.extend({"stage": stage, "reason": "deadline"} for stage in stages)
+    return True
+
+
+def with_skipped_stages(resolution, skipped):
+    resolution['skipped'] = skipped
+    if skipped:
+        resolution['payload']['skipped_stages'] = skipped
+    return resolution
+
+
+def wiki_unavailable_resolution(subdomain, rejected, skipped):
+    payload = {
+        "success": False,
+        "error": f"{subdomain}.fandom.com is temporarily unavailable, try again shortly",
+        "skipped_stages": skipped
+    }
+    return {"payload": payload, "status": 503, "method": None, "url": None, "template": None,
+            "rejected": rejected, "skipped": skipped}
+
+
+def deadline_resolution(possible_urls, google_urls, search_urls, rejected, skipped):
+    """The not-found resolution with whatever was tried before the deadline, as a 504"""
+    resolution = with_skipped_stages(episode_not_found_resolution(possible_urls, google_urls, search_urls, rejected), skipped)
+    resolution['payload'].update({"error": "Episode search ran out of time", "deadline_exceeded": True})
+    resolution['status'] = 504
+    return resolution
+
+
+def episode_resolution(page, method, template, episode_title, episode_number, rejected):
+    url = page['url']
+    return {
+        "payload": {
+            "success": True,
+            "url": url,
+            "episode_number": episode_number,
+            "episode_title": episode_title,
+            "chapters": page['chapters'],
+            "method": method
+        },
+        "status": 200,
+        "method": method,
+        "url": url,
+        "template": template,
+        "rejected": rejected
+    }
+
+
+def anime_series_resolution(anime_links, rejected):
+    payload = {
+        "success": False,
+        "error": "Episode not found, but anime series available",
+        "fallback_message": "Chapter scrape couldn't be done, please look for it below:",
+        "anime_series_links": anime_links,
+        "method": "anime_series_fallback"
+    }
+    return {"payload": payload, "status": 404, "method": "anime_series_fallback", "url": None, "template": None, "rejected": rejected}
+
+
+def episode_not_found_resolution(possible_urls, google_urls, search_urls, rejected):
+    payload = {
+        "success": False,
+        "error": "No valid episode page found",
+        "tried_direct_urls": possible_urls[:5],
+        "tried_google_urls": google_urls[:3],
+        "tried_search_urls": search_urls[:3]
+    }
+    return {"payload": payload, "status": 404, "method": None, "url": None, "template": None, "rejected": rejected}
+
+
+BATCH_MAX_EPISODES = int(os.environ.get('SCRAPER_BATCH_MAX_EPISODES', 200))
+BATCH_WORKERS = int(os.environ.get('SCRAPER_BATCH_WORKERS', 4))
+
+
+@app.route('/batch-episode-chapters', methods=['POST'])
+def batch_episode_chapters():
+    """
+    Resolve chapters for many episodes of one wiki in a single request.
+
+    Accepts {"subdomain", "episodes": [{"episode_number", "episode_title"}, ...]} or
+    {"subdomain", "range": {"start", "end"}} and streams one NDJSON line per episode as it
+    completes. The URL template that matched first is tried first for the remaining episodes.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"success": False, "error": "Missing request data"}), 400
+
+    subdomain = str(data.get('subdomain', '')).strip()
+    if not subdomain:
+        return jsonify({"success": False, "error": "Missing subdomain"}), 400
+
+    episodes = []
+    if data.get('range'):
+        try:
+            start, end = int(data['range']['start']), int(data['range']['end'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"success": False, "error": "Invalid 'range', expected {start, end}"}), 400
+        if start > end:
+            return jsonify({"success": False, "error": "Invalid 'range', start is after end"}), 400
+        # Checked before the list is built, so a huge range is refused without allocating it
+        if end - start + 1 > BATCH_MAX_EPISODES:
+            return jsonify({"success": False, "error": f"Too many episodes (max {BATCH_MAX_EPISODES})"}), 400
+        episodes = [{"episode_number": str(number), "episode_title": ""} for number in range(start, end + 1)]
+    else:
+        for episode in data.get('episodes') or []:
+            if not isinstance(episode, dict):
+                continue
+            episode_number = str(episode.get('episode_number', '')).strip()
+            episode_title = str(episode.get('episode_title', '')).strip()
+            if episode_number or episode_title:
+                episodes.append({"episode_number": episode_number, "episode_title": episode_title})
+
+    if not episodes:
+        return jsonify({"success": False, "error": "Missing 'episodes' or 'range'"}), 400
+
+    if len(episodes) > BATCH_MAX_EPISODES:
+        return jsonify({"success": False, "error": f"Too many episodes (max {BATCH_MAX_EPISODES})"}), 400
+
+    print(f"[BATCH] 📦 Resolving {len(episodes)} episodes in {subdomain}.fandom.com")
+    return Response(stream_batch_episodes(subdomain, episodes), mimetype='application/x-ndjson')
+
+
+def stream_batch_episodes(subdomain, episodes):
+    """Yield one NDJSON line per episode, sharing the winning URL templates across the batch"""
+    learned_templates = []
+    learned_lock = threading.Lock()
+
+    def resolve(episode):
+        with learned_lock:
+            preferred = list(learned_templates)
+        try:
+            resolution, cached = lookup_episode_page(subdomain, episode['episode_title'], episode['episode_number'], preferred)
+        except Exception as e:
+            print(f"[BATCH] ❌ Episode {episode['episode_number']} failed: {e}")
+            return {**episode, "success": False, "error": str(e)}
+
+        template = resolution.get('template')
+        if template:
+            with learned_lock:
+                if template in learned_templates:
+                    learned_templates.remove(template)
+                learned_templates.insert(0, template)
+
+        payload = resolution['payload']
+        return {
+            **episode,
+            "success": payload.get('success', False),
+            "url": payload.get('url'),
+            "chapters": payload.get('chapters', []),
+            "method": payload.get('method'),
+            "cached": cached,
+            "error": payload.get('error'),
+        }
+
+    # Resolve the first episode alone so its URL template seeds every concurrent lookup
+    yield json.dumps(resolve(episodes[0])) + "\n"
+
+    executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
     try:
-        # Build multiple search queries to try
-        search_queries = []
+        futures = [executor.submit(resolve, episode) for episode in episodes[1:]]
+        for future in as_completed(futures):
+            yield json.dumps(future.result()) + "\n"
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        # Query 1: Site-specific with episode number and title
-        if episode_number and episode_title:
-            search_queries.append(f'site:{subdomain}.fandom.com "episode {episode_number}" "{episode_title}"')
-            search_queries.append(f'site:{subdomain}.fandom.com episode {episode_number} "{episode_title}"')
 
-        # Query 2: Just episode title
-        if episode_title:
-            search_queries.append(f'site:{subdomain}.fandom.com "{episode_title}"')
-            search_queries.append(f'site:{subdomain}.fandom.com {episode_title}')
-
-        # Query 3: Just episode number
-        if episode_number:
-            search_queries.append(f'site:{subdomain}.fandom.com "episode {episode_number}"')
-
-        found_urls = []
-
-        for search_query in search_queries:
-            print(f"[GOOGLE_EPISODE] 🔍 Search query: {search_query}")
-
-            # Try both Google and DuckDuckGo
-            search_engines = [
-                ("Google", f"https://www.google.com/search?q={quote_plus(search_query)}"),
-                ("DuckDuckGo", f"https://duckduckgo.com/html/?q={quote_plus(search_query)}")
-            ]
-
-            for engine_name, search_url in search_engines:
-                try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    }
-
-                    response = requests.get(search_url, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-
-                        # Look for search result links
-                        for link in soup.find_all('a', href=True):
-                            href = link['href']
-                            actual_url = None
-
-                            # Handle Google URLs
-                            if '/url?q=' in href:
-                                try:
-                                    actual_url = href.split('/url?q=')[1].split('&')[0]
-                                    actual_url = unquote(actual_url)
-                                except:
-                                    continue
-
-                            # Handle DuckDuckGo URLs
-                            elif href.startswith('http') and f"{subdomain}.fandom.com" in href:
-                                actual_url = href
-
-                            # Handle relative URLs that might be direct fandom links
-                            elif '/wiki/' in href and href.startswith('/'):
-                                actual_url = f"https://{subdomain}.fandom.com{href}"
-
-                            if actual_url and f"{subdomain}.fandom.com" in actual_url and "/wiki/" in actual_url:
-                                # Avoid episode lists/guides
-                                if not any(avoid in actual_url.lower() for avoid in ['episode_guide', 'episodes', 'list', 'category']):
-                                    if actual_url not in found_urls:
-                                        found_urls.append(actual_url)
-                                        print(f"[GOOGLE_EPISODE] 🌐 Found via {engine_name}: {actual_url}")
-
-                                        if len(found_urls) >= 8:  # Limit total results
-                                            return found_urls
-
-                                time.sleep(0.1)  # Small delay between extractions
-
-                except Exception as e:
-                    print(f"[GOOGLE_EPISODE] ⚠️ {engine_name} failed: {e}")
-                    continue
+@app.route('/admin/episode-cache/<subdomain>', methods=['DELETE'])
+def purge_episode_cache(subdomain):
+    """Drop every cached episode resolution (hits and misses) and the episode index for one wiki subdomain"""
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Forbidden"}), 403
 
-                time.sleep(0.5)  # Delay between search engines
+    purged = episode_cache.delete_prefix(f"{subdomain.strip().lower()}|")
+    episode_index.invalidate(subdomain.strip())
+    print(f"[EPISODE_SEARCH] 🧹 Purged {purged} cached episodes for {subdomain}")
+    return jsonify({"success": True, "subdomain": subdomain, "purged": purged})
 
-            if found_urls:  # If we found results, don't try more queries
-                break
 
-            time.sleep(1)  # Delay between different queries
+# Parsed result URLs per search URL, so repeated misses do not hit the search engines again
+SERP_CACHE_TTL = float(os.environ.get('SCRAPER_SERP_CACHE_TTL', 6 * 3600))
+serp_cache = MemoryTTLCache(SERP_CACHE_TTL, max_entries=4096)
+
+
+def google_episode_search(subdomain, episode_title, episode_number):
+    """
+    Use Google and DuckDuckGo search to find specific episode pages.
 
-        return found_urls
+    Every query is sent to both engines concurrently, each engine under its own rate limit.
+    Results come from the first search in priority order (most specific query first, Google
+    before DuckDuckGo) that returned any.
+    """
+    try:
+        searches = dict(
+            (search_url, engine_name)
+            for search_query in episode_search_queries(subdomain, episode_title, episode_number)
+            for engine_name, search_url in search_engine_urls(search_query)
+        )
+        hit = probe_in_order(searches, lambda url: search_result_urls(searches[url], url, subdomain))
+        if hit:
+            return hit[2][:8]  # Limit total results
 
     except Exception as e:
         print(f"[GOOGLE_EPISODE] ❌ Failed: {e}")
@@ -279,24 +699,105 @@ def google_episode_search(subdomain, episode_title, episode_number):
     return []
 
 
+def search_result_urls(engine_name, search_url, subdomain):
+    """Return the episode-page candidates a search links to, from serp_cache when possible"""
+    cached = serp_cache.get(search_url)
+    if cached is not None:
+        print(f"[GOOGLE_EPISODE] ⚡ {engine_name} results cached for: {search_url}")
+        return cached
+
+    wait = engine_bucket(engine_name).reserve(clamp(SEARCH_MAX_WAIT))
+    if wait is None:
+        print(f"[GOOGLE_EPISODE] ⏳ {engine_name} rate limit reached, skipping: {search_url}")
+        return []
+    time.sleep(wait)
+
+    print(f"[GOOGLE_EPISODE] 🔍 {engine_name} search: {search_url}")
+    with timed(f"search_{engine_name.lower()}"):
+        try:
+            response = fetch(search_url, timeout=10)
+        except Exception as e:
+            print(f"[GOOGLE_EPISODE] ⚠️ {engine_name} failed: {e}")
+            return []
+        if response.status_code != 200:
+            return []
+
+        result_urls = list(dict.fromkeys(extract_search_result_urls(response.text, subdomain)))
+    serp_cache.set(search_url, result_urls)
+    for actual_url in result_urls:
+        print(f"[GOOGLE_EPISODE] 🌐 Found via {engine_name}: {actual_url}")
+    return result_urls
+
+
+def episode_search_queries(subdomain, episode_title, episode_number):
+    """Build the search queries to try for an episode, most specific first"""
+    search_queries = []
+
+    # Query 1: Site-specific with episode number and title
+    if episode_number and episode_title:
+        search_queries.append(f'site:{subdomain}.fandom.com "episode {episode_number}" "{episode_title}"')
+        search_queries.append(f'site:{subdomain}.fandom.com episode {episode_number} "{episode_title}"')
+
+    # Query 2: Just episode title
+    if episode_title:
+        search_queries.append(f'site:{subdomain}.fandom.com "{episode_title}"')
+        search_queries.append(f'site:{subdomain}.fandom.com {episode_title}')
+
+    # Query 3: Just episode number
+    if episode_number:
+        search_queries.append(f'site:{subdomain}.fandom.com "episode {episode_number}"')
+
+    return search_queries
+
+
+def search_engine_urls(search_query):
+    return [
+        ("Google", GOOGLE_SEARCH_URL.format(query=quote_plus(search_query))),
+        ("DuckDuckGo", DUCKDUCKGO_SEARCH_URL.format(query=quote_plus(search_query)))
+    ]
+
+
+def extract_search_result_urls(html, subdomain):
+    """Return episode-page candidates on subdomain linked from a Google or DuckDuckGo results page, in page order"""
+    soup = make_soup(html)
+    result_urls = []
+
+    # Look for search result links
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        actual_url = None
+
+        # Handle Google URLs
+        if '/url?q=' in href:
+            try:
+                actual_url = href.split('/url?q=')[1].split('&')[0]
+                actual_url = unquote(actual_url)
+            except:
+                continue
+
+        # Handle DuckDuckGo URLs
+        elif href.startswith('http') and f"{subdomain}.fandom.com" in href:
+            actual_url = href
+
+        # Handle relative URLs that might be direct fandom links
+        elif '/wiki/' in href and href.startswith('/'):
+            actual_url = f"{wiki_url(subdomain)}{href}"
+
+        if actual_url and f"{subdomain}.fandom.com" in actual_url and "/wiki/" in actual_url:
+            # Avoid episode lists/guides
+            if not any(avoid in actual_url.lower() for avoid in ['episode_guide', 'episodes', 'list', 'category']):
+                result_urls.append(actual_url)
+
+    return result_urls
+
+
 def fallback_search_methods(anime_name):
     """Alternative search methods when Selenium fails"""
     print(f"[FALLBACK] 🔍 Using alternative search methods for: {anime_name}")
 
-    found_urls = []
-
     # Method 1: Try common anime wiki patterns
-    common_patterns = [
-        anime_name.lower().replace(' ', ''),
-        anime_name.lower().replace(' ', '-'),
-        ''.join(word for word in anime_name.split() if word.lower() not in ['the', 'a', 'an']).lower(),
-    ]
-
-    for pattern in common_patterns:
-        test_url = f"https://{pattern}.fandom.com"
-        if test_url_exists(test_url):
-            found_urls.append(test_url)
-            print(f"[FALLBACK] ✅ Found via pattern: {test_url}")
+    # Candidates are returned unprobed; the caller fetches and validates each one exactly once
+    found_urls = common_wiki_candidates(anime_name)
 
     # Method 2: Try requests-based search (faster than Selenium)
     try:
@@ -308,35 +809,27 @@ def fallback_search_methods(anime_name):
     return found_urls
 
 
+def common_wiki_candidates(anime_name):
+    common_patterns = [
+        anime_name.lower().replace(' ', ''),
+        anime_name.lower().replace(' ', '-'),
+        ''.join(word for word in anime_name.split() if word.lower() not in ['the', 'a', 'an']).lower(),
+    ]
+    return [wiki_url(pattern) for pattern in common_patterns if pattern]
+
+
+def wiki_search_url(anime_name):
+    # Use DuckDuckGo as it's more reliable than Google for automated requests
+    search_query = f"{anime_name} fandom wiki site:fandom.com"
+    return DUCKDUCKGO_SEARCH_URL.format(query=quote_plus(search_query))
+
+
 def requests_based_search(anime_name):
     """Use requests to search instead of Selenium for better reliability"""
     try:
-        # Use DuckDuckGo as it's more reliable than Google for automated requests
-        search_query = f"{anime_name} fandom wiki site:fandom.com"
-        search_url = f"https://duckduckgo.com/html/?q={quote_plus(search_query)}"
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(search_url, headers=headers, timeout=10)
+        response = fetch(wiki_search_url(anime_name), timeout=10)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            found_urls = []
-            # Look for fandom.com links
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if 'fandom.com' in href and href.startswith('http'):
-                    # Extract base URL
-                    parsed = urlparse(href)
-                    if parsed.netloc.endswith('.fandom.com'):
-                        base_url = f"{parsed.scheme}://{parsed.netloc}"
-                        if base_url not in found_urls:
-                            found_urls.append(base_url)
-                            print(f"[REQUESTS_SEARCH] 🌐 Found: {base_url}")
-
-            return found_urls[:5]
+            return parse_search_wiki_urls(response.text)
 
     except Exception as e:
         print(f"[REQUESTS_SEARCH] ❌ Failed: {e}")
@@ -344,266 +837,350 @@ def requests_based_search(anime_name):
     return []
 
 
+def parse_search_wiki_urls(html):
+    """Return up to five distinct fandom wiki base URLs linked from a search results page"""
+    soup = make_soup(html)
+
+    found_urls = []
+    # Look for fandom.com links
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if 'fandom.com' in href and href.startswith('http'):
+            # Extract base URL
+            parsed = urlparse(href)
+            if parsed.netloc.endswith('.fandom.com'):
+                base_url = f"{parsed.scheme}://{parsed.netloc}"
+                if base_url not in found_urls:
+                    found_urls.append(base_url)
+                    print(f"[REQUESTS_SEARCH] 🌐 Found: {base_url}")
+
+    return found_urls[:5]
+
+
+episode_index = EpisodeIndex()
+
+
+@timed('fallback_scrape')
 def fallback_episode_search(subdomain, episode_title, episode_number):
     """Fallback episode search without Selenium - scrape actual episode pages"""
-    search_urls = []
-    base_url = f"https://{subdomain}.fandom.com"
+    try:
+        # The per-wiki index answers from a dictionary once built, no list pages needed
+        indexed_urls = episode_index.lookup(subdomain, episode_title, episode_number)
+        if indexed_urls:
+            print(f"[FALLBACK_EPISODE] 📇 Found {len(indexed_urls)} URLs in episode index")
+            return indexed_urls
+    except Exception as e:
+        print(f"[FALLBACK_EPISODE] ⚠️ Episode index lookup failed: {e}")
+
+    scored_links = {}
+    base_url = wiki_url(subdomain)
 
     try:
-        # Try multiple common episode list page patterns
-        episode_pages_to_try = [
-            f"{base_url}/wiki/Episodes",
-            f"{base_url}/wiki/Episode_Guide",
-            f"{base_url}/wiki/List_of_Episodes",
-            f"{base_url}/wiki/Episode_List",
-            f"{base_url}",  # Main page
-        ]
+        # Try multiple common episode list page patterns, then the main page
+        episode_pages_to_try = [f"{base_url}{path}" for path in HTML_LIST_PAGES]
 
         for page_url in episode_pages_to_try:
+            if not has_budget():
+                print("[FALLBACK_EPISODE] ⏱️ Request deadline reached, not checking more list pages")
+                break
             try:
                 print(f"[FALLBACK_EPISODE] 📄 Checking: {page_url}")
-                response = requests.get(page_url, headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
-                }, timeout=10)
+                response = fetch_page(page_url, timeout=10)
 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                    collect_episode_links(response.text, base_url, episode_title, episode_number, scored_links)
+                    if scored_links and max(scored_links.values()) >= EXACT_LINK_SCORE:
+                        print("[FALLBACK_EPISODE] 🎯 Found a link naming the episode, skipping the other list pages")
+                        break
 
-                    # Look for episode links more specifically
-                    for link in soup.find_all('a', href=True):
-                        href = link['href']
-                        link_text = link.get_text().strip().lower()
+                time.sleep(0.5)  # Small delay between pages
 
-                        # Skip if it's clearly not an episode page
-                        if any(skip in href.lower() for skip in ['episode_guide', 'episodes', 'list_of_episodes', 'category', 'template']):
-                            continue
+            except Exception as e:
+                print(f"[FALLBACK_EPISODE] ⚠️ Error with {page_url}: {e}")
+                continue
 
-                        # Must be a wiki link
-                        if '/wiki/' not in href:
-                            continue
+    except Exception as e:
+        print(f"[FALLBACK_EPISODE] ❌ Error: {e}")
 
-                        # Build full URL
-                        full_url = f"{base_url}{href}" if href.startswith('/') else href
+    search_urls = rank_episode_links(scored_links)
+    print(f"[FALLBACK_EPISODE] 📊 Found {len(search_urls)} potential episode URLs")
+    return search_urls
 
-                        # Check if this looks like an episode page
-                        is_episode_link = False
 
-                        # Method 1: Check href for episode patterns
-                        if any(pattern in href.lower() for pattern in ['episode_', 'ep_', '/ep', 'episode-']):
-                            is_episode_link = True
+# Link scores: one naming the episode, and one that merely looks like some episode's page
+EXACT_LINK_SCORE = 1.0
+WEAK_LINK_SCORE = 0.1
 
-                        # Method 2: Check link text for episode indicators
-                        if episode_number:
-                            episode_num = str(episode_number).strip()
-                            if episode_num in link_text or f"episode {episode_num}" in link_text:
-                                is_episode_link = True
+# Candidates from the episode list pages handed to validation, best match first
+FALLBACK_MAX_CANDIDATES = int(os.environ.get('SCRAPER_FALLBACK_MAX_CANDIDATES', 6))
 
-                        # Method 3: Check for episode title match
-                        if episode_title:
-                            title_lower = episode_title.lower()
-                            # Check both exact and partial matches
-                            if title_lower in link_text or any(word in link_text for word in title_lower.split() if len(word) > 3):
-                                is_episode_link = True
 
-                        # Method 4: Check for general episode patterns in link text
-                        if any(pattern in link_text for pattern in ['episode', 'ep ', 'chapter']):
-                            # Make sure it has a number
-                            if re.search(r'\d+', link_text):
-                                is_episode_link = True
+def collect_episode_links(html, base_url, episode_title, episode_number, scored_links):
+    """
+    Score the wiki links on a fetched page as candidates for the episode into scored_links,
+    a url -> best score dict: EXACT_LINK_SCORE for a link naming the episode number, the
+    trigram similarity of the link to the episode title (see titleIndex), or WEAK_LINK_SCORE
+    for a link that only looks like an episode page. Links naming another episode number
+    are left out.
+    """
+    soup = make_soup(html)
+    number_match = re.search(r'\d+', str(episode_number or ''))
+    wanted_number = str(int(number_match.group())) if number_match else None
+    titles = TitleIndex()
+    page_links = {}
+
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        link_text = link.get_text().strip().lower()
+
+        # Skip if it's clearly not an episode page
+        if any(skip in href.lower() for skip in ['episode_guide', 'episodes', 'list_of_episodes', 'category', 'template']):
+            continue
+
+        # Must be a wiki link
+        if '/wiki/' not in href:
+            continue
+
+        # Build full URL
+        full_url = f"{base_url}{href}" if href.startswith('/') else href
+        page_title = unquote(href.split('/wiki/', 1)[1]).replace('_', ' ')
+
+        link_number = episode_number_from(link_text) or episode_number_from(page_title)
+        if wanted_number and link_number and link_number != wanted_number:
+            continue
+
+        score = 0.0
+        if wanted_number and (link_number == wanted_number or link_text == wanted_number):
+            score = EXACT_LINK_SCORE
+        elif (link_number or any(pattern in href.lower() for pattern in ['episode_', 'ep_', '/ep', 'episode-'])
+              or (any(pattern in link_text for pattern in ['episode', 'ep ', 'chapter']) and re.search(r'\d+', link_text))):
+            score = WEAK_LINK_SCORE
 
-                        if is_episode_link and full_url not in search_urls:
-                            search_urls.append(full_url)
-                            print(f"[FALLBACK_EPISODE] 🔗 Found episode link: {full_url} (text: '{link_text[:50]}')")
+        if episode_title:
+            titles.add(link_text, full_url)
+            titles.add(page_title, full_url)
+        page_links[full_url] = max(score, page_links.get(full_url, 0.0))
 
-                            if len(search_urls) >= 15:  # Limit per page
-                                break
+    if episode_title:
+        for title_score, _, url in titles.search(episode_title, FALLBACK_MAX_CANDIDATES):
+            page_links[url] = max(page_links[url], title_score)
 
-                time.sleep(0.5)  # Small delay between pages
+    for url, score in page_links.items():
+        if score > scored_links.get(url, 0.0):
+            if url not in scored_links:
+                print(f"[FALLBACK_EPISODE] 🔗 Found episode link: {url} (score {score:.2f})")
+            scored_links[url] = score
 
-            except Exception as e:
-                print(f"[FALLBACK_EPISODE] ⚠️ Error with {page_url}: {e}")
-                continue
 
-    except Exception as e:
-        print(f"[FALLBACK_EPISODE] ❌ Error: {e}")
+def rank_episode_links(scored_links):
+    """
+    Return the best FALLBACK_MAX_CANDIDATES scored links, highest first; links that only look
+    like episode pages are dropped once any link matched the episode itself.
+    """
+    ranked = sorted((item for item in scored_links.items() if item[1] > 0), key=lambda item: -item[1])
+    if ranked and ranked[0][1] > WEAK_LINK_SCORE:
+        ranked = [item for item in ranked if item[1] > WEAK_LINK_SCORE]
+    return [url for url, _ in ranked[:FALLBACK_MAX_CANDIDATES]]
 
-    # Remove duplicates and limit results
-    unique_urls = list(dict.fromkeys(search_urls))
-    print(f"[FALLBACK_EPISODE] 📊 Found {len(unique_urls)} potential episode URLs")
-    return unique_urls[:20]
 
 def get_anime_series_links(subdomain):
     """
     Extract anime series links from the navigation dropdown menu
     """
     try:
-        base_url = f"https://{subdomain}.fandom.com"
+        base_url = wiki_url(subdomain)
         print(f"[ANIME_LINKS] 📄 Scraping navigation from: {base_url}")
 
-        response = requests.get(base_url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }, timeout=10)
+        response = fetch_page(base_url, timeout=10)
 
         if response.status_code != 200:
             print(f"[ANIME_LINKS] ❌ Failed to fetch page: {response.status_code}")
             return []
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        anime_links = []
-
-        # Look for navigation dropdown with anime links
-        # Target the specific structure with nested dropdowns containing "Anime"
-        anime_sections = soup.find_all('li', class_='wds-dropdown-level-nested')
-
-        for section in anime_sections:
-            # Look for the toggle link that contains "Anime"
-            toggle_link = section.find('a', class_='wds-dropdown-level-nested__toggle')
-            if toggle_link:
-                toggle_text = toggle_link.get_text(strip=True).lower()
-                if 'anime' in toggle_text:
-                    print(f"[ANIME_LINKS] 🎯 Found anime section: {toggle_text}")
-
-                    # Find the content div with the actual anime series links
-                    content_div = section.find('div', class_='wds-dropdown-level-nested__content')
-                    if content_div:
-                        # Get all links within this section
-                        links = content_div.find_all('a', href=True)
-
-                        for link in links:
-                            href = link.get('href', '').strip()
-                            title = link.find('span')
-
-                            if title and href:
-                                title_text = title.get_text(strip=True)
-
-                                # Build full URL if it's relative
-                                if href.startswith('/'):
-                                    full_url = f"{base_url}{href}"
-                                elif href.startswith('http'):
-                                    full_url = href
-                                else:
-                                    continue
-
-                                # Skip if it's clearly not an anime series page
-                                if any(skip in href.lower() for skip in ['category:', 'template:', 'help:']):
-                                    continue
-
-                                anime_links.append({
-                                    'title': title_text,
-                                    'url': full_url
-                                })
-
-                                print(f"[ANIME_LINKS] 📚 Found: {title_text} -> {full_url}")
-
-        # If no specific anime section found, try alternative approaches
-        if not anime_links:
-            print("[ANIME_LINKS] 🔍 No anime dropdown found, trying alternative methods...")
-
-            # Look for any navigation links that might be anime series
-            all_nav_links = soup.find_all('a', href=True)
-
-            for link in all_nav_links:
-                href = link.get('href', '').strip()
-                text = link.get_text(strip=True)
-
-                # Skip empty or irrelevant links
-                if not text or len(text) < 3:
-                    continue
-
-                # Look for patterns that suggest anime series
-                if (('/wiki/' in href and
-                    not any(skip in href.lower() for skip in [
-                        'category:', 'template:', 'help:', 'episode_guide', 'episodes', 'list'
-                    ]) and
-                    any(indicator in text.lower() for indicator in [
-                        'anime', 'series', 'season', 'arc'
-                    ]))):
-
-                    # Build full URL
-                    if href.startswith('/'):
-                        full_url = f"{base_url}{href}"
-                    elif href.startswith('http'):
-                        full_url = href
-                    else:
-                        continue
+        unique_links = parse_anime_series_links(response.text, base_url)
+        print(f"[ANIME_LINKS] ✅ Found {len(unique_links)} unique anime series links")
+        return unique_links
 
-                    anime_links.append({
-                        'title': text,
-                        'url': full_url
-                    })
+    except Exception as e:
+        print(f"[ANIME_LINKS] ❌ Error: {e}")
+        return []
 
-                    print(f"[ANIME_LINKS] 📚 Alternative find: {text} -> {full_url}")
+def parse_anime_series_links(html, base_url):
+    """Extract anime series links from a fetched wiki main page's navigation"""
+    soup = make_soup(html)
+    anime_links = []
+
+    # Look for navigation dropdown with anime links
+    # Target the specific structure with nested dropdowns containing "Anime"
+    anime_sections = soup.find_all('li', class_='wds-dropdown-level-nested')
+
+    for section in anime_sections:
+        # Look for the toggle link that contains "Anime"
+        toggle_link = section.find('a', class_='wds-dropdown-level-nested__toggle')
+        if toggle_link:
+            toggle_text = toggle_link.get_text(strip=True).lower()
+            if 'anime' in toggle_text:
+                print(f"[ANIME_LINKS] 🎯 Found anime section: {toggle_text}")
+
+                # Find the content div with the actual anime series links
+                content_div = section.find('div', class_='wds-dropdown-level-nested__content')
+                if content_div:
+                    # Get all links within this section
+                    links = content_div.find_all('a', href=True)
+
+                    for link in links:
+                        href = link.get('href', '').strip()
+                        title = link.find('span')
+
+                        if title and href:
+                            title_text = title.get_text(strip=True)
+
+                            # Build full URL if it's relative
+                            if href.startswith('/'):
+                                full_url = f"{base_url}{href}"
+                            elif href.startswith('http'):
+                                full_url = href
+                            else:
+                                continue
+
+                            # Skip if it's clearly not an anime series page
+                            if any(skip in href.lower() for skip in ['category:', 'template:', 'help:']):
+                                continue
+
+                            anime_links.append({
+                                'title': title_text,
+                                'url': full_url
+                            })
+
+                            print(f"[ANIME_LINKS] 📚 Found: {title_text} -> {full_url}")
+
+    # If no specific anime section found, try alternative approaches
+    if not anime_links:
+        print("[ANIME_LINKS] 🔍 No anime dropdown found, trying alternative methods...")
+
+        # Look for any navigation links that might be anime series
+        all_nav_links = soup.find_all('a', href=True)
+
+        for link in all_nav_links:
+            href = link.get('href', '').strip()
+            text = link.get_text(strip=True)
+
+            # Skip empty or irrelevant links
+            if not text or len(text) < 3:
+                continue
 
-                    # Limit alternative results
-                    if len(anime_links) >= 10:
-                        break
+            # Look for patterns that suggest anime series
+            if (('/wiki/' in href and
+                not any(skip in href.lower() for skip in [
+                    'category:', 'template:', 'help:', 'episode_guide', 'episodes', 'list'
+                ]) and
+                any(indicator in text.lower() for indicator in [
+                    'anime', 'series', 'season', 'arc'
+                ]))):
+
+                # Build full URL
+                if href.startswith('/'):
+                    full_url = f"{base_url}{href}"
+                elif href.startswith('http'):
+                    full_url = href
+                else:
+                    continue
 
-        # Remove duplicates based on URL
-        unique_links = []
-        seen_urls = set()
+                anime_links.append({
+                    'title': text,
+                    'url': full_url
+                })
 
-        for link in anime_links:
-            if link['url'] not in seen_urls:
-                seen_urls.add(link['url'])
-                unique_links.append(link)
+                print(f"[ANIME_LINKS] 📚 Alternative find: {text} -> {full_url}")
 
-        print(f"[ANIME_LINKS] ✅ Found {len(unique_links)} unique anime series links")
-        return unique_links
+                # Limit alternative results
+                if len(anime_links) >= 10:
+                    break
 
-    except Exception as e:
-        print(f"[ANIME_LINKS] ❌ Error: {e}")
-        return []
+    # Remove duplicates based on URL
+    unique_links = []
+    seen_urls = set()
+
+    for link in anime_links:
+        if link['url'] not in seen_urls:
+            seen_urls.add(link['url'])
+            unique_links.append(link)
+
+    return unique_links
+
+
+# Episode page naming conventions in default probe order. {num} is the episode number,
+# {num02} the zero-padded number and {title} the URL-cleaned episode title.
+EPISODE_URL_TEMPLATES = [
+    "Episode_{num}",
+    "Episode{num}",
+    "Episode_{num02}",
+    "Ep_{num}",
+    "Ep{num}",
+    "E{num}",
+    "{num}",
+    "Episode_{num}_(Season_1)",
+    "{title}",
+    "{title}_(episode)",
+    "{title}_(Episode)",
+    "Episode_{num}:_{title}",
+    "Episode_{num}_-_{title}",
+    "{num}._{title}",
+    "{num}_-_{title}",
+    "{num}:_{title}",
+]
+
+
+pattern_stats = PatternStats()
+
+
+@timed('direct_url_generation')
+def generate_episode_candidates(subdomain, episode_title, episode_number, preferred_templates=None):
+    """
+    Return (template, url) pairs for every template the episode has fields for.
 
-def generate_episode_urls(subdomain, episode_title, episode_number):
-    base_url = f"https://{subdomain}.fandom.com/wiki/"
-    urls = []
+    Templates are ordered by their historical hit rate on this wiki (see PatternStats), and
+    templates listed in preferred_templates are moved to the front, in that order.
+    """
+    base_url = f"{wiki_url(subdomain)}/wiki/"
+    fields = {}
 
-    if episode_number:
-        number_match = re.search(r'\d+', str(episode_number))
-        if number_match:
-            num = number_match.group()
-            num_int = int(num)
-            urls.extend([
-                f"{base_url}Episode_{num}",
-                f"{base_url}Episode{num}",
-                f"{base_url}Episode_{num_int:02d}",
-                f"{base_url}Ep_{num}",
-                f"{base_url}Ep{num}",
-                f"{base_url}E{num}",
-                f"{base_url}{num}",
-                f"{base_url}Episode_{num}_(Season_1)",
-            ])
+    number_match = re.search(r'\d+', str(episode_number or ''))
+    if number_match:
+        fields['num'] = number_match.group()
+        fields['num02'] = f"{int(number_match.group()):02d}"
 
     if episode_title:
-        clean_title = clean_for_url(episode_title)
-        urls.extend([
-            f"{base_url}{clean_title}",
-            f"{base_url}{clean_title}_(episode)",
-            f"{base_url}{clean_title}_(Episode)",
-        ])
+        fields['title'] = clean_for_url(episode_title)
 
-        if episode_number:
-            urls.extend([
-                f"{base_url}Episode_{num}:_{clean_title}",
-                f"{base_url}Episode_{num}_-_{clean_title}",
-            ])
+    templates = pattern_stats.ranked(subdomain, EPISODE_URL_TEMPLATES)
+    if preferred_templates:
+        preferred = [template for template in dict.fromkeys(preferred_templates) if template in templates]
+        templates = preferred + [template for template in templates if template not in preferred]
+
+    candidates = []
+    seen = set()
+    for template in templates:
+        try:
+            url = base_url + template.format(**fields)
+        except KeyError:
+            continue
+        if url not in seen:
+            seen.add(url)
+            candidates.append((template, url))
+
+    return candidates
 
-    if episode_number and episode_title:
-        urls.extend([
-            f"{base_url}{num}._{clean_title}",
-            f"{base_url}{num}_-_{clean_title}",
-            f"{base_url}{num}:_{clean_title}",
-        ])
 
-    # Deduplicate
-    unique_urls = list(dict.fromkeys(urls))
-    print(f"[GENERATE_URLS] 📋 Generated {len(unique_urls)} potential URLs")
-    return unique_urls
+def generate_episode_urls(subdomain, episode_title, episode_number, preferred_templates=None):
+    candidates = generate_episode_candidates(subdomain, episode_title, episode_number, preferred_templates)
+    print(f"[GENERATE_URLS] 📋 Generated {len(candidates)} potential URLs")
+    return [url for _, url in candidates]
 
 
 def url_exists(url):
     try:
-        response = requests.head(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
+        response = fetch(url, method='HEAD', timeout=5)
         return response.status_code == 200
     except Exception:
         return False
@@ -630,76 +1207,99 @@ def clean_for_url(text):
     return cleaned
 
 
+@timed('probe')
 def test_episode_url(url, episode_title="", episode_number=""):
     """
-    Test if a Fandom episode URL is valid, matches the expected episode, AND contains chapter information
+    Test if a Fandom episode URL is valid, matches the expected episode, AND contains chapter information.
+
+    Returns {'url', 'chapters'} for a valid page, or None. The parsed chapters are also kept
+    in parsed_page_cache for a short while so a follow-up /get-episode-content is free.
     """
     try:
-        response = requests.get(url, timeout=8, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
-        })
+        response, html = fetch_episode_html(url, timeout=8)
 
         if response.status_code != 200:
-            return False
-
-        soup = BeautifulSoup(response.text, 'html.parser')
+            return None
 
-        # Get page content for analysis
-        title_text = soup.title.get_text().lower() if soup.title else ''
-        heading_text = soup.find('h1').get_text().lower() if soup.find('h1') else ''
+        result, matched = evaluate_episode_page(url, html, episode_title, episode_number)
+        # Only a page that is the episode but lacks its infobox is worth rendering
+        if matched and result is None and needs_js_render(html) and not probe_cancelled():
+            rendered = driver_pool.render_page(url)
+            if rendered:
+                result, _ = evaluate_episode_page(url, rendered, episode_title, episode_number)
+        return result
 
-        # Reject common non-episode pages
-        rejection_keywords = [
-            'episode guide', 'episode list', 'episodes', 'list of episodes',
-            'disambiguation', 'search results', 'category:', 'season'
-        ]
+    except ProbeCancelled:
+        return None
+    except Exception as e:
+        print(f"[TEST_URL] ❌ Error testing {url}: {e}")
+        return None
 
-        if any(keyword in title_text or keyword in heading_text for keyword in rejection_keywords):
-            print(f"[TEST_URL] ❌ Rejected - appears to be a guide/list page: {url}")
-            return False
 
-        # Look for episode-specific indicators
-        episode_indicators = []
+@timed('parse_episode_page')
+def evaluate_episode_page(url, html, episode_title="", episode_number=""):
+    """
+    Validate an already-fetched episode page. Returns (result, matched): result as in
+    test_episode_url, matched True when the page is the episode, whether or not it has chapters.
+    """
+    soup = make_soup(html, EPISODE_PAGE_STRAINER)
 
-        if episode_number:
-            num = int(re.search(r'\d+', str(episode_number)).group())
-            episode_indicators.extend([
-                f"episode {num}",
-                f"episode_{num}",
-                f"ep {num}",
-                f"ep_{num}"
-            ])
+    # Get page content for analysis
+    title_text = soup.title.get_text().lower() if soup.title else ''
+    heading_text = soup.find('h1').get_text().lower() if soup.find('h1') else ''
 
-        if episode_title:
-            clean_title = episode_title.lower()
-            clean_title = re.sub(r'^(vs\.?\s*|episode\s*\d*:?\s*)', '', clean_title).strip()
-            title_parts = [part.strip() for part in re.split(r'[:/\-"\']', clean_title) if part.strip() and len(part.strip()) > 2]
-            episode_indicators.extend(title_parts)
-
-        # Check if any episode indicators are found
-        found_match = False
-        for indicator in episode_indicators:
-            if indicator in title_text or indicator in heading_text or indicator in url.lower():
-                found_match = True
-                print(f"[TEST_URL] ✅ Found match for '{indicator}' in: {url}")
-                break
+    # Reject common non-episode pages
+    rejection_keywords = [
+        'episode guide', 'episode list', 'episodes', 'list of episodes',
+        'disambiguation', 'search results', 'category:', 'season'
+    ]
 
-        if not found_match:
-            print(f"[TEST_URL] ❌ No episode match found in: {url}")
-            return False
+    if any(keyword in title_text or keyword in heading_text for keyword in rejection_keywords):
+        print(f"[TEST_URL] ❌ Rejected - appears to be a guide/list page: {url}")
+        return None, False
 
-        # NEW: Check if the page contains chapter information
-        chapters = extract_chapter_info(soup)
-        if not chapters:
-            print(f"[TEST_URL] ❌ No chapter information found in: {url}")
-            return False
+    # Look for episode-specific indicators
+    episode_indicators = []
 
-        print(f"[TEST_URL] ✅ Found {len(chapters)} chapters in: {url}")
-        return True
+    if episode_number:
+        num = int(re.search(r'\d+', str(episode_number)).group())
+        episode_indicators.extend([
+            f"episode {num}",
+            f"episode_{num}",
+            f"ep {num}",
+            f"ep_{num}"
+        ])
 
-    except Exception as e:
-        print(f"[TEST_URL] ❌ Error testing {url}: {e}")
-        return False
+    # Check if any episode indicators are found
+    found_match = False
+    for indicator in episode_indicators:
+        if indicator in title_text or indicator in heading_text or indicator in url.lower():
+            found_match = True
+            print(f"[TEST_URL] ✅ Found match for '{indicator}' in: {url}")
+            break
+
+    # Otherwise the page has to mention (nearly) the whole title, not just one of its words
+    if not found_match and episode_title:
+        clean_title = episode_title.lower()
+        clean_title = re.sub(r'^(vs\.?\s*|episode\s*\d*:?\s*)', '', clean_title).strip()
+        score = containment(clean_title, f"{title_text} {heading_text} {unquote(url)}")
+        if score >= TITLE_CONTAINMENT_THRESHOLD:
+            found_match = True
+            print(f"[TEST_URL] ✅ Found title match for '{clean_title}' ({score:.2f}) in: {url}")
+
+    if not found_match:
+        print(f"[TEST_URL] ❌ No episode match found in: {url}")
+        return None, False
+
+    # NEW: Check if the page contains chapter information
+    chapters = extract_chapter_info(soup)
+    if not chapters:
+        print(f"[TEST_URL] ❌ No chapter information found in: {url}")
+        return None, True
+
+    print(f"[TEST_URL] ✅ Found {len(chapters)} chapters in: {url}")
+    parsed_page_cache.set(url, chapters)
+    return {"url": url, "chapters": chapters}, True
 
 @app.route('/get-episode-content', methods=['POST'])
 def get_episode_content():
@@ -714,55 +1314,12 @@ def get_episode_content():
             print("[CONTENT] ❌ No JSON data received")
             return jsonify({"success": False, "error": "No data received"}), 400
 
-        if not url or not url.startswith('https://'):
+        if not url or not url.startswith(('https://', f"{WIKI_URL_SCHEME}://")):
             print(f"[CONTENT] ❌ Invalid URL: {url}")
             return jsonify({"success": False, "error": "Invalid or missing URL"}), 400
 
-        print(f"[CONTENT] 📄 Fetching content from: {url}")
-
-        # Add retry logic with shorter timeouts
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, timeout=5, headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                })
-
-                if response.status_code == 200:
-                    break
-                elif attempt == max_retries - 1:
-                    print(f"[CONTENT] ❌ Failed after {max_retries} attempts with status: {response.status_code}")
-                    return jsonify({"success": False, "error": f"Failed with status code {response.status_code}"}), 500
-                else:
-                    print(f"[CONTENT] ⚠️ Attempt {attempt + 1} failed with status {response.status_code}, retrying...")
-                    time.sleep(0.5)
-
-            except requests.exceptions.Timeout:
-                if attempt == max_retries - 1:
-                    print("[CONTENT] ❌ Request timed out after retries")
-                    return jsonify({"success": False, "error": "Request timed out"}), 504
-                else:
-                    print(f"[CONTENT] ⚠️ Timeout on attempt {attempt + 1}, retrying...")
-                    time.sleep(0.5)
-            except requests.exceptions.RequestException as e:
-                print(f"[CONTENT] ❌ Request error: {str(e)}")
-                return jsonify({"success": False, "error": f"Request failed: {str(e)}"}), 500
-
-        # Parse and extract relevant content
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Try to extract chapters or relevant information
-        chapters = extract_chapter_info(soup)
-
-        if not chapters:
-            print("[CONTENT] ⚠️ No chapters found on page")
-
-        print(f"[CONTENT] ✅ Successfully extracted {len(chapters)} chapters")
-        return jsonify({
-            "success": True,
-            "url": url,
-            "chapters": chapters
-        })
+        payload, status = lookup_episode_content(url)
+        return jsonify(payload), status
 
     except Exception as e:
         print(f"[CONTENT] 💥 Unexpected error: {str(e)}")
@@ -771,6 +1328,83 @@ def get_episode_content():
         return jsonify({"success": False, "error": f"Internal server error: {str(e)}"}), 500
 
 
+def lookup_episode_content(url):
+    """Return (payload, status) for the chapters of an episode page, fetching it only on a cache miss"""
+    chapters = parsed_page_cache.get(url)
+    if chapters is not None:
+        print(f"[CONTENT] ⚡ Serving {len(chapters)} chapters parsed during validation: {url}")
+        return {"success": True, "url": url, "chapters": chapters, "cached": True}, 200
+
+    cached = content_cache.get(url, allow_stale=True)
+    if cached:
+        return content_cache_hit(url, cached), 200
+
+    print(f"[CONTENT] 📄 Fetching content from: {url}")
+
+    # Short timeout with one retry; the retry/backoff policy lives in fetcher.fetch
+    exceptions = requests_module().exceptions
+    max_retries = 2
+    try:
+        response, html = fetch_episode_html(url, timeout=5, retries=max_retries - 1)
+    except CircuitOpenError as e:
+        print(f"[CONTENT] ⛔ {e}")
+        return {"success": False, "error": str(e)}, 503
+    except exceptions.Timeout:
+        print("[CONTENT] ❌ Request timed out after retries")
+        return {"success": False, "error": "Request timed out"}, 504
+    except exceptions.RequestException as e:
+        print(f"[CONTENT] ❌ Request error: {str(e)}")
+        return {"success": False, "error": f"Request failed: {str(e)}"}, 500
+
+    if response.status_code != 200:
+        print(f"[CONTENT] ❌ Failed after {max_retries} attempts with status: {response.status_code}")
+        return {"success": False, "error": f"Failed with status code {response.status_code}"}, 500
+
+    # Parse and extract relevant content
+    chapters = extract_page_chapters(url, html)
+
+    if chapters:
+        content_cache.set(url, chapters)
+    else:
+        print("[CONTENT] ⚠️ No chapters found on page")
+
+    print(f"[CONTENT] ✅ Successfully extracted {len(chapters)} chapters")
+    return {"success": True, "url": url, "chapters": chapters}, 200
+
+
+def content_cache_hit(url, entry):
+    """Return the payload for cached chapters, queueing a background refresh when they are stale"""
+    payload = {"success": True, "url": url, "chapters": entry['value'], "cached": True}
+    if entry['stale']:
+        print(f"[CONTENT] ♻️ Serving stale chapters for {url}, refreshing in the background")
+        refresher.submit(f"content|{url}", url, lambda: refresh_episode_content(url))
+        payload["stale"] = True
+    else:
+        print(f"[CONTENT] ⚡ Serving {len(entry['value'])} cached chapters: {url}")
+    return payload
+
+
+def refresh_episode_content(url):
+    response, html = fetch_episode_html(url, timeout=5, retries=1)
+    if response.status_code != 200:
+        print(f"[REFRESH] ⚠️ {url} returned {response.status_code}, keeping stale chapters")
+        return
+    chapters = extract_page_chapters(url, html)
+    if chapters:
+        content_cache.set(url, chapters)
+
+
+def extract_page_chapters(url, html):
+    """Chapters on a fetched episode page, rendering it in a browser when the infobox is filled in client-side"""
+    chapters = extract_chapter_info(make_soup(html, EPISODE_PAGE_STRAINER))
+    if not chapters and needs_js_render(html):
+        rendered = driver_pool.render_page(url)
+        if rendered:
+            chapters = extract_chapter_info(make_soup(rendered, EPISODE_PAGE_STRAINER))
+    return chapters
+
+
+@timed('extract_chapters')
 def extract_chapter_info(soup):
     try:
         data_blocks = soup.find_all("div", class_=lambda c: c and "pi-item" in c and "pi-data" in c)
@@ -814,31 +1448,28 @@ def extract_chapter_info(soup):
         return []
 
 
+@timed('wiki_direct')
 def find_fandom_wiki_direct(anime_name):
-    """Try to find anime wiki by constructing likely URLs - returns immediately when valid URL found"""
+    """Try to find anime wiki by constructing likely URLs - probes every variation concurrently, first-ranked valid URL wins"""
     print(f"[DIRECT] 🎯 Trying direct URL construction for: {anime_name}")
 
     # Create multiple variations of the anime name
-    variations = create_url_variations(anime_name)
-
-    for variation in variations:
-        # Test the main fandom URL pattern
-        test_url = f"https://{variation}.fandom.com"
-        print(f"[DIRECT] 🔗 Testing: {test_url}")
-
-        if test_url_exists(test_url):
-            print(f"[DIRECT] ✅ FOUND: {test_url}")
-            # Immediately test validation
-            if validate_anime_wiki(test_url, anime_name):
-                print(f"[DIRECT] ✅ VALIDATED: {test_url}")
-                return test_url  # Return immediately when both exist and validate
-            else:
-                print(f"[DIRECT] ❌ Failed validation: {test_url}")
+    candidate_urls = direct_wiki_candidates(anime_name)
+    print(f"[DIRECT] 🔗 Probing {len(candidate_urls)} candidate wikis concurrently")
+
+    hit = probe_in_order(candidate_urls, lambda url: validate_anime_wiki(url, anime_name))
+    if hit:
+        print(f"[DIRECT] ✅ VALIDATED: {hit[1]}")
+        return hit[1]
 
     print("[DIRECT] ❌ No valid direct URLs found")
     return None  # Return None if no valid URL found
 
 
+def direct_wiki_candidates(anime_name):
+    return [wiki_url(variation) for variation in create_url_variations(anime_name)]
+
+
 def create_url_variations(anime_name):
     """Create URL variations with better handling for complex titles"""
     variations = []
@@ -887,48 +1518,42 @@ def create_url_variations(anime_name):
     return unique_variations
 
 
-def test_url_exists(url):
-    """Test if a fandom URL exists and redirects properly"""
-    try:
-        response = requests.get(url, timeout=8, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }, allow_redirects=True)
-
-        if response.status_code == 200 and 'fandom.com' in response.url:
-            return True
-        return False
-
-    except Exception:
-        return False
-
+@timed('wiki_probe')
 def validate_anime_wiki(url, anime_title):
-    """Simplified validation by checking for Fandom wiki page structure"""
+    """
+    Check that url exists, still lands on fandom.com after redirects, and has the Fandom wiki
+    page structure - all from a single fetch of the final redirected response
+    """
     try:
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        })
+        response = fetch_page(url, timeout=8, allow_redirects=True)
 
-        if response.status_code != 200:
+        if response.status_code != 200 or 'fandom.com' not in response.url:
             return False
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Check for the specific Fandom wiki page header structure
-        page_header = soup.find('div', class_='page-header__title-wrapper')
-        if page_header:
-            title_element = page_header.find('h1', class_='page-header__title')
-            if title_element:
-                print(f"[VALIDATE] ✅ Found valid Fandom wiki structure for: {url}")
-                return True
-
-        print(f"[VALIDATE] ❌ No valid Fandom wiki structure found for: {url}")
-        return False
+        return has_wiki_structure(url, response.text)
 
     except Exception as e:
         print(f"[VALIDATE] ❌ Error validating {url}: {e}")
         return False
 
 
+@timed('parse_wiki_page')
+def has_wiki_structure(url, html):
+    """Check fetched HTML for the Fandom wiki page header structure"""
+    soup = make_soup(html, WIKI_HEADER_STRAINER)
+
+    # Check for the specific Fandom wiki page header structure
+    page_header = soup.find('div', class_='page-header__title-wrapper')
+    if page_header:
+        title_element = page_header.find('h1', class_='page-header__title')
+        if title_element:
+            print(f"[VALIDATE] ✅ Found valid Fandom wiki structure for: {url}")
+            return True
+
+    print(f"[VALIDATE] ❌ No valid Fandom wiki structure found for: {url}")
+    return False
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -938,12 +1563,69 @@ def health_check():
             '/search-anime-wiki': 'Find anime fandom wiki',
             '/search-episode-page': 'Find specific episode page within a wiki',
             '/get-episode-content': 'Get content from episode page'
-        }
+        },
+        'driver_pool': driver_pool.stats() if driver_pool.enabled else None,
+        'upstreams': health_report(),
+        'page_store': page_store.stats(),
+        'refresher': refresher.stats()
     })
 
+# Heavy modules the first lookup needs. They are not imported at startup so /health answers
+# as soon as the server is listening, then loaded in the background before traffic needs them
+PRELOAD_ENABLED = os.environ.get('SCRAPER_PRELOAD', '1') == '1'
+_preload_started = threading.Event()
+
+
+def preload_modules():
+    started = time.perf_counter()
+    try:
+        get_session()
+        make_soup('<title></title>', EPISODE_PAGE_STRAINER)
+        print(f"[STARTUP] 📦 Preloaded scraping modules in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"[STARTUP] ⚠️ Preload failed: {e}")
+
+
+def start_preload():
+    if PRELOAD_ENABLED and not _preload_started.is_set():
+        _preload_started.set()
+        threading.Thread(target=preload_modules, name='preload', daemon=True).start()
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(render(), mimetype=CONTENT_TYPE)
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    begin_request(bool(request.headers.get(TIMING_HEADER)))
+
+
+@app.after_request
+def finish_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    record_http_request(route, response.status_code, time.perf_counter() - g.get('request_started', time.perf_counter()))
+
+    # With the debug header set, JSON responses carry where the time went
+    breakdown = current_breakdown()
+    if breakdown is not None and response.is_json:
+        payload = response.get_json()
+        if isinstance(payload, dict):
+            response.set_data(json.dumps({**payload, 'timings': breakdown.as_dict()}))
+    return response
+
+
+@app.before_request
+def preload_on_first_request():
+    # Covers WSGI servers, where the module is imported (and possibly forked) before serving
+    start_preload()
+
+
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 8181))
+    start_preload()
     app.run(host='0.0.0.0', port=port, debug=False)
 else:
     application = app
\ No newline at end of file
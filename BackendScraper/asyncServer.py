@@ -0,0 +1,231 @@
+"""
+Asyncio (ASGI) serving mode for the scraper API.
+
+Serves /search-anime-wiki, /search-episode-page, /get-episode-content and /health with the
+same JSON contract as the Flask routes in EScraper. Requests are read, validated and answered
+on the event loop, and each lookup runs the same code as the Flask mode (caches, coalescing,
+probing, fetching and the per-host limits in hostHealth) on a bounded pool of request threads,
+so slow clients and queued requests do not each hold a thread.
+
+    pip install -r requirements-async.txt
+    uvicorn asyncServer:app --host 0.0.0.0 --port 8181
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+import EScraper as scraper
+from deadline import deadline, requested_budget
+from driverPool import driver_pool
+from fetcher import WIKI_URL_SCHEME
+from hostHealth import health_report
+from metrics import CONTENT_TYPE, TIMING_HEADER, begin_request, current_breakdown, record_http_request, render
+from pageStore import page_store
+from refresher import refresher
+
+
+# Lookups that may run at once; further requests wait on the event loop for a free thread
+ASYNC_WORKERS = int(os.environ.get('SCRAPER_ASYNC_WORKERS', 256))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix='request')
+    return _executor
+
+
+async def run_sync(fn, *args):
+    """Run fn(*args) on a request thread in a copy of the caller's context, like asyncio.to_thread"""
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+async def search_anime_wiki(data):
+    if not data or 'anime_name' not in data:
+        return {"success": False, "error": "Missing 'anime_name' in request"}, 400
+
+    anime_name = data['anime_name'].strip()
+    if not anime_name:
+        return {"success": False, "error": "Empty anime name"}, 400
+
+    return await run_sync(scraper.lookup_anime_wiki, anime_name)
+
+
+async def search_episode_page(data):
+    if not data:
+        return {"success": False, "error": "Missing request data"}, 400
+
+    subdomain = data.get('subdomain', '').strip()
+    episode_title = data.get('episode_title', '').strip()
+    episode_number = data.get('episode_number', '').strip()
+
+    if not subdomain:
+        return {"success": False, "error": "Missing subdomain"}, 400
+
+    if not episode_title and not episode_number:
+        return {"success": False, "error": "Missing both episode_title and episode_number"}, 400
+
+    with deadline(requested_budget(data)):
+        resolution, cached = await run_sync(scraper.lookup_episode_page, subdomain, episode_title, episode_number)
+    if cached:
+        return {**resolution['payload'], "cached": True}, resolution['status']
+    return resolution['payload'], resolution['status']
+
+
+async def get_episode_content(data):
+    if not data:
+        print("[CONTENT] ❌ No JSON data received")
+        return {"success": False, "error": "No data received"}, 400
+
+    url = data.get('url')
+    if not url or not url.startswith(('https://', f"{WIKI_URL_SCHEME}://")):
+        print(f"[CONTENT] ❌ Invalid URL: {url}")
+        return {"success": False, "error": "Invalid or missing URL"}, 400
+
+    return await run_sync(scraper.lookup_episode_content, url)
+
+
+async def health_check(data):
+    return {
+        'status': 'healthy',
+        'message': 'Anime Wiki Finder API is running',
+        'mode': 'asyncio',
+        'endpoints': {
+            '/search-anime-wiki': 'Find anime fandom wiki',
+            '/search-episode-page': 'Find specific episode page within a wiki',
+            '/get-episode-content': 'Get content from episode page'
+        },
+        'driver_pool': driver_pool.stats() if driver_pool.enabled else None,
+        'upstreams': health_report(),
+        'page_store': page_store.stats(),
+        'refresher': refresher.stats()
+    }, 200
+
+
+ROUTES = {
+    ('POST', '/search-anime-wiki'): (search_anime_wiki, '[MAIN]'),
+    ('POST', '/search-episode-page'): (search_episode_page, '[EPISODE_SEARCH]'),
+    ('POST', '/get-episode-content'): (get_episode_content, '[CONTENT]'),
+    ('GET', '/health'): (health_check, '[HEALTH]'),
+}
+
+
+async def read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def send_json(send, payload, status):
+    await send_body(send, json.dumps(payload).encode('utf-8'), status, 'application/json')
+
+
+async def send_body(send, body, status, content_type):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode()),
+                    (b'access-control-allow-origin', b'*')]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def close_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if scraper.PRELOAD_ENABLED:
+                # Not awaited: the server starts answering /health while this runs
+                asyncio.get_running_loop().run_in_executor(None, scraper.preload_modules)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.to_thread(close_executor)
+            await asyncio.to_thread(driver_pool.close)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    if method == 'OPTIONS':
+        # CORS preflight, answered like flask-cors does for the Flask app
+        request_headers = dict(scope['headers'])
+        allow_headers = request_headers.get(b'access-control-request-headers', b'')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'access-control-allow-origin', b'*'),
+                        (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+                        (b'access-control-allow-headers', allow_headers),
+                        (b'content-length', b'0')]
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if (method, path) == ('GET', '/metrics'):
+        return await send_body(send, render().encode('utf-8'), 200, CONTENT_TYPE)
+
+    started = time.perf_counter()
+    route = ROUTES.get((method, path))
+    if route is None:
+        status = 405 if any(route_path == path for _, route_path in ROUTES) else 404
+        record_http_request('unmatched', status, time.perf_counter() - started)
+        return await send_json(send, {"success": False, "error": "Not found" if status == 404 else "Method not allowed"}, status)
+
+    # Each ASGI request runs in its own task, so the breakdown only sees this request's work
+    begin_request(bool(dict(scope['headers']).get(TIMING_HEADER.lower().encode())))
+    handler, tag = route
+    try:
+        data = await read_json(receive) if method == 'POST' else None
+        payload, status = await handler(data)
+    except Exception as e:
+        print(f"{tag} 💥 Error: {str(e)}")
+        print(f"{tag} 💥 Traceback: {traceback.format_exc()}")
+        payload, status = {"success": False, "error": str(e)}, 500
+
+    record_http_request(path, status, time.perf_counter() - started)
+    breakdown = current_breakdown()
+    if breakdown is not None and isinstance(payload, dict):
+        payload = {**payload, 'timings': breakdown.as_dict()}
+    await send_json(send, payload, status)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 8181))
+    uvicorn.run(app, host='0.0.0.0', port=port)
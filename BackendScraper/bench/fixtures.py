@@ -0,0 +1,96 @@
+"""
+Synthetic fandom-style pages used by the benchmarks and the stub server.
+
+The pages mimic the structure the scraper depends on (page header, portable infobox,
+global navigation, episode lists, search result links) and are padded with navigation
+and article text to roughly the size of real fandom pages.
+"""
+import random
+
+
+def _navigation(subdomain, links=400):
+    items = ''.join(
+        f'<li class="wds-dropdown-level-nested"><a href="/wiki/Page_{i}" class="wds-dropdown-level-nested__toggle">'
+        f'<span>Navigation entry {i}</span></a></li>'
+        for i in range(links)
+    )
+    anime = ''.join(
+        f'<a href="/wiki/Season_{season}"><span>Season {season}</span></a>' for season in range(1, 5)
+    )
+    return (
+        f'<nav class="fandom-community-header__local-navigation"><ul class="wds-tabs">'
+        f'<li class="wds-dropdown-level-nested"><a class="wds-dropdown-level-nested__toggle" href="/wiki/Anime">'
+        f'<span>Anime</span></a><div class="wds-dropdown-level-nested__content">{anime}</div></li>'
+        f'{items}</ul></nav>'
+    )
+
+
+def _head(title, scripts=60):
+    assets = ''.join(
+        f'<link rel="stylesheet" href="https://static.wikia.nocookie.net/style_{i}.css">'
+        f'<script>window.RLQ=window.RLQ||[];RLQ.push(["module_{i}",{{"a":{i},"b":"{"x" * 200}"}}]);</script>'
+        for i in range(scripts)
+    )
+    return f'<head><meta charset="utf-8"><title>{title}</title>{assets}</head>'
+
+
+def _article_text(seed, paragraphs=120):
+    rng = random.Random(seed)
+    words = ['volleyball', 'spike', 'serve', 'receive', 'match', 'team', 'coach', 'court', 'rally', 'block']
+    return ''.join(
+        '<p>' + ' '.join(rng.choice(words) for _ in range(80)) + f' <a href="/wiki/Term_{i}">term {i}</a></p>'
+        for i in range(paragraphs)
+    )
+
+
+def wiki_root(subdomain, name):
+    title = f'{name} Wiki | Fandom'
+    return (
+        f'<!DOCTYPE html><html>{_head(title)}<body>{_navigation(subdomain)}'
+        f'<div class="page-header__title-wrapper"><h1 class="page-header__title">{name} Wiki</h1></div>'
+        f'<main>{_article_text(subdomain)}</main></body></html>'
+    )
+
+
+def episode_page(subdomain, name, number, episode_title, chapters):
+    title = f'{episode_title} | {name} Wiki | Fandom'
+    chapter_links = ', '.join(f'<a href="/wiki/Chapter_{c}">Chapter {c}</a>' for c in chapters)
+    infobox = (
+        f'<aside class="portable-infobox pi-background pi-theme-wikia pi-layout-default">'
+        f'<h2 class="pi-item pi-item-spacing pi-title">{episode_title}</h2>'
+        f'<div class="pi-item pi-data pi-item-spacing pi-border-color" data-source="episode">'
+        f'<h3 class="pi-data-label pi-secondary-font">Episode</h3><div class="pi-data-value pi-font">{number}</div></div>'
+        f'<div class="pi-item pi-data pi-item-spacing pi-border-color" data-source="airdate">'
+        f'<h3 class="pi-data-label pi-secondary-font">Air date</h3><div class="pi-data-value pi-font">April 6, 2014</div></div>'
+        f'<div class="pi-item pi-data pi-item-spacing pi-border-color" data-source="chapters">'
+        f'<h3 class="pi-data-label pi-secondary-font">Manga Chapters</h3>'
+        f'<div class="pi-data-value pi-font">{chapter_links}</div></div>'
+        f'</aside>'
+    )
+    return (
+        f'<!DOCTYPE html><html>{_head(title)}<body>{_navigation(subdomain)}'
+        f'<div class="page-header__title-wrapper"><h1 class="page-header__title">{episode_title}</h1></div>'
+        f'<main class="page__main"><div class="mw-parser-output">{infobox}'
+        f'{_article_text(f"{subdomain}:{number}")}</div></main></body></html>'
+    )
+
+
+def episode_list(subdomain, name, episodes):
+    rows = ''.join(
+        f'<tr><td>{number}</td><td><a href="/wiki/{episode_title.replace(" ", "_")}">{episode_title}</a></td></tr>'
+        for number, episode_title in episodes
+    )
+    title = f'Episodes | {name} Wiki | Fandom'
+    return (
+        f'<!DOCTYPE html><html>{_head(title)}<body>{_navigation(subdomain)}'
+        f'<div class="page-header__title-wrapper"><h1 class="page-header__title">Episodes</h1></div>'
+        f'<main><table class="wikitable">{rows}</table></main></body></html>'
+    )
+
+
+def serp(urls, engine='Google'):
+    if engine == 'Google':
+        results = ''.join(f'<div class="g"><a href="/url?q={url}&sa=U&ved=0">{url}</a></div>' for url in urls)
+    else:
+        results = ''.join(f'<div class="result"><a class="result__a" href="{url}">{url}</a></div>' for url in urls)
+    return f'<!DOCTYPE html><html><head><title>Search</title></head><body>{results}</body></html>'
@@ -0,0 +1,221 @@
+"""
+Load test comparing the Flask serving mode with the asyncio (ASGI) one.
+
+Starts bench/stub_server.py in its own process with injected latency, then for each mode starts the API as a
+subprocess pointed at the stub (fresh cache directory, so every lookup is a cold miss) and
+fires `--requests` distinct /search-episode-page lookups with `--concurrency` in flight.
+Reports throughput, latency percentiles, the outbound requests the stub served and the
+peak thread count and RSS of the server process.
+
+Two workloads are run: "direct" lookups (title and number) resolve from the generated
+URLs, "search" lookups (number only) miss every generated URL and fall through to the
+search engine stage with its delays - the slow path that ties up a Flask worker.
+
+    python bench/load_test.py [--requests 200] [--concurrency 100] [--latency-ms 400]
+
+The per-host probe limit is raised (--per-host) so both modes are bound by how they serve
+requests rather than by the politeness limit towards a single stubbed wiki.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_server  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'flask': [sys.executable, 'EScraper.py'],
+    'asyncio': [sys.executable, '-m', 'uvicorn', 'asyncServer:app', '--host', '127.0.0.1', '--log-level', 'warning'],
+}
+
+
+def start_stub(port, latency_ms, jitter_ms, *options):
+    """Start stub_server.py; options are passed through as extra command-line arguments"""
+    command = [sys.executable, os.path.join(BACKEND_DIR, 'bench', 'stub_server.py'), '--port', str(port),
+               '--latency-ms', str(latency_ms), '--jitter-ms', str(jitter_ms), *options]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_up(f'http://127.0.0.1:{port}/__stats', process, 'stub')
+    return process
+
+
+def wait_until_up(url, process, name):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1, proxies={'http': None}).ok:
+                return
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{name} did not start: {url}')
+
+
+def stub_outbound(port, reset=False):
+    return stub_totals(port, reset)['requests']
+
+
+def stub_totals(port, reset=False):
+    """Requests, bytes, 304s and injected failures the stub served, summed over hosts"""
+    response = requests.get(f'http://127.0.0.1:{port}/{"__reset" if reset else "__stats"}', proxies={'http': None})
+    totals = {'requests': 0, 'bytes': 0, 'not_modified': 0, 'failed': 0}
+    for counter in response.json().values():
+        for key in totals:
+            totals[key] += counter.get(key, 0)
+    return totals
+
+
+def start_api(mode, port, stub_port, cache_dir, per_host, extra_env=None):
+    env = {
+        **os.environ,
+        'PORT': str(port),
+        'SCRAPER_CACHE_DIR': cache_dir,
+        'SCRAPER_WIKI_URL': 'http://{subdomain}.fandom.com',
+        'SCRAPER_GOOGLE_URL': 'http://www.google.com/search?q={query}',
+        'SCRAPER_DUCKDUCKGO_URL': 'http://duckduckgo.com/html/?q={query}',
+        'SCRAPER_PROBE_PER_HOST': str(per_host),
+        'HTTP_PROXY': f'http://127.0.0.1:{stub_port}',
+        'http_proxy': f'http://127.0.0.1:{stub_port}',
+        'NO_PROXY': '',
+        'no_proxy': '',
+        **(extra_env or {}),
+    }
+    command = MODES[mode] + (['--port', str(port)] if mode == 'asyncio' else [])
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_up(f'http://127.0.0.1:{port}/health', process, f'{mode} server')
+    return process
+
+
+class ProcessSampler(threading.Thread):
+    """Track the peak thread count and RSS of a process from /proc while a workload runs"""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.path = f'/proc/{pid}/status'
+        self.threads = 0
+        self.rss_kb = 0
+        self.running = True
+
+    def run(self):
+        while self.running and os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    for line in f:
+                        if line.startswith('Threads:'):
+                            self.threads = max(self.threads, int(line.split()[1]))
+                        elif line.startswith('VmRSS:'):
+                            self.rss_kb = max(self.rss_kb, int(line.split()[1]))
+            except OSError:
+                break
+            time.sleep(0.05)
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+
+def lookup_body(workload, number):
+    if workload == 'search':
+        return {'subdomain': 'haikyuu', 'episode_number': str(number)}
+    return {'subdomain': 'haikyuu', 'episode_title': stub_server.episode_title(number), 'episode_number': str(number)}
+
+
+def run_load(port, workload, episodes, concurrency):
+    session = requests.Session()
+    session.trust_env = False
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def lookup(number):
+        started = time.perf_counter()
+        try:
+            response = session.post(f'http://127.0.0.1:{port}/search-episode-page', timeout=120,
+                                    json=lookup_body(workload, number))
+            expected = [str(chapter) for chapter in stub_server.episode_chapters(number)]
+            ok = response.status_code == 200 and response.json().get('chapters') == expected
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors.append(number)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lookup, episodes))
+    wall = time.perf_counter() - started
+    return wall, sorted(latencies), errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=400)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--per-host', type=int, default=512)
+    parser.add_argument('--modes', default='flask,asyncio')
+    parser.add_argument('--workloads', default='direct,search')
+    parser.add_argument('--stub-port', type=int, default=8765)
+    parser.add_argument('--port', type=int, default=8190)
+    args = parser.parse_args()
+
+    workloads = args.workloads.split(',')
+    if len(workloads) * args.requests + 1 > stub_server.EPISODES_PER_WIKI:
+        parser.error(f'the stub wiki has {stub_server.EPISODES_PER_WIKI} episodes')
+
+    stub = start_stub(args.stub_port, args.latency_ms, args.jitter_ms)
+
+    print(f"{args.requests} cold lookups per workload, {args.concurrency} in flight, "
+          f"{args.latency_ms:.0f}ms stub latency\n")
+    print(f"{'mode':<10}{'workload':<10}{'wall s':>8}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+          f"{'errors':>8}{'outbound':>10}{'threads':>9}{'rss MB':>8}")
+
+    for offset, mode in enumerate(args.modes.split(',')):
+        cache_dir = tempfile.mkdtemp(prefix=f'scraper-{mode}-')
+        port = args.port + offset
+        process = start_api(mode, port, args.stub_port, cache_dir, args.per_host)
+        try:
+            # One lookup first so both modes start from the same learned URL template
+            run_load(port, 'direct', [len(workloads) * args.requests + 1], 1)
+
+            for index, workload in enumerate(workloads):
+                episodes = range(index * args.requests + 1, (index + 1) * args.requests + 1)
+                stub_outbound(args.stub_port, reset=True)
+                sampler = ProcessSampler(process.pid)
+                sampler.start()
+                wall, latencies, errors = run_load(port, workload, episodes, args.concurrency)
+                sampler.stop()
+
+                outbound = stub_outbound(args.stub_port)
+                print(f"{mode:<10}{workload:<10}{wall:>8.2f}{len(latencies) / wall:>8.1f}"
+                      f"{percentile(latencies, 0.5):>8.2f}{percentile(latencies, 0.95):>8.2f}"
+                      f"{percentile(latencies, 0.99):>8.2f}{len(errors):>8}{outbound:>10}"
+                      f"{sampler.threads:>9}{sampler.rss_kb / 1024:>8.0f}")
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of the HTML parser backends used for episode pages.
+
+Compares every installed BeautifulSoup backend, with and without the episode-page
+strainer, on a corpus of saved fandom pages and checks that each combination extracts
+exactly the same title, heading and chapters as the original html.parser full parse.
+
+    python bench/parser_bench.py [--corpus DIR] [--iterations N]
+
+Without --corpus a synthetic corpus from bench/fixtures.py is used.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures  # noqa: E402
+from parsing import EPISODE_PAGE_STRAINER, available_parsers, make_soup  # noqa: E402
+from EScraper import extract_chapter_info  # noqa: E402
+
+
+def load_corpus(directory):
+    pages = {}
+    if directory:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.html', '.htm')):
+                with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                    pages[name] = f.read()
+    else:
+        for number in range(1, 6):
+            pages[f'synthetic_{number}.html'] = fixtures.episode_page(
+                'haikyuu', 'Haikyuu!!', number, f'Synthetic Episode {number}', [number * 2, number * 2 + 1]
+            )
+    return pages
+
+
+def extract(html, parser, strainer):
+    soup = make_soup(html, strainer, parser=parser)
+    with contextlib.redirect_stdout(io.StringIO()):
+        chapters = extract_chapter_info(soup)
+    title = soup.title.get_text() if soup.title else ''
+    heading = soup.find('h1').get_text() if soup.find('h1') else ''
+    return title, heading, chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='directory of saved fandom episode pages (*.html)')
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit(f"No .html pages found in {args.corpus}")
+    total_kb = sum(len(html.encode('utf-8')) for html in pages.values()) / 1024
+    print(f"Corpus: {len(pages)} pages, {total_kb:.0f} KiB")
+
+    expected = {name: extract(html, 'html.parser', None) for name, html in pages.items()}
+
+    rows = []
+    for backend in available_parsers():
+        for mode, strainer in (('full', None), ('strained', EPISODE_PAGE_STRAINER)):
+            if backend == 'html5lib' and strainer is not None:
+                continue  # html5lib ignores parse_only
+            samples = []
+            identical = True
+            for _ in range(args.iterations):
+                for name, html in pages.items():
+                    started = time.perf_counter()
+                    result = extract(html, backend, strainer)
+                    samples.append(time.perf_counter() - started)
+                    identical = identical and result == expected[name]
+            rows.append((backend, mode, statistics.median(samples) * 1000, identical))
+
+    baseline = next(ms for backend, mode, ms, _ in rows if backend == 'html.parser' and mode == 'full')
+    print(f"{'backend':<14}{'mode':<10}{'ms/page':>10}{'speedup':>10}  identical")
+    for backend, mode, ms, identical in rows:
+        print(f"{backend:<14}{mode:<10}{ms:>10.2f}{baseline / ms:>9.2f}x  {'yes' if identical else 'NO'}")
+
+if __name__ == '__main__':
+    main()
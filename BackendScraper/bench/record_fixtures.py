@@ -0,0 +1,63 @@
+"""
+Record live fandom / search engine responses for the stub server to replay.
+
+Each URL is fetched once and its body saved under --out in the layout
+stub_server.py --replay-dir reads (one file per host and path), so a benchmark can run
+against real page markup without touching the network:
+
+    python bench/record_fixtures.py --out bench/recorded \\
+        https://haikyuu.fandom.com/ https://haikyuu.fandom.com/wiki/Episode_1
+
+URLs can also be listed one per line in a file passed with --urls. Recorded pages are
+replayed for the http:// form of the same URL the scraper requests through the stub.
+"""
+import argparse
+import os
+import sys
+from urllib.parse import urlsplit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import USER_AGENT  # noqa: E402
+from stub_server import fixture_path  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', nargs='*')
+    parser.add_argument('--urls', dest='url_file', help='file with one URL per line')
+    parser.add_argument('--out', required=True, help='directory to write the recorded responses to')
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.url_file:
+        with open(args.url_file) as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not urls:
+        parser.error('no URLs to record')
+
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    for url in urls:
+        try:
+            response = session.get(url, timeout=15)
+        except requests.RequestException as e:
+            print(f"[RECORD] ❌ {url}: {e}")
+            continue
+        if response.status_code != 200:
+            print(f"[RECORD] ⚠️ {url} returned {response.status_code}, not recorded")
+            continue
+
+        parts = urlsplit(url)
+        path = fixture_path(args.out, parts.hostname, parts.path, parts.query)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"[RECORD] ✅ {url} -> {path} ({len(response.content)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark of the three lookup endpoints against the local stub.
+
+Starts bench/stub_server.py (synthetic wikis, or pages recorded with record_fixtures.py via
+--replay-dir, with optional latency and failure injection), then for each serving mode
+starts the API on a fresh cache directory and runs every scenario at each concurrency
+level. For each run it reports throughput, p50/p95/p99 latency, answers that did not match
+the stub, outbound requests the stub served (and how many were 304s) and the server's
+peak RSS.
+
+Scenarios, each run on keys no earlier run has used:
+
+    wiki-miss       /search-anime-wiki for an existing wiki, found by the direct probe
+    wiki-worst      /search-anime-wiki for a show with no wiki: every stage runs and fails
+    wiki-hit        the wiki-miss names again, answered from the cache
+    episode-miss    /search-episode-page with title and number, found by the direct probe
+    episode-search  /search-episode-page with the number only, found through the search engines
+    episode-worst   an episode the wiki does not have: every stage runs and fails
+    episode-hit     the episode-miss lookups again
+    content-miss    /get-episode-content for pages not fetched before
+    content-hit     the content-miss pages again
+
+    python bench/run_bench.py [--modes flask,asyncio] [--concurrency 1,16,64] [--requests 40]
+                              [--latency-ms 150] [--error-rate 0.05] [--json bench.json]
+
+As in load_test.py, the per-host probe limit and the search engine rate limit are raised so
+the numbers measure the scraper rather than its politeness limits; --env KEY=VALUE passes
+any other setting to the API under test.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test  # noqa: E402
+import stub_server  # noqa: E402
+
+SCENARIOS = ['wiki-miss', 'wiki-hit', 'wiki-worst', 'episode-miss', 'episode-hit', 'episode-search',
+             'episode-worst', 'content-miss', 'content-hit']
+
+# Hit scenarios replay the keys of the miss scenario run just before them
+HIT_OF = {'wiki-hit': 'wiki-miss', 'episode-hit': 'episode-miss', 'content-hit': 'content-miss'}
+
+BENCH_ENV = {
+    'SCRAPER_SEARCH_RATE': '1000',
+    'SCRAPER_SEARCH_BURST': '1000',
+}
+
+
+def expected_chapters(number):
+    return [str(chapter) for chapter in stub_server.episode_chapters(number)]
+
+
+def episode_url(number):
+    return f"http://haikyuu.fandom.com/wiki/{stub_server.episode_title(number).replace(' ', '_')}"
+
+
+def scenario_request(scenario, key):
+    """Return (path, body, check) for one request; check(status, payload) tells whether the answer is right"""
+    scenario = HIT_OF.get(scenario, scenario)
+    if scenario == 'wiki-miss':
+        subdomain = stub_server.show_subdomain(key)
+        return '/search-anime-wiki', {'anime_name': stub_server.show_name(key)}, \
+            lambda status, payload: status == 200 and f'{subdomain}.fandom.com' in (payload.get('url') or '')
+    if scenario == 'wiki-worst':
+        return '/search-anime-wiki', {'anime_name': f'Missing Show {key}'}, \
+            lambda status, payload: status == 404
+    if scenario == 'episode-miss':
+        return '/search-episode-page', load_test.lookup_body('direct', key), \
+            lambda status, payload: status == 200 and payload.get('chapters') == expected_chapters(key)
+    if scenario == 'episode-search':
+        return '/search-episode-page', load_test.lookup_body('search', key), \
+            lambda status, payload: status == 200 and payload.get('chapters') == expected_chapters(key)
+    if scenario == 'episode-worst':
+        return '/search-episode-page', load_test.lookup_body('direct', key), \
+            lambda status, payload: status == 404
+    if scenario == 'content-miss':
+        return '/get-episode-content', {'url': episode_url(key)}, \
+            lambda status, payload: status == 200 and payload.get('chapters') == expected_chapters(key)
+    raise ValueError(scenario)
+
+
+class KeyAllocator:
+    """
+    Hands out keys no earlier run has used, per key space. Content pages are taken from the
+    top of the episode range so the pages lookups probed on the way (and left in the page
+    store) are not among them.
+    """
+
+    def __init__(self, episodes):
+        self.next = {'show': 1, 'missing': 1, 'episode': 1, 'absent': episodes + 1}
+        self.content = episodes
+
+    def take(self, scenario, count):
+        if scenario == 'content-miss':
+            self.content -= count
+            return list(range(self.content + 1, self.content + count + 1))
+        space = {'wiki-miss': 'show', 'wiki-worst': 'missing', 'episode-worst': 'absent'}.get(scenario, 'episode')
+        start = self.next[space]
+        self.next[space] += count
+        return list(range(start, start + count))
+
+
+def run_scenario(port, scenario, keys, concurrency):
+    session = requests.Session()
+    session.trust_env = False
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def call(key):
+        path, body, check = scenario_request(scenario, key)
+        started = time.perf_counter()
+        try:
+            response = session.post(f'http://127.0.0.1:{port}{path}', json=body, timeout=180)
+            ok = check(response.status_code, response.json())
+        except (requests.RequestException, ValueError):
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors.append(key)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, keys))
+    return time.perf_counter() - started, sorted(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='flask,asyncio')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', default='1,16,64', help='comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=40, help='requests per scenario and concurrency level')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    parser.add_argument('--stall-ms', type=float, default=15000)
+    parser.add_argument('--fail-hosts', default='')
+    parser.add_argument('--replay-dir')
+    parser.add_argument('--per-host', type=int, default=64)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--stub-port', type=int, default=8765)
+    parser.add_argument('--port', type=int, default=8190)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f'unknown scenario {scenario}')
+        if scenario in HIT_OF and HIT_OF[scenario] not in scenarios[:scenarios.index(scenario)]:
+            parser.error(f'{scenario} needs {HIT_OF[scenario]} to run before it')
+    levels = [int(level) for level in args.concurrency.split(',')]
+    extra_env = {**BENCH_ENV, **dict(setting.split('=', 1) for setting in args.env)}
+
+    # Enough synthetic shows and episodes that no run ever repeats a key
+    runs = len(levels) * args.requests
+    episodes = max(stub_server.EPISODES_PER_WIKI, runs * len(scenarios))
+    stub = load_test.start_stub(
+        args.stub_port, args.latency_ms, args.jitter_ms, '--shows', str(runs), '--episodes', str(episodes),
+        '--error-rate', str(args.error_rate), '--stall-rate', str(args.stall_rate), '--stall-ms', str(args.stall_ms),
+        '--fail-hosts', args.fail_hosts, *(['--replay-dir', args.replay_dir] if args.replay_dir else []))
+
+    results = []
+    print(f"{args.requests} requests per run, {args.latency_ms:.0f}ms stub latency, "
+          f"{args.error_rate:.0%} injected errors, {args.stall_rate:.0%} stalls\n")
+    print(f"{'mode':<9}{'scenario':<16}{'conc':>5}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+          f"{'errors':>8}{'outbound':>10}{'304s':>6}{'rss MB':>8}")
+
+    try:
+        for offset, mode in enumerate(args.modes.split(',')):
+            cache_dir = tempfile.mkdtemp(prefix=f'scraper-bench-{mode}-')
+            port = args.port + offset
+            process = load_test.start_api(mode, port, args.stub_port, cache_dir, args.per_host, extra_env)
+            keys = KeyAllocator(episodes)
+            last_keys = {}
+            try:
+                for concurrency in levels:
+                    for scenario in scenarios:
+                        if scenario in HIT_OF:
+                            scenario_keys = last_keys[HIT_OF[scenario]]
+                        else:
+                            scenario_keys = last_keys[scenario] = keys.take(scenario, args.requests)
+
+                        load_test.stub_totals(args.stub_port, reset=True)
+                        sampler = load_test.ProcessSampler(process.pid)
+                        sampler.start()
+                        wall, latencies, errors = run_scenario(port, scenario, scenario_keys, concurrency)
+                        sampler.stop()
+                        outbound = load_test.stub_totals(args.stub_port)
+
+                        result = {
+                            'mode': mode,
+                            'scenario': scenario,
+                            'concurrency': concurrency,
+                            'requests': len(latencies),
+                            'throughput': len(latencies) / wall,
+                            'p50_s': load_test.percentile(latencies, 0.5),
+                            'p95_s': load_test.percentile(latencies, 0.95),
+                            'p99_s': load_test.percentile(latencies, 0.99),
+                            'errors': len(errors),
+                            'outbound_requests': outbound['requests'],
+                            'outbound_bytes': outbound['bytes'],
+                            'outbound_not_modified': outbound['not_modified'],
+                            'peak_rss_mb': sampler.rss_kb / 1024,
+                        }
+                        results.append(result)
+                        print(f"{mode:<9}{scenario:<16}{concurrency:>5}{result['throughput']:>8.1f}"
+                              f"{result['p50_s']:>8.2f}{result['p95_s']:>8.2f}{result['p99_s']:>8.2f}"
+                              f"{len(errors):>8}{outbound['requests']:>10}{outbound['not_modified']:>6}"
+                              f"{result['peak_rss_mb']:>8.0f}")
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+    finally:
+        stub.terminate()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
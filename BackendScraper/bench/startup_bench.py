@@ -0,0 +1,159 @@
+"""
+Cold-start benchmark for both serving modes.
+
+For each module it reports the `python -X importtime` breakdown of the heaviest imports.
+For each mode it starts the server --runs times and reports time to the first /health
+response and, after that, the latency of the first episode lookup against the stub fandom
+(which now pays for whatever was not loaded at startup, unless the preload got there first).
+
+    python bench/startup_bench.py [--runs 5] [--top 12] [--json startup.json]
+
+--json writes the numbers to a file so they can be compared across releases.
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test  # noqa: E402
+
+BACKEND_DIR = load_test.BACKEND_DIR
+MODULES = {'flask': 'EScraper', 'asyncio': 'asyncServer'}
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_breakdown(module, cache_dir):
+    """Return (total_ms, [(name, cumulative_ms)]) for the direct imports of module"""
+    env = {**os.environ, 'SCRAPER_CACHE_DIR': cache_dir}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = (len(match.group(3)) - 1) // 2
+        # Children are printed before their parent, so keep only those listed right before module
+        if depth == 0:
+            if match.group(4) == module:
+                total = cumulative_ms
+                break
+            children = []
+        elif depth == 1:
+            children.append((match.group(4), cumulative_ms))
+    else:
+        children = []
+    return total, sorted(children, key=lambda entry: entry[1], reverse=True)
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def cold_start(mode, port, stub_port, episode):
+    """Start one server; return (seconds to first /health 200, seconds for the first lookup)"""
+    cache_dir = tempfile.mkdtemp(prefix=f'startup-{mode}-')
+    env = {
+        **os.environ,
+        'PORT': str(port),
+        'SCRAPER_CACHE_DIR': cache_dir,
+        'SCRAPER_WIKI_URL': 'http://{subdomain}.fandom.com',
+        'HTTP_PROXY': f'http://127.0.0.1:{stub_port}',
+        'http_proxy': f'http://127.0.0.1:{stub_port}',
+        'NO_PROXY': '',
+        'no_proxy': '',
+    }
+    command = load_test.MODES[mode] + (['--port', str(port)] if mode == 'asyncio' else [])
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + 30
+        while True:
+            try:
+                if request(port, 'GET', '/health') == 200:
+                    break
+            except OSError:
+                pass
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f'{mode} server did not answer /health')
+            time.sleep(0.005)
+        first_health = time.perf_counter() - started
+
+        lookup_started = time.perf_counter()
+        request(port, 'POST', '/search-episode-page', load_test.lookup_body('direct', episode))
+        first_lookup = time.perf_counter() - lookup_started
+        return first_health, first_lookup
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--modes', default='flask,asyncio')
+    parser.add_argument('--stub-port', type=int, default=8766)
+    parser.add_argument('--port', type=int, default=8195)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'imports': {}, 'cold_start': {}}
+    scratch = tempfile.mkdtemp(prefix='startup-imports-')
+    try:
+        for mode in args.modes.split(','):
+            module = MODULES[mode]
+            total, entries = import_breakdown(module, scratch)
+            results['imports'][module] = {'total_ms': total, 'modules': dict(entries[:args.top])}
+            print(f"import {module}: {total:.0f} ms")
+            for name, cumulative_ms in entries[:args.top]:
+                print(f"    {name:<24}{cumulative_ms:>8.1f} ms")
+            print()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    stub = load_test.start_stub(args.stub_port, 0, 0)
+    try:
+        print(f"{'mode':<10}{'runs':>6}{'health p50 ms':>15}{'health min ms':>15}{'lookup p50 ms':>15}")
+        for offset, mode in enumerate(args.modes.split(',')):
+            samples = [cold_start(mode, args.port + offset, args.stub_port, run + 1) for run in range(args.runs)]
+            health = [sample[0] * 1000 for sample in samples]
+            lookup = [sample[1] * 1000 for sample in samples]
+            results['cold_start'][mode] = {
+                'health_p50_ms': statistics.median(health),
+                'health_min_ms': min(health),
+                'first_lookup_p50_ms': statistics.median(lookup),
+            }
+            print(f"{mode:<10}{args.runs:>6}{statistics.median(health):>15.0f}{min(health):>15.0f}"
+                  f"{statistics.median(lookup):>15.0f}")
+    finally:
+        stub.terminate()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Local stub of the fandom wikis and search engines the scraper talks to.
+
+The stub is an HTTP/1.1 keep-alive server that also accepts proxy-style requests with an
+absolute URI, so a scraper started with HTTP_PROXY pointing at it and the SCRAPER_*_URL
+templates switched to http:// reaches it for every outbound request:
+
+    SCRAPER_WIKI_URL=http://{subdomain}.fandom.com
+    SCRAPER_GOOGLE_URL=http://www.google.com/search?q={query}
+    SCRAPER_DUCKDUCKGO_URL=http://duckduckgo.com/html/?q={query}
+    HTTP_PROXY=http://127.0.0.1:8765
+
+Served content comes from bench/fixtures.py. Each wiki in WIKIS, plus --shows synthetic
+"Synthetic Show <n>" wikis at syntheticshow<n>.fandom.com, has its episode pages at
+/wiki/<Episode_title>, an /wiki/Episodes list and an api.php answering the queries used by
+the episode index. Pages carry an ETag and a matching If-None-Match gets a 304.
+GET /__stats returns request counters and /__reset clears them.
+
+Pages recorded from the live sites (see record_fixtures.py) are replayed from --replay-dir
+before falling back to the synthetic ones. --error-rate answers that fraction of requests
+with a 503 and --stall-rate holds that fraction for --stall-ms first, so the scraper's
+timeouts, retries and circuit breakers can be exercised; --fail-hosts limits both to hosts
+ending in one of the given suffixes.
+
+    python bench/stub_server.py [--port 8765] [--latency-ms 150] [--jitter-ms 50]
+                                [--shows 200] [--episodes 1000] [--replay-dir fixtures/]
+                                [--error-rate 0.1] [--stall-rate 0.05 --stall-ms 12000]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+
+
+EPISODES_PER_WIKI = 1000
+
+WIKIS = {
+    'haikyuu': {'name': 'Haikyuu!!', 'episodes': EPISODES_PER_WIKI},
+    'onepiece': {'name': 'One Piece', 'episodes': EPISODES_PER_WIKI},
+}
+
+
+def episode_title(number):
+    return f'Synthetic Episode {number}'
+
+
+def episode_chapters(number):
+    return [number * 2, number * 2 + 1]
+
+
+# Episodes on each synthetic show wiki
+SHOW_EPISODES = 24
+
+
+def show_subdomain(number):
+    return f'syntheticshow{number}'
+
+
+def show_name(number):
+    return f'Synthetic Show {number}'
+
+
+def fixture_path(root, host, path, query=''):
+    """File a recorded response for host/path?query is stored in under root"""
+    name = path.strip('/') or '__root__'
+    if query:
+        name += '__' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(root, host, *name.split('/')) + '.html'
+
+
+class StubWorld:
+    """Renders and caches the stub pages, injects latency and failures, and counts the requests served per host"""
+
+    def __init__(self, latency=0.0, jitter=0.0, shows=0, episodes=EPISODES_PER_WIKI, replay_dir=None,
+                 error_rate=0.0, stall_rate=0.0, stall=0.0, fail_hosts=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.replay_dir = replay_dir
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.fail_hosts = tuple(fail_hosts)
+        self.wikis = {subdomain: {**wiki, 'episodes': episodes} for subdomain, wiki in WIKIS.items()}
+        for number in range(1, shows + 1):
+            self.wikis[show_subdomain(number)] = {'name': show_name(number), 'episodes': SHOW_EPISODES}
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def count(self, host, nbytes, status):
+        with self._lock:
+            counter = self.counters.setdefault(host, {'requests': 0, 'bytes': 0, 'not_modified': 0, 'failed': 0})
+            counter['requests'] += 1
+            counter['bytes'] += nbytes
+            if status == 304:
+                counter['not_modified'] += 1
+            elif status >= 500:
+                counter['failed'] += 1
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def inject_failure(self, host):
+        """Stall or fail a request as configured; returns True when it should be answered with a 503"""
+        if self.fail_hosts and not host.endswith(self.fail_hosts):
+            return False
+        if self.stall_rate and random.random() < self.stall_rate:
+            time.sleep(self.stall)
+        return bool(self.error_rate) and random.random() < self.error_rate
+
+    def replay(self, host, path, query):
+        """Return (status, content_type, body) for a recorded response, or None"""
+        if not self.replay_dir:
+            return None
+        try:
+            with open(fixture_path(self.replay_dir, host, path, query), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        return 200, 'application/json' if path.endswith('api.php') else 'text/html', body
+
+    def _cached(self, key, render):
+        page = self._pages.get(key)
+        if page is None:
+            page = render().encode('utf-8')
+            with self._lock:
+                self._pages[key] = page
+        return page
+
+    def route(self, host, path, query):
+        """Return (status, content_type, body) for a request"""
+        if host.endswith('.fandom.com'):
+            return self._wiki(host[:-len('.fandom.com')], path, query)
+        if 'google.' in host and path == '/search':
+            return 200, 'text/html', fixtures.serp(self._search(query.get('q', [''])[0]), 'Google').encode('utf-8')
+        if 'duckduckgo.' in host:
+            return 200, 'text/html', fixtures.serp(self._search(query.get('q', [''])[0]), 'DuckDuckGo').encode('utf-8')
+        return 404, 'text/plain', b'unknown host'
+
+    def _wiki(self, subdomain, path, query):
+        wiki = self.wikis.get(subdomain)
+        if wiki is None:
+            return 404, 'text/html', b'<html><head><title>Not Found | Fandom</title></head><body></body></html>'
+
+        if path in ('', '/'):
+            return 200, 'text/html', self._cached((subdomain, 'root'), lambda: fixtures.wiki_root(subdomain, wiki['name']))
+        if path == '/api.php':
+            return 200, 'application/json', json.dumps(self._api(subdomain, wiki, query)).encode('utf-8')
+        if path == '/wiki/Episodes':
+            episodes = [(n, episode_title(n)) for n in range(1, wiki['episodes'] + 1)]
+            return 200, 'text/html', self._cached((subdomain, 'list'), lambda: fixtures.episode_list(subdomain, wiki['name'], episodes))
+
+        match = re.fullmatch(r'/wiki/Synthetic_Episode_(\d+)', unquote(path))
+        if match and 1 <= int(match.group(1)) <= wiki['episodes']:
+            number = int(match.group(1))
+            return 200, 'text/html', self._cached((subdomain, number), lambda: fixtures.episode_page(
+                subdomain, wiki['name'], number, episode_title(number), episode_chapters(number)))
+
+        title = unquote(path.rsplit('/', 1)[-1]).replace('_', ' ')
+        return 404, 'text/html', f'<html><head><title>{title} | Fandom</title></head><body></body></html>'.encode('utf-8')
+
+    def _api(self, subdomain, wiki, query):
+        list_name = query.get('list', [''])[0]
+        if list_name in ('categorymembers', 'allpages'):
+            if list_name == 'categorymembers' and query.get('cmtitle', [''])[0] != 'Category:Episodes':
+                return {'query': {list_name: []}}
+            pages = [{'title': episode_title(n)} for n in range(1, wiki['episodes'] + 1)]
+            return {'query': {list_name: pages}}
+        if list_name == 'recentchanges':
+            return {'query': {'recentchanges': []}}
+        return {'error': {'info': f'unsupported list {list_name}'}}
+
+    def _search(self, q):
+        site = re.search(r'site:([a-z0-9-]+)\.fandom\.com', q)
+        if site:
+            subdomain = site.group(1)
+            number = re.search(r'episode (\d+)', q, re.IGNORECASE)
+            if subdomain in self.wikis and number and int(number.group(1)) <= self.wikis[subdomain]['episodes']:
+                return [f'http://{subdomain}.fandom.com/wiki/Synthetic_Episode_{int(number.group(1))}']
+            return []
+        words = set(re.findall(r'[a-z0-9]+', q.lower()))
+        return [f'http://{subdomain}.fandom.com/' for subdomain in self.wikis if subdomain in words]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    world = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        parts = urlsplit(self.path)
+        if parts.netloc:
+            host, path = parts.hostname, parts.path
+        else:
+            host, path = (self.headers.get('Host') or '').split(':')[0], parts.path
+
+        if path == '/__stats':
+            return self._send(200, 'application/json', json.dumps(self.world.counters).encode('utf-8'), send_body)
+        if path == '/__reset':
+            self.world.counters.clear()
+            return self._send(200, 'application/json', b'{}', send_body)
+
+        self.world.delay()
+        if self.world.inject_failure(host):
+            status, content_type, body = 503, 'text/plain', b'injected failure'
+        else:
+            status, content_type, body = (self.world.replay(host, path, parts.query)
+                                          or self.world.route(host, path, parse_qs(parts.query)))
+
+        etag = None
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+        self.world.count(host, len(body), status)
+        self._send(status, content_type, body, send_body, etag)
+
+    def _send(self, status, content_type, body, send_body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading a page early drop the connection; that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(port=8765, latency=0.0, jitter=0.0, **options):
+    handler = type('BoundStubHandler', (StubHandler,), {'world': StubWorld(latency, jitter, **options)})
+    return StubServer(('127.0.0.1', port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added to every stubbed response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--shows', type=int, default=0, help='synthetic show wikis served besides WIKIS')
+    parser.add_argument('--episodes', type=int, default=EPISODES_PER_WIKI, help='episodes on each wiki in WIKIS')
+    parser.add_argument('--replay-dir', help='serve responses recorded by record_fixtures.py from here first')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 503')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='fraction of requests held for --stall-ms')
+    parser.add_argument('--stall-ms', type=float, default=15000)
+    parser.add_argument('--fail-hosts', default='', help='comma-separated host suffixes failures apply to (default all)')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency_ms / 1000, args.jitter_ms / 1000, shows=args.shows,
+                         episodes=args.episodes, replay_dir=args.replay_dir, error_rate=args.error_rate,
+                         stall_rate=args.stall_rate, stall=args.stall_ms / 1000,
+                         fail_hosts=[host for host in args.fail_hosts.split(',') if host])
+    print(f"[STUB] 🧪 Serving stub fandom on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_DIR = os.environ.get('SCRAPER_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+CACHE_DB = os.path.join(CACHE_DIR, 'scraper.sqlite3')
+
+# Entries served from the in-process front are re-read from disk after this many seconds,
+# so invalidations made by another worker become visible without a restart
+MEMORY_TTL = float(os.environ.get('SCRAPER_CACHE_MEMORY_TTL', 60))
+
+# How long past expiry an entry may still be served stale while it is refreshed in the background
+STALE_TTL = float(os.environ.get('SCRAPER_STALE_TTL', 7 * 24 * 3600))
+
+# max_entries is enforced once every this many writes, so a write does not have to count the table
+EVICTION_INTERVAL = 20
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def normalize_key(text):
+    """Normalize free-form user input (anime names, episode titles) into a cache key"""
+    text = re.sub(r'[^\w\s]', ' ', str(text or '').lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def get_connection(path=CACHE_DB):
+    """Return the shared SQLite connection for path, creating the database on first use"""
+    with _connections_lock:
+        entry = _connections.get(path)
+        if entry is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            entry = (connection, threading.RLock())
+            _connections[path] = entry
+        return entry
+
+
+class ResolutionCache:
+    """
+    Persistent TTL + LRU cache of JSON values stored in one SQLite table.
+
+    Positive and negative entries have separate TTLs. Hot keys are served from a small
+    in-process LRU so repeat hits never touch the disk. Expired entries stay on disk until
+    evicted, and for stale_ttl past expiry get(key, allow_stale=True) still returns them.
+    """
+
+    def __init__(self, table, ttl, negative_ttl, max_entries, memory_entries=1024, path=CACHE_DB, stale_ttl=STALE_TTL):
+        self.table = table
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.path = path
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._connection = None
+        self._db_lock = None
+        self._writes = 0
+
+    def _db(self):
+        if self._connection is None:
+            connection, lock = get_connection(self.path)
+            with lock:
+                connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT,
+                        negative INTEGER NOT NULL,
+                        stored_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )""")
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)")
+            self._db_lock = lock
+            self._connection = connection
+        return self._connection, self._db_lock
+
+    def _remember(self, key, entry):
+        with self._memory_lock:
+            self._memory[key] = (entry, time.time())
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _forget(self, key=None):
+        with self._memory_lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+
+    def get(self, key, allow_stale=False):
+        """
+        Return {'value', 'negative', 'stored_at', 'expires_at', 'stale'} for a live entry, or
+        None when the key is missing or expired. With allow_stale an entry expired less than
+        stale_ttl ago is returned too, with 'stale' set.
+        """
+        now = time.time()
+        with self._memory_lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                entry, remembered_at = cached
+                if entry['expires_at'] > now and now - remembered_at < MEMORY_TTL:
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+
+        connection, lock = self._db()
+        with lock:
+            row = connection.execute(
+                f"SELECT value, negative, stored_at, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[3] <= now - (self.stale_ttl if allow_stale else 0):
+                return None
+            connection.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+
+        entry = {
+            'value': json.loads(row[0]),
+            'negative': bool(row[1]),
+            'stored_at': row[2],
+            'expires_at': row[3],
+            'stale': row[3] <= now,
+        }
+        if not entry['stale']:
+            self._remember(key, entry)
+        return entry
+
+    def get_value(self, key):
+        """Return just the cached value for a live entry, or None"""
+        entry = self.get(key)
+        return entry['value'] if entry else None
+
+    def set(self, key, value, negative=False):
+        """
+        Store value under key with the positive or negative TTL. Every EVICTION_INTERVAL writes,
+        LRU entries past max_entries are evicted.
+        """
+        now = time.time()
+        entry = {
+            'value': value,
+            'negative': negative,
+            'stored_at': now,
+            'expires_at': now + (self.negative_ttl if negative else self.ttl),
+            'stale': False,
+        }
+        connection, lock = self._db()
+        with lock:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, negative, stored_at, expires_at, last_access) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(value), int(negative), entry['stored_at'], entry['expires_at'], now)
+            )
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self.evict()
+        self._remember(key, entry)
+        return entry
+
+    def evict(self):
+        """Delete the least recently used entries past max_entries; returns how many were deleted"""
+        connection, lock = self._db()
+        with lock:
+            overflow = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+            if overflow <= 0:
+                return 0
+            return connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)", (overflow,)
+            ).rowcount
+
+    def delete(self, key):
+        connection, lock = self._db()
+        with lock:
+            deleted = connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+        self._forget(key)
+        return deleted
+
+    def delete_prefix(self, prefix):
+        """Delete every key starting with prefix"""
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        connection, lock = self._db()
+        with lock:
+            deleted = connection.execute(
+                f"DELETE FROM {self.table} WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',)
+            ).rowcount
+        with self._memory_lock:
+            for key in [key for key in self._memory if key.startswith(prefix)]:
+                del self._memory[key]
+        return deleted
+
+    def clear(self):
+        connection, lock = self._db()
+        with lock:
+            deleted = connection.execute(f"DELETE FROM {self.table}").rowcount
+        self._forget()
+        return deleted
+
+    def stats(self):
+        now = time.time()
+        connection, lock = self._db()
+        with lock:
+            total, negative, expired = connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(negative), 0), COALESCE(SUM(expires_at <= ?), 0) FROM {self.table}",
+                (now,)
+            ).fetchone()
+        return {'entries': total, 'negative': negative, 'expired': expired, 'max_entries': self.max_entries}
+
+
+class MemoryTTLCache:
+    """Small in-process TTL + LRU cache for short-lived values that are not worth persisting"""
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
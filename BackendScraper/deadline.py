@@ -0,0 +1,72 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+
+# Time budget of an episode lookup when the client does not send deadline_ms, and the most it may ask for
+EPISODE_DEADLINE = float(os.environ.get('SCRAPER_EPISODE_DEADLINE', 25))
+MAX_DEADLINE = float(os.environ.get('SCRAPER_MAX_DEADLINE', 60))
+
+# A stage is skipped rather than started with less than this many seconds of budget left
+MIN_STAGE_BUDGET = float(os.environ.get('SCRAPER_MIN_STAGE_BUDGET', 1))
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a fetch once the current request's deadline has passed"""
+
+    def __init__(self):
+        super().__init__("request deadline exceeded")
+
+
+# Monotonic time the current request has to finish by, or None when it has no deadline
+_expires_at = contextvars.ContextVar('scraper_deadline', default=None)
+
+
+def requested_budget(data):
+    """Return the budget in seconds a request asked for with deadline_ms, capped at MAX_DEADLINE"""
+    try:
+        budget = float(data.get('deadline_ms')) / 1000
+    except (TypeError, ValueError):
+        return EPISODE_DEADLINE
+    return min(max(budget, 0.0), MAX_DEADLINE)
+
+
+@contextmanager
+def deadline(seconds):
+    """Run the block under a deadline seconds from now; an earlier enclosing deadline still applies"""
+    expires_at = time.monotonic() + seconds
+    outer = _expires_at.get()
+    token = _expires_at.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _expires_at.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None when there is no deadline"""
+    expires_at = _expires_at.get()
+    return None if expires_at is None else max(0.0, expires_at - time.monotonic())
+
+
+def expired():
+    """True once the current deadline has passed"""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def has_budget(seconds=MIN_STAGE_BUDGET):
+    """True unless the current deadline leaves less than seconds"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def clamp(timeout):
+    """Return timeout cut down to the budget left; raises DeadlineExceeded when none is left"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,318 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from deadline import DeadlineExceeded, clamp, has_budget
+
+
+# Headless browsers kept for rendering client-side infoboxes; 0 disables the JS fallback
+# entirely and Selenium is then never imported
+POOL_SIZE = int(os.environ.get('SCRAPER_DRIVER_POOL_SIZE', 0))
+
+# A browser is replaced after rendering this many pages or once its process tree grows past this RSS
+DRIVER_MAX_PAGES = int(os.environ.get('SCRAPER_DRIVER_MAX_PAGES', 50))
+DRIVER_MAX_RSS_MB = float(os.environ.get('SCRAPER_DRIVER_MAX_RSS_MB', 700))
+
+# How long a request waits for a free browser, and how long one page render may take
+CHECKOUT_TIMEOUT = float(os.environ.get('SCRAPER_DRIVER_CHECKOUT_TIMEOUT', 10))
+PAGE_TIMEOUT = float(os.environ.get('SCRAPER_DRIVER_PAGE_TIMEOUT', 15))
+
+# A render is not started with less of the request deadline left than this
+RENDER_MIN_BUDGET = float(os.environ.get('SCRAPER_DRIVER_MIN_BUDGET', 3))
+
+# Rendered episode pages are ready once an infobox data row exists
+INFOBOX_SELECTOR = '.portable-infobox .pi-data'
+
+
+class DriverUnavailable(Exception):
+    """No healthy browser could be checked out within the timeout"""
+
+
+def create_driver():
+    """Create a new Chrome driver instance with enhanced stability"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-plugins")
+    options.add_argument("--disable-images")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+    # Add prefs to reduce resource usage
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2
+    }
+    options.add_experimental_option("prefs", prefs)
+
+    try:
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(PAGE_TIMEOUT)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+    except Exception as e:
+        print(f"[DRIVER] ❌ Failed to create driver: {e}")
+        return None
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of pid and all its descendants, read from /proc; 0 where /proc is unavailable"""
+    children = {}
+    rss_kb = {}
+    try:
+        entries = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+    except OSError:
+        return 0.0
+
+    for entry in entries:
+        try:
+            with open(f'/proc/{entry}/status') as f:
+                parent, rss = None, 0
+                for line in f:
+                    if line.startswith('PPid:'):
+                        parent = int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss = int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+        rss_kb[int(entry)] = rss
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_kb.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total / 1024
+
+
+def driver_rss_mb(driver):
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    pid = getattr(process, 'pid', None)
+    return process_tree_rss_mb(pid) if pid else 0.0
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """
+    Bounded pool of warm headless browsers.
+
+    Browsers are started lazily on the first checkout, checked for health before being
+    handed out, and recycled after max_pages renders, when their process tree grows past
+    max_rss_mb, or when a render fails. factory() returns a driver-like object (get,
+    page_source, execute_script, quit) or None, so a fake driver can stand in for Chrome.
+    """
+
+    def __init__(self, size=POOL_SIZE, factory=create_driver, max_pages=DRIVER_MAX_PAGES,
+                 max_rss_mb=DRIVER_MAX_RSS_MB, checkout_timeout=CHECKOUT_TIMEOUT, rss_reader=driver_rss_mb):
+        self.size = size
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.checkout_timeout = checkout_timeout
+        self.rss_reader = rss_reader
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.counters = {'created': 0, 'recycled': 0, 'unhealthy': 0, 'timeouts': 0}
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def _take(self, deadline):
+        """Return an idle driver, or None after reserving a slot for a new one"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise DriverUnavailable("driver pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    return None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise DriverUnavailable("no browser became free before the checkout timeout")
+                self._condition.wait(remaining)
+
+    def _discard(self, pooled, reason):
+        with self._condition:
+            self._open -= 1
+            self.counters[reason] += 1
+            self._condition.notify()
+        if pooled is not None:
+            try:
+                pooled.driver.quit()
+            except Exception as e:
+                print(f"[DRIVER] ⚠️ Error quitting driver: {e}")
+
+    def _healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception as e:
+            print(f"[DRIVER] ⚠️ Health check failed: {e}")
+            return False
+
+    def _acquire(self, timeout):
+        deadline = time.time() + (self.checkout_timeout if timeout is None else timeout)
+        while True:
+            pooled = self._take(deadline)
+            if pooled is not None:
+                if self._healthy(pooled):
+                    return pooled
+                self._discard(pooled, 'unhealthy')
+                continue
+
+            print(f"[DRIVER] 🚀 Starting headless browser ({self._open}/{self.size})")
+            try:
+                driver = self.factory()
+            except Exception as e:
+                print(f"[DRIVER] ❌ Failed to create driver: {e}")
+                driver = None
+            if driver is None:
+                self._discard(None, 'unhealthy')
+                raise DriverUnavailable("could not start a browser")
+            with self._condition:
+                self.counters['created'] += 1
+            return _PooledDriver(driver)
+
+    def _release(self, pooled, failed):
+        pooled.pages += 1
+        if failed:
+            self._discard(pooled, 'unhealthy')
+            return
+        if pooled.pages >= self.max_pages:
+            print(f"[DRIVER] ♻️ Recycling browser after {pooled.pages} pages")
+            self._discard(pooled, 'recycled')
+            return
+        if self.max_rss_mb:
+            rss = self.rss_reader(pooled.driver)
+            if rss > self.max_rss_mb:
+                print(f"[DRIVER] ♻️ Recycling browser using {rss:.0f} MB")
+                self._discard(pooled, 'recycled')
+                return
+        with self._condition:
+            if self._closed:
+                self._open -= 1
+            else:
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+        pooled.driver.quit()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow a healthy driver for the duration of the block; raises DriverUnavailable on timeout"""
+        if not self.enabled:
+            raise DriverUnavailable("driver pool is disabled")
+        pooled = self._acquire(timeout)
+        failed = False
+        try:
+            yield pooled.driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(pooled, failed)
+
+    def render_page(self, url, wait_selector=INFOBOX_SELECTOR, timeout=None):
+        """
+        Return the page source of url after client-side rendering, or None.
+
+        Under a request deadline no render starts with less than RENDER_MIN_BUDGET left, and
+        the checkout, page load and wait for wait_selector are each cut down to the budget left.
+        A page load or wait that runs out uses the page as rendered so far.
+        """
+        if not has_budget(RENDER_MIN_BUDGET):
+            print(f"[DRIVER] ⏳ Skipping render of {url}: not enough of the request deadline left")
+            return None
+        try:
+            with self.checkout(clamp(self.checkout_timeout if timeout is None else timeout)) as driver:
+                print(f"[DRIVER] 🖥️ Rendering {url}")
+                self._load(driver, url)
+                if wait_selector:
+                    self._wait_for(driver, wait_selector)
+                return driver.page_source
+        except (DriverUnavailable, DeadlineExceeded) as e:
+            print(f"[DRIVER] ⏳ Skipping render of {url}: {e}")
+        except Exception as e:
+            print(f"[DRIVER] ❌ Render failed for {url}: {e}")
+        return None
+
+    def _budget(self, timeout):
+        """timeout cut down to the request deadline; once it has passed, a token wait rather than an error that discards the browser"""
+        try:
+            return clamp(timeout)
+        except DeadlineExceeded:
+            return 0.1
+
+    def _load(self, driver, url):
+        from selenium.common.exceptions import TimeoutException
+
+        driver.set_page_load_timeout(self._budget(PAGE_TIMEOUT))
+        try:
+            driver.get(url)
+        except TimeoutException:
+            print(f"[DRIVER] ⚠️ {url} did not finish loading in time, using the page as rendered")
+            driver.execute_script("window.stop();")
+
+    def _wait_for(self, driver, selector):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            WebDriverWait(driver, self._budget(PAGE_TIMEOUT)).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        except TimeoutException:
+            print(f"[DRIVER] ⚠️ {selector} never appeared, using the page as rendered")
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            try:
+                pooled.driver.quit()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                **self.counters,
+            }
+
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
+
+
+def needs_js_render(html):
+    """True when a fetched episode page has no infobox rows, i.e. they may be rendered client-side"""
+    return driver_pool.enabled and 'pi-data' not in (html or '')
@@ -0,0 +1,330 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+from cache import CACHE_DB, get_connection, normalize_key
+from fetcher import fetch, wiki_url
+from pageStore import fetch_page
+from parsing import make_soup
+from refresher import refresher
+from titleIndex import TitleIndex
+
+
+# Incremental refresh interval, and the shortest gap between refreshes triggered by a lookup miss
+# or between attempts to build an index that failed
+REFRESH_INTERVAL = float(os.environ.get('SCRAPER_EPISODE_INDEX_REFRESH', 6 * 3600))
+MISS_REFRESH_INTERVAL = float(os.environ.get('SCRAPER_EPISODE_INDEX_MISS_REFRESH', 600))
+
+# allpages is paged 500 titles at a time; large wikis are capped at this many pages
+MAX_API_BATCHES = int(os.environ.get('SCRAPER_EPISODE_INDEX_MAX_BATCHES', 20))
+
+# An episode title with no exact match in the index is matched to this many of the most similar page titles
+FUZZY_TITLE_MATCHES = int(os.environ.get('SCRAPER_EPISODE_INDEX_FUZZY_MATCHES', 3))
+
+EPISODE_CATEGORIES = ['Category:Episodes', 'Category:Anime_Episodes', 'Category:Anime_episodes']
+
+HTML_LIST_PAGES = ['/wiki/Episodes', '/wiki/Episode_Guide', '/wiki/List_of_Episodes', '/wiki/Episode_List', '']
+
+EPISODE_NUMBER_PATTERN = re.compile(r'\b(?:episode|ep\.?)[\s_]*(\d+)\b', re.IGNORECASE)
+
+
+def page_url(subdomain, title):
+    """Build the article URL MediaWiki uses for a page title"""
+    return f"{wiki_url(subdomain)}/wiki/" + quote(title.replace(' ', '_'), safe="/:()!,'*;@$~")
+
+
+def episode_number_from(text):
+    match = EPISODE_NUMBER_PATTERN.search(text or '')
+    return str(int(match.group(1))) if match else None
+
+
+class EpisodeIndex:
+    """
+    Per-wiki index of episode pages, keyed by episode number and normalized page title.
+
+    Built once per subdomain from the wiki's api.php listings (episode categories plus
+    allpages, which includes "Episode N" redirects), falling back to the HTML episode list
+    pages when the API is unavailable. Indexes are persisted in SQLite and refreshed
+    incrementally from recentchanges. Titles without an exact match are looked up by
+    trigram similarity in a TitleIndex kept in memory per wiki.
+
+    Builds and periodic refreshes run on the background refresher, never on the request
+    path: lookup() finds nothing for a wiki until its index has been built.
+    """
+
+    def __init__(self, path=CACHE_DB):
+        self.path = path
+        self._indexes = {}
+        self._title_indexes = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._attempted_at = {}
+        self._connection = None
+        self._db_lock = None
+
+    def _db(self):
+        if self._connection is None:
+            connection, lock = get_connection(self.path)
+            with lock:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS episode_index (
+                        subdomain TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        source TEXT NOT NULL,
+                        built_at REAL NOT NULL,
+                        refreshed_at REAL NOT NULL
+                    )""")
+            self._db_lock = lock
+            self._connection = connection
+        return self._connection, self._db_lock
+
+    def _build_lock(self, subdomain):
+        with self._lock:
+            return self._build_locks.setdefault(subdomain, threading.Lock())
+
+    def _load(self, subdomain):
+        with self._lock:
+            index = self._indexes.get(subdomain)
+        if index is not None:
+            return index
+
+        connection, lock = self._db()
+        with lock:
+            row = connection.execute(
+                "SELECT data, source, built_at, refreshed_at FROM episode_index WHERE subdomain = ?", (subdomain,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        data = json.loads(row[0])
+        index = {'by_number': data['by_number'], 'by_title': data['by_title'],
+                 'source': row[1], 'built_at': row[2], 'refreshed_at': row[3]}
+        with self._lock:
+            return self._indexes.setdefault(subdomain, index)
+
+    def _save(self, subdomain, index):
+        data = json.dumps({'by_number': index['by_number'], 'by_title': index['by_title']})
+        connection, lock = self._db()
+        with lock:
+            connection.execute(
+                "INSERT OR REPLACE INTO episode_index (subdomain, data, source, built_at, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (subdomain, data, index['source'], index['built_at'], index['refreshed_at'])
+            )
+        with self._lock:
+            self._indexes[subdomain] = index
+
+    def lookup(self, subdomain, episode_title, episode_number):
+        """Return candidate page URLs for an episode, exact number matches first"""
+        subdomain = subdomain.lower()
+        index = self.get(subdomain)
+        if index is None:
+            return []
+
+        urls = self._match(subdomain, index, episode_title, episode_number)
+        if not urls and self._since_refresh(subdomain, index) > MISS_REFRESH_INTERVAL:
+            # The episode may have aired after the last refresh. The caller falls back to the
+            # list pages this time; the index refreshed in the background has it next time
+            self._schedule(subdomain, MISS_REFRESH_INTERVAL)
+        return urls
+
+    def _match(self, subdomain, index, episode_title, episode_number):
+        """Number matches first, then the exact title match or, without one, the most similar titles"""
+        urls = []
+        number_match = re.search(r'\d+', str(episode_number or ''))
+        if number_match:
+            urls.extend(index['by_number'].get(str(int(number_match.group())), []))
+        if episode_title:
+            url = index['by_title'].get(normalize_key(episode_title))
+            if url:
+                urls.append(url)
+            else:
+                urls.extend(url for _, _, url in self._title_index(subdomain, index).search(episode_title, FUZZY_TITLE_MATCHES))
+        return list(dict.fromkeys(urls))
+
+    def _title_index(self, subdomain, index):
+        """Return the TitleIndex over the wiki's page titles, rebuilt once the index has grown"""
+        with self._lock:
+            cached = self._title_indexes.get(subdomain)
+        size = len(index['by_title'])
+        if cached is not None and cached[0] == size:
+            return cached[1]
+
+        title_index = TitleIndex(list(index['by_title'].items()))
+        with self._lock:
+            self._title_indexes[subdomain] = (size, title_index)
+        return title_index
+
+    def _since_refresh(self, subdomain, index):
+        """Seconds since the index was refreshed, or since the last failed attempt when that is later"""
+        with self._lock:
+            attempted_at = self._attempted_at.get(subdomain, 0.0)
+        return time.time() - max(index['refreshed_at'], attempted_at)
+
+    def get(self, subdomain):
+        """
+        Return the index for subdomain, or None while it has not been built yet. A missing
+        index is built, and an old one refreshed, in the background; the old one is returned.
+        """
+        index = self._load(subdomain)
+        if index is None:
+            with self._lock:
+                attempted_at = self._attempted_at.get(subdomain, 0.0)
+            if time.time() - attempted_at > MISS_REFRESH_INTERVAL:
+                self._schedule(subdomain, REFRESH_INTERVAL)
+        elif self._since_refresh(subdomain, index) >= REFRESH_INTERVAL:
+            self._schedule(subdomain, REFRESH_INTERVAL)
+        return index
+
+    def _schedule(self, subdomain, max_age):
+        """Queue a build of subdomain's index, or a refresh once it is older than max_age"""
+        refresher.submit(f"episode-index|{subdomain}", wiki_url(subdomain), lambda: self.update(subdomain, max_age))
+
+    def update(self, subdomain, max_age=REFRESH_INTERVAL):
+        """Build subdomain's index, or refresh it when older than max_age; returns the index or None"""
+        with self._build_lock(subdomain):
+            index = self._load(subdomain)
+            if index is None:
+                return self.build(subdomain)
+            if self._since_refresh(subdomain, index) >= max_age:
+                return self.refresh(subdomain)
+            return index
+
+    def build(self, subdomain):
+        """
+        Build the full index for subdomain from api.php, or the HTML list pages as a fallback.
+
+        Returns None, saving nothing, when neither source could be read in full: an index cut
+        short by an error would otherwise be trusted as complete until the next refresh.
+        """
+        print(f"[EPISODE_INDEX] 🏗️ Building episode index for {subdomain}")
+        started = time.time()
+        index = {'by_number': {}, 'by_title': {}, 'source': 'api'}
+        try:
+            for category in EPISODE_CATEGORIES:
+                for title in self._api_titles(subdomain, {'list': 'categorymembers', 'cmtitle': category,
+                                                          'cmnamespace': 0, 'cmlimit': 500}, 'categorymembers'):
+                    self._add(index, subdomain, title)
+            for title in self._api_titles(subdomain, {'list': 'allpages', 'apnamespace': 0, 'aplimit': 500}, 'allpages'):
+                self._add(index, subdomain, title)
+        except Exception as e:
+            print(f"[EPISODE_INDEX] ⚠️ api.php unavailable for {subdomain} ({e}), scraping list pages")
+            index = {'by_number': {}, 'by_title': {}, 'source': 'html'}
+            if not self._add_html_pages(index, subdomain) or not index['by_title']:
+                print(f"[EPISODE_INDEX] ❌ Could not build an episode index for {subdomain}, retrying later")
+                with self._lock:
+                    self._attempted_at[subdomain] = time.time()
+                return None
+
+        index['built_at'] = started
+        index['refreshed_at'] = started
+        self._save(subdomain, index)
+        print(f"[EPISODE_INDEX] ✅ Indexed {len(index['by_title'])} pages, "
+              f"{len(index['by_number'])} episode numbers for {subdomain} via {index['source']}")
+        return index
+
+    def refresh(self, subdomain):
+        """
+        Add pages created since the last refresh; indexes built from HTML are rebuilt instead.
+
+        refreshed_at only moves forward when the whole recentchanges listing was read, so a
+        failed refresh is retried from the same point and no new page is ever skipped. New
+        pages are added to a copy that replaces the index once saved; lookups keep reading
+        the old one meanwhile.
+        """
+        current = self._load(subdomain)
+        if current is None or current['source'] != 'api':
+            return self.build(subdomain)
+
+        index = {**current, 'by_title': dict(current['by_title']),
+                 'by_number': {number: list(urls) for number, urls in current['by_number'].items()}}
+
+        since = datetime.fromtimestamp(index['refreshed_at'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        # Taken before the listing, so pages created while it is read are picked up next time
+        started = time.time()
+        try:
+            params = {'list': 'recentchanges', 'rctype': 'new', 'rcnamespace': 0, 'rcdir': 'newer',
+                      'rcstart': since, 'rcprop': 'title', 'rclimit': 500}
+            added = 0
+            for title in self._api_titles(subdomain, params, 'recentchanges'):
+                self._add(index, subdomain, title)
+                added += 1
+            print(f"[EPISODE_INDEX] 🔄 Refreshed {subdomain}: {added} new pages since {since}")
+        except Exception as e:
+            print(f"[EPISODE_INDEX] ⚠️ Incremental refresh failed for {subdomain}, retrying from {since} later: {e}")
+            with self._lock:
+                self._attempted_at[subdomain] = time.time()
+            return current
+
+        index['refreshed_at'] = started
+        self._save(subdomain, index)
+        return index
+
+    def _api_titles(self, subdomain, params, list_name):
+        """Yield page titles from one api.php list query, following continuation"""
+        api_url = f"{wiki_url(subdomain)}/api.php"
+        query = {'action': 'query', 'format': 'json', **params}
+        for _ in range(MAX_API_BATCHES):
+            response = fetch(api_url, params=query, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            if 'error' in data:
+                raise ValueError(data['error'].get('info', 'api error'))
+            for page in data.get('query', {}).get(list_name, []):
+                yield page['title']
+            if 'continue' not in data:
+                return
+            query = {**query, **data['continue']}
+
+    def _add(self, index, subdomain, title, url=None):
+        url = url or page_url(subdomain, title)
+        key = normalize_key(title)
+        if key:
+            index['by_title'].setdefault(key, url)
+        number = episode_number_from(title)
+        if number:
+            urls = index['by_number'].setdefault(number, [])
+            if url not in urls:
+                urls.append(url)
+
+    def _add_html_pages(self, index, subdomain):
+        """Add the links of the wiki's episode list pages; False when one of them could not be fetched"""
+        base_url = wiki_url(subdomain)
+        complete = True
+        for path in HTML_LIST_PAGES:
+            try:
+                response = fetch_page(f"{base_url}{path}", timeout=10)
+                if response.status_code >= 500 or response.status_code == 429:
+                    complete = False
+                    continue
+                if response.status_code != 200:
+                    continue
+                soup = make_soup(response.text)
+                for link in soup.find_all('a', href=True):
+                    href = link['href']
+                    if not href.startswith('/wiki/') or ':' in href[len('/wiki/'):]:
+                        continue
+                    text = link.get_text(strip=True)
+                    title = unquote(href[len('/wiki/'):]).replace('_', ' ')
+                    url = f"{base_url}{href}"
+                    self._add(index, subdomain, title, url)
+                    if text and episode_number_from(text):
+                        self._add(index, subdomain, text, url)
+            except Exception as e:
+                print(f"[EPISODE_INDEX] ⚠️ Error with {base_url}{path}: {e}")
+                complete = False
+        return complete
+
+    def invalidate(self, subdomain):
+        subdomain = subdomain.lower()
+        connection, lock = self._db()
+        with lock:
+            connection.execute("DELETE FROM episode_index WHERE subdomain = ?", (subdomain,))
+        with self._lock:
+            self._indexes.pop(subdomain, None)
+            self._title_indexes.pop(subdomain, None)
+            self._attempted_at.pop(subdomain, None)
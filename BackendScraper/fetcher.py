@@ -0,0 +1,238 @@
+import contextvars
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from deadline import clamp, has_budget
+from hostHealth import CircuitOpenError, host_health
+from metrics import record_bytes, record_outbound
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Number of per-host connection pools kept alive, and connections kept alive in each of them
+POOL_CONNECTIONS = int(os.environ.get('SCRAPER_POOL_CONNECTIONS', 32))
+POOL_MAXSIZE = int(os.environ.get('SCRAPER_POOL_MAXSIZE', 16))
+
+DEFAULT_TIMEOUT = float(os.environ.get('SCRAPER_HTTP_TIMEOUT', 8))
+DEFAULT_RETRIES = int(os.environ.get('SCRAPER_HTTP_RETRIES', 0))
+RETRY_BACKOFF = float(os.environ.get('SCRAPER_HTTP_BACKOFF', 0.5))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Outbound URL templates; overridable so benchmarks can point the scraper at a local stub server
+WIKI_URL_TEMPLATE = os.environ.get('SCRAPER_WIKI_URL', 'https://{subdomain}.fandom.com')
+GOOGLE_SEARCH_URL = os.environ.get('SCRAPER_GOOGLE_URL', 'https://www.google.com/search?q={query}')
+DUCKDUCKGO_SEARCH_URL = os.environ.get('SCRAPER_DUCKDUCKGO_URL', 'https://duckduckgo.com/html/?q={query}')
+WIKI_URL_SCHEME = WIKI_URL_TEMPLATE.split('://', 1)[0]
+
+
+def wiki_url(subdomain):
+    """Return the base URL (no trailing slash) of the fandom wiki on subdomain"""
+    return WIKI_URL_TEMPLATE.format(subdomain=subdomain)
+
+
+class FetchAborted(Exception):
+    """Raised by a fetch whose Abort was triggered from another thread"""
+
+    def __init__(self):
+        super().__init__("fetch aborted")
+
+
+class Abort:
+    """
+    Lets another thread stop the fetches running under it (see aborting()). The pooled
+    connections those fetches hold are remembered until they go back to the pool, and
+    abort() shuts their sockets down, so even a fetch still waiting for response headers
+    returns at once with FetchAborted. An Abort entered under another one is aborted with it.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._connections = []
+        self._children = []
+        self._lock = threading.Lock()
+
+    def link(self, child):
+        """Abort child along with this Abort"""
+        with self._lock:
+            if not self.aborted:
+                self._children.append(child)
+                return
+        child.abort()
+
+    def track(self, connection):
+        with self._lock:
+            if not self.aborted:
+                self._connections.append(connection)
+                return
+        _shut_down(connection)
+
+    def untrack(self, connection):
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            connections, self._connections = self._connections, []
+            children, self._children = self._children, []
+        for connection in connections:
+            _shut_down(connection)
+        for child in children:
+            child.abort()
+
+
+def _shut_down(connection):
+    # socket.socket.shutdown rather than SSLSocket's, which would drop the TLS state under the reading thread;
+    # urllib3 discards a connection shut down after it went back to the pool before reusing it
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        try:
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+# The Abort of the fetches running in this context, or None
+_abort = contextvars.ContextVar('scraper_fetch_abort', default=None)
+
+
+@contextmanager
+def aborting(abort):
+    """Run the block's fetches under abort, and under the enclosing Abort too"""
+    outer = _abort.get()
+    if outer is not None and outer is not abort:
+        outer.link(abort)
+    token = _abort.set(abort)
+    try:
+        yield abort
+    finally:
+        _abort.reset(token)
+
+
+def _aborted():
+    abort = _abort.get()
+    return abort is not None and abort.aborted
+
+
+def _tracking_pool(pool_class):
+    """pool_class reporting the connections it hands out and gets back to the current Abort"""
+    class TrackingPool(pool_class):
+        def _get_conn(self, timeout=None):
+            connection = super()._get_conn(timeout)
+            abort = _abort.get()
+            if abort is not None:
+                abort.track(connection)
+            return connection
+
+        def _put_conn(self, conn):
+            abort = _abort.get()
+            if abort is not None:
+                abort.untrack(conn)
+            super()._put_conn(conn)
+
+    return TrackingPool
+
+
+def requests_module():
+    """The requests package, imported on first use so a process that has not fetched anything yet does not load it"""
+    import requests
+    return requests
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session shared by every scraper fetch"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from requests.adapters import HTTPAdapter
+                from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+                class AbortableAdapter(HTTPAdapter):
+                    def init_poolmanager(self, *args, **kwargs):
+                        super().init_poolmanager(*args, **kwargs)
+                        self.poolmanager.pool_classes_by_scheme = {
+                            'http': _tracking_pool(HTTPConnectionPool),
+                            'https': _tracking_pool(HTTPSConnectionPool),
+                        }
+
+                session = requests_module().Session()
+                adapter = AbortableAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'User-Agent': USER_AGENT})
+                _session = session
+    return _session
+
+
+def fetch(url, method='GET', timeout=None, retries=None, backoff=None, **kwargs):
+    """
+    Fetch url through the pooled session with the shared timeout, retry and backoff policy.
+
+    Timeouts, connection errors and retryable status codes are retried up to `retries` times
+    with exponential backoff. The last response is returned even if its status is not 200;
+    the last exception is re-raised when every attempt failed to get a response.
+
+    Every attempt is recorded in the host's health; while its circuit breaker is open the
+    fetch fails immediately with CircuitOpenError instead of waiting out a timeout. Under a
+    request deadline (see deadline.py) each attempt's timeout is clamped to the budget left,
+    and no retry is made that the budget cannot wait for, nor once the host's breaker has
+    opened (the last outcome is returned or raised instead). A fetch run under an Abort that
+    is triggered raises FetchAborted and is not held against the host.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    retries = DEFAULT_RETRIES if retries is None else retries
+    backoff = RETRY_BACKOFF if backoff is None else backoff
+    session = get_session()
+    health = host_health(url)
+    exceptions = requests_module().exceptions
+
+    for attempt in range(retries + 1):
+        if _aborted():
+            raise FetchAborted()
+        # Clamped before a half-open trial is claimed, so a spent budget cannot strand the claim
+        attempt_timeout = clamp(timeout)
+        if not health.allow():
+            raise CircuitOpenError(health.host)
+        delay = backoff * (2 ** attempt)
+        started = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=attempt_timeout, **kwargs)
+        except (exceptions.Timeout, exceptions.ConnectionError) as e:
+            if _aborted():
+                health.release_trial()
+                raise FetchAborted() from None
+            health.record(time.monotonic() - started, ok=False)
+            record_outbound(url, 'error')
+            if _last_attempt(attempt, retries, delay, health):
+                raise
+            print(f"[FETCH] ⚠️ Attempt {attempt + 1} for {url} failed ({e.__class__.__name__}), retrying...")
+        except BaseException:
+            # The attempt says nothing about the host, so the next request may take the trial
+            health.release_trial()
+            raise
+        else:
+            health.record(time.monotonic() - started, ok=response.status_code not in RETRY_STATUSES)
+            record_outbound(url, response.status_code)
+            if response.status_code not in RETRY_STATUSES or _last_attempt(attempt, retries, delay, health):
+                # Streamed bodies are counted by whoever reads them
+                if not kwargs.get('stream'):
+                    record_bytes(url, len(response.content))
+                return response
+            print(f"[FETCH] ⚠️ Attempt {attempt + 1} for {url} returned {response.status_code}, retrying...")
+            response.close()
+
+        time.sleep(delay)
+
+
+def _last_attempt(attempt, retries, delay, health):
+    # No retry once the budget cannot wait out the backoff or the failure opened the host's breaker
+    return attempt == retries or not has_budget(delay) or not health.available()
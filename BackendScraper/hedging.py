@@ -0,0 +1,259 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from deadline import remaining
+from fetcher import Abort, aborting
+from hostHealth import CLOSED, host_health, host_of
+from metrics import record_hedge
+from prober import probe_cancelled
+
+
+HEDGE_ENABLED = os.environ.get('SCRAPER_HEDGE', '1') == '1'
+
+# A fetch still unfinished after this quantile of the host's last HEDGE_WINDOW fetch durations
+# is sent again; until HEDGE_MIN_SAMPLES fetches from the host have finished, after HEDGE_DELAY
+HEDGE_QUANTILE = float(os.environ.get('SCRAPER_HEDGE_QUANTILE', 0.95))
+HEDGE_WINDOW = int(os.environ.get('SCRAPER_HEDGE_WINDOW', 200))
+HEDGE_MIN_SAMPLES = int(os.environ.get('SCRAPER_HEDGE_MIN_SAMPLES', 20))
+HEDGE_DELAY = float(os.environ.get('SCRAPER_HEDGE_DELAY', 2))
+HEDGE_MIN_DELAY = float(os.environ.get('SCRAPER_HEDGE_MIN_DELAY', 0.1))
+
+# Hedges are capped at this share of hedgeable fetches, plus a small burst
+HEDGE_RATIO = float(os.environ.get('SCRAPER_HEDGE_RATIO', 0.1))
+HEDGE_BURST = float(os.environ.get('SCRAPER_HEDGE_BURST', 5))
+
+# Threads running hedges; the first copy of a fetch always runs on the calling thread
+HEDGE_WORKERS = int(os.environ.get('SCRAPER_HEDGE_WORKERS', 128))
+
+
+class HedgeBudget:
+    """
+    Process-wide cap on the hedge rate: every hedgeable fetch earns `ratio` of a token, up
+    to `burst` tokens, and every hedge sent spends a whole one.
+    """
+
+    def __init__(self, ratio=HEDGE_RATIO, burst=HEDGE_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self):
+        """Credit one hedgeable fetch; returns whether a hedge is currently affordable"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+            return self._tokens >= 1
+
+    def spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+hedge_budget = HedgeBudget()
+
+
+class FetchDurations:
+    """
+    Durations of the last `size` hedgeable fetches per host, body included: the hedge
+    threshold has to cover the whole fetch, not just the wait for response headers.
+    """
+
+    def __init__(self, size=HEDGE_WINDOW):
+        self.size = size
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def add(self, url, seconds):
+        host = host_of(url)
+        with self._lock:
+            durations = self._hosts.get(host)
+            if durations is None:
+                durations = self._hosts[host] = deque(maxlen=self.size)
+            durations.append(seconds)
+
+    def quantile(self, url, quantile, min_samples=1):
+        """Return the quantile of the host's recent durations, or None with fewer than min_samples"""
+        with self._lock:
+            durations = sorted(self._hosts.get(host_of(url), ()))
+        if len(durations) < max(1, min_samples):
+            return None
+        return durations[min(len(durations) - 1, int(len(durations) * quantile))]
+
+
+fetch_durations = FetchDurations()
+
+
+def timed_attempt(url, attempt):
+    """Wrap attempt so every successful run of it, hedge or not, adds its duration to fetch_durations"""
+    def run():
+        started = time.monotonic()
+        result = attempt()
+        fetch_durations.add(url, time.monotonic() - started)
+        return result
+    return run
+
+
+def hedge_delay(url):
+    """
+    Return the seconds after which a fetch of url still unanswered should be duplicated,
+    or None when it should not be hedged: hedging is off, the budget is spent, the host's
+    circuit breaker is not closed or the request deadline would pass first.
+    """
+    if not HEDGE_ENABLED:
+        return None
+    affordable = hedge_budget.earn()
+    if not affordable or host_health(url).state != CLOSED:
+        return None
+
+    delay = fetch_durations.quantile(url, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES)
+    delay = HEDGE_DELAY if delay is None else max(HEDGE_MIN_DELAY, delay)
+    left = remaining()
+    if left is not None and left <= delay:
+        return None
+    return delay
+
+
+def start_hedge(url):
+    """Spend a hedge token for url; False when another fetch took the last one first"""
+    if not hedge_budget.spend():
+        record_hedge(url, 'denied')
+        return False
+    print(f"[HEDGE] 🐢 No answer from {host_of(url)} yet, sending a duplicate: {url}")
+    record_hedge(url, 'sent')
+    return True
+
+
+class HedgeTimer:
+    """
+    One thread starting the hedges of every hedgeable fetch as they fall due, so a fetch
+    waiting out its hedge delay holds no thread besides its own.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay, fn):
+        """Call fn() on the timer thread after delay seconds unless the returned entry is cancelled"""
+        entry = [time.monotonic() + delay, next(self._sequence), fn]
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='hedge-timer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        with self._condition:
+            entry[2] = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                fn = heapq.heappop(self._heap)[2]
+            if fn is not None:
+                try:
+                    fn()
+                except Exception as e:
+                    print(f"[HEDGE] ⚠️ Could not start a hedge: {e}")
+
+
+hedge_timer = HedgeTimer()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+    return _executor
+
+
+def hedged(url, attempt):
+    """
+    Return attempt(), a fetch of url, run on the calling thread. When it has not finished
+    after hedge_delay(url) a second attempt is started on the hedge executor, provided the
+    host has a concurrency slot free for it, and whichever copy succeeds first is returned:
+    the winner aborts the other copy's fetch (see fetcher.Abort). When both fail the first
+    copy's error is raised.
+    """
+    attempt = timed_attempt(url, attempt)
+    delay = hedge_delay(url)
+    if delay is None:
+        return attempt()
+
+    primary_abort = Abort()
+    hedge_abort = Abort()
+    state = {'primary_done': False, 'hedge': None}
+    lock = threading.Lock()
+
+    def run_hedge(health):
+        try:
+            with aborting(hedge_abort):
+                result = attempt()
+        finally:
+            health.release()
+        with lock:
+            if not state['primary_done']:
+                primary_abort.abort()
+        return result
+
+    def launch():
+        with lock:
+            if state['primary_done'] or probe_cancelled():
+                return
+            # The hedge is a request of its own against the host, so it needs a slot of its own
+            health = host_health(url)
+            if not health.try_acquire():
+                record_hedge(url, 'no_slot')
+                return
+            if not start_hedge(url):
+                health.release()
+                return
+            state['hedge'] = _get_executor().submit(contextvars.copy_context().run, run_hedge, health)
+
+    # The hedge runs in a copy of the caller's context, keeping its deadline and timings
+    context = contextvars.copy_context()
+    entry = hedge_timer.schedule(delay, lambda: context.run(launch))
+    try:
+        with aborting(primary_abort):
+            result = attempt()
+        error = None
+    except Exception as e:
+        result, error = None, e
+    hedge_timer.cancel(entry)
+    with lock:
+        state['primary_done'] = True
+        hedge = state['hedge']
+
+    if hedge is None:
+        if error is not None:
+            raise error
+        return result
+    if error is None:
+        hedge_abort.abort()
+        return result
+    try:
+        result = hedge.result()
+    except Exception:
+        raise error
+    record_hedge(url, 'won')
+    return result
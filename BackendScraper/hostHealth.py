@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from deadline import DeadlineExceeded, remaining
+
+
+# Ceiling on probes in flight against a single host, shared by every request in the process.
+# The limit actually applied adapts between 1 and this value from the host's recent health
+PROBE_PER_HOST = int(os.environ.get('SCRAPER_PROBE_PER_HOST', 4))
+
+# Outcomes older than this are forgotten when computing error rate and latency
+HEALTH_WINDOW = float(os.environ.get('SCRAPER_HEALTH_WINDOW', 60))
+
+# The breaker opens once at least MIN_SAMPLES outcomes in the window have this error rate,
+# and lets one trial request through after the cool-down
+BREAKER_MIN_SAMPLES = int(os.environ.get('SCRAPER_BREAKER_MIN_SAMPLES', 8))
+BREAKER_ERROR_RATE = float(os.environ.get('SCRAPER_BREAKER_ERROR_RATE', 0.5))
+BREAKER_COOL_DOWN = float(os.environ.get('SCRAPER_BREAKER_COOL_DOWN', 30))
+
+# Responses slower than this shrink the host's concurrency limit like errors do
+SLOW_RESPONSE = float(os.environ.get('SCRAPER_SLOW_RESPONSE', 4))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit breaker is open"""
+
+    def __init__(self, host):
+        super().__init__(f"{host} is temporarily unavailable (circuit open)")
+        self.host = host
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+class HostHealth:
+    """
+    Recent health of one upstream host.
+
+    Tracks a sliding window of outcomes, adapts the host's concurrency limit (additive
+    increase on fast successes, halving on errors or slow responses at most once a second)
+    and runs a closed -> open -> half-open circuit breaker. Used as a context manager it
+    holds one of the host's concurrency slots.
+    """
+
+    def __init__(self, host, max_concurrency=PROBE_PER_HOST):
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_started = None
+        self._trial_thread = None
+        self._last_decrease = 0.0
+        self._samples = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def _trim(self, now):
+        while self._samples and self._samples[0][0] < now - HEALTH_WINDOW:
+            self._samples.popleft()
+
+    def allow(self):
+        """Return False while the breaker is open; after the cool-down admit one trial request"""
+        now = time.time()
+        with self._condition:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < BREAKER_COOL_DOWN:
+                    return False
+                self.state = HALF_OPEN
+                print(f"[HEALTH] 🟡 {self.host} half-open, sending a trial request")
+            # A trial whose outcome was never recorded does not block the host forever
+            if self._trial_started is not None and now - self._trial_started < BREAKER_COOL_DOWN:
+                return False
+            self._trial_started = now
+            self._trial_thread = threading.get_ident()
+            return True
+
+    def release_trial(self):
+        """Give back a half-open trial claimed by this thread whose request ended without an outcome"""
+        with self._condition:
+            if self.state == HALF_OPEN and self._trial_thread == threading.get_ident():
+                self._trial_started = None
+                self._trial_thread = None
+
+    def available(self):
+        """Like allow() but without claiming the half-open trial"""
+        with self._condition:
+            return self.state != OPEN or time.time() - self.opened_at >= BREAKER_COOL_DOWN
+
+    def record(self, latency, ok):
+        now = time.time()
+        with self._condition:
+            self._samples.append((now, latency, ok))
+            self._trim(now)
+
+            if ok and latency < SLOW_RESPONSE:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            elif now - self._last_decrease >= 1:
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+            self._condition.notify_all()
+
+            if self.state == HALF_OPEN:
+                self._trial_started = None
+                self._trial_thread = None
+                if ok:
+                    self.state = CLOSED
+                    self._samples.clear()
+                    print(f"[HEALTH] 🟢 {self.host} recovered, circuit closed")
+                else:
+                    self._open(now)
+                return
+
+            if self.state == CLOSED and len(self._samples) >= BREAKER_MIN_SAMPLES:
+                errors = sum(1 for _, _, sample_ok in self._samples if not sample_ok)
+                if errors / len(self._samples) >= BREAKER_ERROR_RATE:
+                    self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        print(f"[HEALTH] 🔴 Circuit open for {self.host}, skipping it for {BREAKER_COOL_DOWN:.0f}s")
+
+    def concurrency_limit(self):
+        return max(1, int(self.limit))
+
+    def __enter__(self):
+        """Take a concurrency slot, waiting no longer than the request deadline allows"""
+        with self._condition:
+            while self._in_flight >= self.concurrency_limit():
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise DeadlineExceeded()
+                self._condition.wait(left)
+            self._in_flight += 1
+        return self
+
+    def try_acquire(self):
+        """Take a concurrency slot only if one is free right now; give it back with release()"""
+        with self._condition:
+            if self._in_flight >= self.concurrency_limit():
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def snapshot(self):
+        now = time.time()
+        with self._condition:
+            self._trim(now)
+            latencies = sorted(latency for _, latency, _ in self._samples)
+            errors = sum(1 for _, _, ok in self._samples if not ok)
+            state = self.state
+            if state == OPEN and now - self.opened_at >= BREAKER_COOL_DOWN:
+                state = HALF_OPEN
+            return {
+                'state': state,
+                'requests': len(latencies),
+                'error_rate': round(errors / len(latencies), 3) if latencies else 0.0,
+                'p50_ms': round(latencies[len(latencies) // 2] * 1000) if latencies else None,
+                'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000) if latencies else None,
+                'concurrency_limit': self.concurrency_limit(),
+                'trips': self.trips,
+                'retry_in_s': round(max(0.0, BREAKER_COOL_DOWN - (now - self.opened_at)), 1) if state == OPEN else None,
+            }
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def host_health(url_or_host):
+    """Return the process-wide HostHealth for the host of url_or_host"""
+    host = host_of(url_or_host) if '://' in url_or_host else url_or_host.lower()
+    with _hosts_lock:
+        health = _hosts.get(host)
+        if health is None:
+            health = HostHealth(host)
+            _hosts[host] = health
+        return health
+
+
+def host_available(url_or_host):
+    return host_health(url_or_host).available()
+
+
+def health_report():
+    """Breaker state and recent health for every host seen in the window, degraded hosts listed first"""
+    with _hosts_lock:
+        hosts = list(_hosts.values())
+    report = {health.host: health.snapshot() for health in hosts}
+    report = {host: snapshot for host, snapshot in report.items() if snapshot['requests'] or snapshot['state'] != CLOSED}
+    degraded = sorted(host for host, snapshot in report.items()
+                      if snapshot['state'] != CLOSED or snapshot['concurrency_limit'] < PROBE_PER_HOST)
+    return {'degraded': degraded, 'hosts': report}
@@ -0,0 +1,207 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from hostHealth import host_of
+
+
+# Requests sent with this header set get a per-stage timing breakdown added to their JSON response
+TIMING_HEADER = 'X-Scraper-Timing'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names, rendered in the Prometheus text format"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in values]
+
+
+class Histogram(Counter):
+    """Cumulative-bucket histogram of observed values, usually seconds"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (bucket_counts, count, total) in values:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', bound)])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total:.6f}")
+        return lines
+
+
+_registry = []
+
+
+def counter(name, help_text, label_names=()):
+    metric = Counter(name, help_text, label_names)
+    _registry.append(metric)
+    return metric
+
+
+def histogram(name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help_text, label_names, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+STAGE_SECONDS = histogram('scraper_stage_seconds', 'Time spent in each lookup pipeline stage', ['stage'])
+RESOLUTIONS = counter('scraper_resolutions_total', 'Lookups answered, by endpoint and winning method', ['endpoint', 'method', 'cached'])
+OUTBOUND_REQUESTS = counter('scraper_outbound_requests_total', 'Outbound HTTP requests by host and status', ['host', 'status'])
+OUTBOUND_BYTES = counter('scraper_outbound_bytes_total', 'Response body bytes read from each host', ['host'])
+HEDGED_REQUESTS = counter('scraper_hedged_requests_total', 'Duplicate fetches for slow responses: sent, won the race, denied by the hedge budget, or skipped for lack of a host slot', ['host', 'outcome'])
+HTTP_REQUESTS = counter('scraper_http_requests_total', 'API requests served, by route and status', ['route', 'status'])
+HTTP_SECONDS = histogram('scraper_http_request_seconds', 'API request latency by route', ['route'])
+
+
+class TimingBreakdown:
+    """Stage timings and outbound traffic of one API request, shared by the threads and tasks it starts"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_outbound(self, requests=0, nbytes=0):
+        with self._lock:
+            self.requests += requests
+            self.bytes += nbytes
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'total_ms': round((time.perf_counter() - self.started) * 1000, 1),
+                'stages': {stage: {'count': count, 'ms': round(seconds * 1000, 1)}
+                           for stage, (count, seconds) in self.stages.items()},
+                'outbound_requests': self.requests,
+                'outbound_bytes': self.bytes,
+            }
+
+
+# Copied into probe and request threads, so their work lands in the request that started it
+_breakdown = contextvars.ContextVar('scraper_timing_breakdown', default=None)
+
+
+def begin_request(with_breakdown):
+    """Start (or clear, so a reused worker thread does not inherit one) the current request's breakdown"""
+    breakdown = TimingBreakdown() if with_breakdown else None
+    _breakdown.set(breakdown)
+    return breakdown
+
+
+def current_breakdown():
+    return _breakdown.get()
+
+
+@contextmanager
+def timed(stage):
+    """Time a block, or a function when used as a decorator, as one run of stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown.add_stage(stage, elapsed)
+
+
+def record_outbound(url, status):
+    OUTBOUND_REQUESTS.inc(host=host_of(url), status=status)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.add_outbound(requests=1)
+
+
+def record_bytes(url, nbytes):
+    OUTBOUND_BYTES.inc(nbytes, host=host_of(url))
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.add_outbound(nbytes=nbytes)
+
+
+def record_hedge(url, outcome):
+    HEDGED_REQUESTS.inc(host=host_of(url), outcome=outcome)
+
+
+def record_resolution(endpoint, method, cached):
+    RESOLUTIONS.inc(endpoint=endpoint, method=method or 'none', cached='true' if cached else 'false')
+
+
+def record_http_request(route, status, seconds):
+    HTTP_REQUESTS.inc(route=route, status=status)
+    HTTP_SECONDS.observe(seconds, route=route)
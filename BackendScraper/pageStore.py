@@ -0,0 +1,258 @@
+import gzip
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from collections import namedtuple
+
+from cache import CACHE_DIR, get_connection
+from fetcher import fetch
+
+
+PAGE_STORE_DB = os.path.join(CACHE_DIR, 'pages.sqlite3')
+
+# Set to 0 to always download pages in full
+PAGE_STORE_ENABLED = os.environ.get('SCRAPER_PAGE_STORE', '1') == '1'
+
+# Compressed bytes kept on disk; least recently used pages are evicted past this
+PAGE_STORE_MAX_BYTES = int(float(os.environ.get('SCRAPER_PAGE_STORE_MAX_MB', 256)) * 1024 * 1024)
+
+# Stored pages younger than this are served without contacting the wiki at all; older ones
+# are revalidated with If-None-Match / If-Modified-Since
+PAGE_STORE_FRESH = float(os.environ.get('SCRAPER_PAGE_STORE_FRESH', 120))
+
+# Eviction is checked once every this many stored pages
+EVICTION_INTERVAL = 20
+
+# zstd when the optional zstandard package is installed, else gzip
+CODEC = 'zstd' if importlib.util.find_spec('zstandard') is not None else 'gzip'
+
+# A page as seen by callers: same attributes as a requests response for the ones they use
+Page = namedtuple('Page', ['status_code', 'url', 'text', 'headers'])
+
+StoredPage = namedtuple('StoredPage', ['final_url', 'text', 'etag', 'last_modified', 'stored_at', 'partial', 'size'])
+
+
+def compress(data, codec=CODEC):
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageStore:
+    """
+    Content-addressed store of fetched HTML pages.
+
+    Bodies are compressed and kept once per SHA-256 of their content however many URLs
+    point at them; each URL row keeps the validators (ETag, Last-Modified) needed to
+    revalidate it. Least recently used URLs are evicted once the compressed bodies exceed
+    max_bytes, and bodies no URL refers to any more are dropped with them.
+
+    A partial entry holds only the prefix of an episode page that streaming read before
+    stopping early; it is only served to fetch_episode_html.
+    """
+
+    def __init__(self, path=PAGE_STORE_DB, max_bytes=PAGE_STORE_MAX_BYTES, fresh=PAGE_STORE_FRESH):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fresh = fresh
+        self._connection = None
+        self._db_lock = None
+        self._counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'deduplicated': 0,
+                          'evicted': 0, 'bytes_saved': 0}
+        self._counters_lock = threading.Lock()
+        self._saves = 0
+
+    def _db(self):
+        if self._connection is None:
+            connection, lock = get_connection(self.path)
+            with lock:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS page_blobs (
+                        hash TEXT PRIMARY KEY,
+                        codec TEXT NOT NULL,
+                        body BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        compressed_size INTEGER NOT NULL
+                    )""")
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS page_urls (
+                        url TEXT PRIMARY KEY,
+                        hash TEXT NOT NULL,
+                        final_url TEXT NOT NULL,
+                        etag TEXT,
+                        last_modified TEXT,
+                        partial INTEGER NOT NULL,
+                        stored_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )""")
+                connection.execute("CREATE INDEX IF NOT EXISTS page_urls_last_access ON page_urls (last_access)")
+                connection.execute("CREATE INDEX IF NOT EXISTS page_urls_hash ON page_urls (hash)")
+            self._db_lock = lock
+            self._connection = connection
+        return self._connection, self._db_lock
+
+    def count(self, counter, amount=1):
+        with self._counters_lock:
+            self._counters[counter] += amount
+
+    def lookup(self, url, allow_partial=False):
+        """Return the StoredPage for url, or None"""
+        connection, lock = self._db()
+        with lock:
+            row = connection.execute("""
+                SELECT u.final_url, u.etag, u.last_modified, u.stored_at, u.partial, b.codec, b.body, b.size
+                FROM page_urls u JOIN page_blobs b ON b.hash = u.hash WHERE u.url = ?
+            """, (url,)).fetchone()
+            if row is None or (row[4] and not allow_partial):
+                return None
+            connection.execute("UPDATE page_urls SET last_access = ? WHERE url = ?", (time.time(), url))
+
+        final_url, etag, last_modified, stored_at, partial, codec, body, size = row
+        text = decompress(body, codec).decode('utf-8')
+        return StoredPage(final_url, text, etag, last_modified, stored_at, bool(partial), size)
+
+    def is_fresh(self, stored):
+        return time.time() - stored.stored_at < self.fresh
+
+    def conditional_headers(self, stored):
+        headers = {}
+        if stored is not None:
+            if stored.etag:
+                headers['If-None-Match'] = stored.etag
+            if stored.last_modified:
+                headers['If-Modified-Since'] = stored.last_modified
+        return headers
+
+    def served(self, stored, revalidated=False):
+        """Count a page served from the store, refreshing its age when the wiki confirmed it with a 304"""
+        self.count('revalidated' if revalidated else 'hits')
+        self.count('bytes_saved', stored.size)
+        if revalidated:
+            connection, lock = self._db()
+            with lock:
+                connection.execute("UPDATE page_urls SET stored_at = ? WHERE final_url = ? OR url = ?",
+                                   (time.time(), stored.final_url, stored.final_url))
+
+    def save(self, url, final_url, text, headers, partial=False):
+        """Store a 200 response body for url (and its final URL after redirects)"""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        etag = headers.get('ETag') if headers else None
+        last_modified = headers.get('Last-Modified') if headers else None
+
+        connection, lock = self._db()
+        with lock:
+            exists = connection.execute("SELECT 1 FROM page_blobs WHERE hash = ?", (digest,)).fetchone()
+        if exists:
+            self.count('deduplicated')
+            body = None
+        else:
+            body = compress(data)
+
+        with lock:
+            if body is not None:
+                connection.execute(
+                    "INSERT OR IGNORE INTO page_blobs (hash, codec, body, size, compressed_size) VALUES (?, ?, ?, ?, ?)",
+                    (digest, CODEC, body, len(data), len(body))
+                )
+            connection.executemany(
+                "INSERT OR REPLACE INTO page_urls (url, hash, final_url, etag, last_modified, partial, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, digest, final_url, etag, last_modified, int(partial), now, now)
+                 for key in dict.fromkeys([url, final_url])]
+            )
+            self._saves += 1
+            evict = self._saves % EVICTION_INTERVAL == 0
+        self.count('stored')
+
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used URLs, then unreferenced bodies, until under max_bytes"""
+        connection, lock = self._db()
+        with lock:
+            total = connection.execute("SELECT COALESCE(SUM(compressed_size), 0) FROM page_blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            evicted = 0
+            target = self.max_bytes * 0.9
+            while total > target:
+                urls = connection.execute(
+                    "SELECT url FROM page_urls ORDER BY last_access ASC LIMIT 50").fetchall()
+                if not urls:
+                    break
+                connection.executemany("DELETE FROM page_urls WHERE url = ?", urls)
+                evicted += len(urls)
+                connection.execute(
+                    "DELETE FROM page_blobs WHERE hash NOT IN (SELECT hash FROM page_urls)")
+                total = connection.execute("SELECT COALESCE(SUM(compressed_size), 0) FROM page_blobs").fetchone()[0]
+        self.count('evicted', evicted)
+        print(f"[PAGE_STORE] 🧹 Evicted {evicted} pages, {total / 1024 / 1024:.1f} MB stored")
+        return evicted
+
+    def stats(self):
+        connection, lock = self._db()
+        with lock:
+            urls = connection.execute("SELECT COUNT(*) FROM page_urls").fetchone()[0]
+            blobs, size, compressed = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(compressed_size), 0) FROM page_blobs"
+            ).fetchone()
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {**counters, 'codec': CODEC, 'urls': urls, 'bodies': blobs,
+                'bytes': size, 'compressed_bytes': compressed, 'max_bytes': self.max_bytes}
+
+
+page_store = PageStore()
+
+
+def fetch_page(url, **kwargs):
+    """
+    Fetch a complete HTML page through the page store. Returns a Page, or the plain
+    response when the page was not a 200 (callers only read status_code, url and text).
+    """
+    if not PAGE_STORE_ENABLED:
+        return fetch(url, **kwargs)
+
+    def fetch_with_headers(headers):
+        response = fetch(url, headers={**kwargs.pop('headers', {}), **headers}, **kwargs)
+        return response, response.text, False
+
+    response, _ = fetch_through_store(url, False, fetch_with_headers)
+    return response
+
+
+def fetch_through_store(url, allow_partial, fetch_with_headers):
+    """
+    Serve url from the store when it is fresh, otherwise call fetch_with_headers(headers)
+    with the conditional request headers and reuse the stored page on a 304.
+
+    fetch_with_headers returns (response, text, partial); returns (response, text).
+    """
+    stored = page_store.lookup(url, allow_partial)
+    if stored is not None and page_store.is_fresh(stored):
+        page_store.served(stored)
+        return Page(200, stored.final_url, stored.text, {}), stored.text
+
+    response, text, partial = fetch_with_headers(page_store.conditional_headers(stored))
+    if response.status_code == 304 and stored is not None:
+        print(f"[PAGE_STORE] ♻️ Not modified: {url}")
+        page_store.served(stored, revalidated=True)
+        return Page(200, stored.final_url, stored.text, response.headers), stored.text
+
+    page_store.count('misses')
+    if response.status_code == 200:
+        page_store.save(url, response.url, text, response.headers, partial)
+    return response, text
@@ -0,0 +1,206 @@
+import codecs
+import functools
+import importlib.util
+import os
+from html.parser import HTMLParser
+
+from fetcher import fetch
+from hedging import hedged
+from metrics import record_bytes
+from pageStore import PAGE_STORE_ENABLED, fetch_through_store
+from prober import ProbeCancelled, cancel_event, raise_if_cancelled
+
+
+# BeautifulSoup tree builder: "auto" picks lxml when it is installed, else the pure-Python parser
+PARSER_SETTING = os.environ.get('SCRAPER_HTML_PARSER', 'auto')
+
+
+def available_parsers():
+    parsers = ['html.parser']
+    if importlib.util.find_spec('lxml') is not None:
+        parsers.insert(0, 'lxml')
+    if importlib.util.find_spec('html5lib') is not None:
+        parsers.append('html5lib')
+    return parsers
+
+
+def _resolve_parser(setting):
+    if setting == 'auto':
+        return available_parsers()[0]
+    if setting not in available_parsers():
+        print(f"[PARSER] ⚠️ Parser '{setting}' is not installed, using html.parser")
+        return 'html.parser'
+    return setting
+
+
+PARSER = _resolve_parser(PARSER_SETTING)
+
+
+def _classes(attrs):
+    value = (attrs or {}).get('class') or ''
+    return value if isinstance(value, str) else ' '.join(value)
+
+
+def _episode_page_tag(name, attrs=None):
+    """Keep <title>, <h1> and the portable-infobox data rows - everything episode validation reads"""
+    if name in ('title', 'h1'):
+        return True
+    if name == 'div':
+        classes = _classes(attrs)
+        return 'pi-item' in classes and 'pi-data' in classes
+    return False
+
+
+def _wiki_header_tag(name, attrs=None):
+    return name == 'div' and 'page-header__title-wrapper' in _classes(attrs).split()
+
+
+# Strainers limit tree building to the subtrees a caller actually inspects. They are kept as
+# tag filters and turned into SoupStrainers on first use, so importing this module stays cheap
+EPISODE_PAGE_STRAINER = _episode_page_tag
+WIKI_HEADER_STRAINER = _wiki_header_tag
+
+
+@functools.lru_cache(maxsize=None)
+def _soup_strainer(tag_filter):
+    from bs4 import SoupStrainer
+    return SoupStrainer(tag_filter)
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    """Parse markup with the configured backend, optionally building only the strained subtrees"""
+    from bs4 import BeautifulSoup
+
+    if callable(parse_only):
+        parse_only = _soup_strainer(parse_only)
+    return BeautifulSoup(markup, parser or PARSER, parse_only=parse_only)
+
+
+# Stop downloading an episode page once everything validation reads has been seen
+STREAMING_ENABLED = os.environ.get('SCRAPER_STREAMING_FETCH', '1') == '1'
+STREAM_CHUNK_SIZE = int(os.environ.get('SCRAPER_STREAM_CHUNK_SIZE', 16384))
+
+# After an early stop, drain at most this many remaining bytes to keep the connection alive
+STREAM_DRAIN_LIMIT = int(os.environ.get('SCRAPER_STREAM_DRAIN_LIMIT', 65536))
+
+
+class EpisodePageScanner(HTMLParser):
+    """Incremental scanner that notices when <title>, the first <h1> and the portable infobox have closed"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.title_done = False
+        self.heading_done = False
+        self.infobox_done = False
+        self._infobox_depth = 0
+
+    @property
+    def complete(self):
+        return self.title_done and self.heading_done and self.infobox_done
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'aside':
+            return
+        if self._infobox_depth:
+            self._infobox_depth += 1
+        elif not self.infobox_done and 'portable-infobox' in (dict(attrs).get('class') or '').split():
+            self._infobox_depth = 1
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.title_done = True
+        elif tag == 'h1':
+            self.heading_done = True
+        elif tag == 'aside' and self._infobox_depth:
+            self._infobox_depth -= 1
+            if not self._infobox_depth:
+                self.infobox_done = True
+
+
+def read_episode_page(response, cancel=None):
+    """
+    Read an episode page from a response fetched with stream=True.
+
+    Feeds the body to EpisodePageScanner chunk by chunk and stops reading as soon as the
+    title, first heading and portable infobox are complete; pages where they never all
+    appear are read in full. Returns (html, stopped_early).
+
+    When the cancel event is set mid-body the response is closed and ProbeCancelled raised.
+    """
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    scanner = EpisodePageScanner()
+    parts = []
+    received = 0
+    stopped_early = False
+
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise ProbeCancelled()
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            scanner.feed(text)
+            if scanner.complete:
+                stopped_early = True
+                break
+        parts.append(decoder.decode(b'', final=True))
+    finally:
+        record_bytes(response.url, received)
+        _release(response, stopped_early)
+
+    return ''.join(parts), stopped_early
+
+
+def _release(response, stopped_early):
+    """Return the connection to the pool when little is left to read, otherwise drop it"""
+    if stopped_early:
+        try:
+            length = int(response.headers.get('Content-Length', ''))
+            if length - response.raw.tell() <= STREAM_DRAIN_LIMIT:
+                for _ in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    pass
+        except (ValueError, AttributeError):
+            pass
+        except Exception as e:
+            print(f"[PARSER] ⚠️ Failed to drain response: {e}")
+    response.close()
+
+
+def fetch_episode_html(url, **kwargs):
+    """
+    Fetch an episode page, streaming with early exit when enabled. Returns (response, html).
+
+    Goes through the page store, so a recently stored page costs no request and an older
+    one is revalidated; the response is then a pageStore.Page. A fetch that is slower than
+    the host usually answers is hedged with a duplicate (see hedging.py).
+
+    Inside probe_in_order, a probe cancelled before or while the page is read raises
+    ProbeCancelled and its connection is closed.
+    """
+    cancel = cancel_event()
+
+    def fetch_once(headers):
+        raise_if_cancelled()
+        request_kwargs = {**kwargs, 'headers': {**kwargs.get('headers', {}), **headers}} if headers else kwargs
+        if not STREAMING_ENABLED:
+            response = fetch(url, **request_kwargs)
+            return response, response.text, False
+
+        response = fetch(url, stream=True, **request_kwargs)
+        if response.status_code != 200:
+            response.close()
+            return response, '', False
+
+        html, stopped_early = read_episode_page(response, cancel)
+        if stopped_early:
+            print(f"[PARSER] ✂️ Stopped reading {url} after {len(html)} characters")
+        return response, html, stopped_early
+
+    def fetch_with_headers(headers):
+        return hedged(url, lambda: fetch_once(headers))
+
+    if not PAGE_STORE_ENABLED:
+        response, html, _ = fetch_with_headers({})
+        return response, html
+    return fetch_through_store(url, True, fetch_with_headers)
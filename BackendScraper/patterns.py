@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+from cache import CACHE_DB, get_connection
+
+
+# A template is "confident" for a wiki once it has this many hits at this hit rate
+CONFIDENT_MIN_HITS = int(os.environ.get('SCRAPER_PATTERN_CONFIDENT_HITS', 3))
+CONFIDENT_MIN_RATE = float(os.environ.get('SCRAPER_PATTERN_CONFIDENT_RATE', 0.8))
+
+# Optional pruning of templates that never matched on a wiki whose convention is known
+PRUNE_ENABLED = os.environ.get('SCRAPER_PATTERN_PRUNE', '0') == '1'
+PRUNE_MIN_MISSES = int(os.environ.get('SCRAPER_PATTERN_PRUNE_MISSES', 5))
+
+
+class PatternStats:
+    """
+    Persistent per-wiki hit/miss counters for the episode URL templates.
+
+    Counters are kept in SQLite so the learned ranking survives restarts, and mirrored in
+    memory so ranking a request never touches the disk after the first lookup per wiki.
+    """
+
+    def __init__(self, path=CACHE_DB):
+        self.path = path
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._db_lock = None
+
+    def _db(self):
+        if self._connection is None:
+            connection, lock = get_connection(self.path)
+            with lock:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS pattern_stats (
+                        subdomain TEXT NOT NULL,
+                        template TEXT NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        misses INTEGER NOT NULL DEFAULT 0,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (subdomain, template)
+                    )""")
+            self._db_lock = lock
+            self._connection = connection
+        return self._connection, self._db_lock
+
+    def _load(self, subdomain):
+        with self._lock:
+            stats = self._stats.get(subdomain)
+        if stats is not None:
+            return stats
+
+        connection, lock = self._db()
+        with lock:
+            rows = connection.execute(
+                "SELECT template, hits, misses FROM pattern_stats WHERE subdomain = ?", (subdomain,)
+            ).fetchall()
+        stats = {template: [hits, misses] for template, hits, misses in rows}
+        with self._lock:
+            return self._stats.setdefault(subdomain, stats)
+
+    def record(self, subdomain, hit_template=None, missed_templates=()):
+        """Count one hit for hit_template and one miss for each template in missed_templates"""
+        subdomain = subdomain.lower()
+        updates = [(template, 0, 1) for template in dict.fromkeys(missed_templates) if template != hit_template]
+        if hit_template:
+            updates.append((hit_template, 1, 0))
+        if not updates:
+            return
+
+        stats = self._load(subdomain)
+        with self._lock:
+            for template, hits, misses in updates:
+                counters = stats.setdefault(template, [0, 0])
+                counters[0] += hits
+                counters[1] += misses
+
+        now = time.time()
+        connection, lock = self._db()
+        with lock:
+            connection.executemany("""
+                INSERT INTO pattern_stats (subdomain, template, hits, misses, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (subdomain, template) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    misses = misses + excluded.misses,
+                    updated_at = excluded.updated_at
+            """, [(subdomain, template, hits, misses, now) for template, hits, misses in updates])
+
+    def ranked(self, subdomain, templates):
+        """
+        Return templates reordered by smoothed historical hit rate for subdomain, dropping
+        pruned ones. Templates without history keep their relative default order.
+        """
+        stats = self._load(subdomain.lower())
+        if not stats:
+            return list(templates)
+
+        with self._lock:
+            snapshot = {template: tuple(counters) for template, counters in stats.items()}
+
+        def score(template):
+            hits, misses = snapshot.get(template, (0, 0))
+            return (hits + 1) / (hits + misses + 2)
+
+        ordered = sorted(templates, key=score, reverse=True)
+        if PRUNE_ENABLED and any(hits >= CONFIDENT_MIN_HITS for hits, _ in snapshot.values()):
+            ordered = [template for template in ordered
+                       if not (snapshot.get(template, (0, 0))[0] == 0
+                               and snapshot.get(template, (0, 0))[1] >= PRUNE_MIN_MISSES)]
+        return ordered
+
+    def confident_template(self, subdomain):
+        """Return the template that reliably matches on subdomain, or None"""
+        stats = self._load(subdomain.lower())
+        with self._lock:
+            best = None
+            for template, (hits, misses) in stats.items():
+                if hits >= CONFIDENT_MIN_HITS and hits / (hits + misses) >= CONFIDENT_MIN_RATE:
+                    if best is None or hits > stats[best][0]:
+                        best = template
+            return best
+
+    def snapshot(self, subdomain):
+        stats = self._load(subdomain.lower())
+        with self._lock:
+            return {template: {'hits': hits, 'misses': misses} for template, (hits, misses) in stats.items()}
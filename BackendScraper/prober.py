@@ -0,0 +1,153 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from deadline import DeadlineExceeded, expired
+from fetcher import Abort, FetchAborted, aborting
+from hostHealth import PROBE_PER_HOST, host_health  # noqa: F401 - PROBE_PER_HOST is re-exported
+
+
+# Upper bound on probes in flight for a single search stage
+PROBE_WORKERS = int(os.environ.get('SCRAPER_PROBE_WORKERS', 6))
+
+# Threads shared by the probes of every request
+PROBE_THREADS = int(os.environ.get('SCRAPER_PROBE_THREADS', 256))
+
+
+class ProbeCancelled(Exception):
+    """Raised inside a probe once a higher-ranked candidate has already succeeded"""
+
+    def __init__(self):
+        super().__init__("probe cancelled")
+
+
+# Set once the running probe's result is no longer wanted, or None outside probe_in_order
+_cancel_event = contextvars.ContextVar('scraper_probe_cancel', default=None)
+
+
+def cancel_event():
+    """The threading.Event cancelling the current probe, or None outside probe_in_order"""
+    return _cancel_event.get()
+
+
+def probe_cancelled():
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def raise_if_cancelled():
+    if probe_cancelled():
+        raise ProbeCancelled()
+
+
+def host_semaphore(url):
+    """
+    Return the process-wide limiter on concurrent probes against the host of url. Its limit
+    adapts between 1 and PROBE_PER_HOST with the host's recent health (see hostHealth).
+    """
+    return host_health(url)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PROBE_THREADS, thread_name_prefix='probe')
+    return _executor
+
+
+def probe_in_order(candidates, check, max_workers=None, rejected=None):
+    """
+    Run check(candidate) for every candidate URL concurrently while keeping priority order.
+
+    Returns (index, candidate, result) for the first-ranked candidate whose check returned
+    a truthy result, or None when every candidate failed. Candidates are started in order,
+    at most max_workers at a time, each holding a slot of its host until its check returns.
+    Once a candidate succeeds no candidate ranked below it starts, and once the request
+    deadline has passed no further probe starts. Candidates that were actually checked and
+    failed are appended to `rejected` when a list is given.
+
+    Probes still running when they are no longer wanted are cancelled: their fetches are
+    aborted (see fetcher.Abort), cancel_event() is set for the checks that look at it, and
+    their results are discarded. probe_in_order returns only once they have all finished.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return None
+
+    workers = max(1, min(max_workers or PROBE_WORKERS, len(candidates)))
+    pending_marker = object()
+    results = [pending_marker] * len(candidates)
+    events = [threading.Event() for _ in candidates]
+    aborts = [Abort() for _ in candidates]
+
+    def run(index):
+        url = candidates[index]
+        _cancel_event.set(events[index])
+        with host_semaphore(url), aborting(aborts[index]):
+            if events[index].is_set() or expired():
+                raise ProbeCancelled()
+            return check(url)
+
+    def cancel(index):
+        events[index].set()
+        aborts[index].abort()
+
+    executor = _get_executor()
+    running = {}
+    best = len(candidates)
+    next_start = 0
+    next_index = 0
+    try:
+        while True:
+            while len(running) < workers and next_start < best:
+                if expired():
+                    results[next_start:] = [None] * (len(candidates) - next_start)
+                    next_start = len(candidates)
+                    break
+                # Each probe runs in a copy of the caller's context so its timings land in the caller's request
+                running[executor.submit(contextvars.copy_context().run, run, next_start)] = next_start
+                next_start += 1
+            if not running:
+                return None
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    results[index] = future.result()
+                except (ProbeCancelled, FetchAborted, DeadlineExceeded):
+                    results[index] = None
+                    continue
+                except Exception as e:
+                    print(f"[PROBE] ⚠️ Probe failed for {candidates[index]}: {e}")
+                    results[index] = None
+
+                # A probe cancelled mid-flight may have failed only because it was cut short
+                if events[index].is_set():
+                    results[index] = None
+                    continue
+                if not results[index] and rejected is not None:
+                    rejected.append(candidates[index])
+                if results[index] and index < best:
+                    best = index
+                    for other in running.values():
+                        if other > index:
+                            cancel(other)
+
+            # Only hand back a hit once every higher-priority candidate has failed
+            while next_index < len(candidates) and results[next_index] is not pending_marker:
+                if results[next_index]:
+                    return next_index, candidates[next_index], results[next_index]
+                next_index += 1
+
+    finally:
+        for index in running.values():
+            cancel(index)
+        wait(running)
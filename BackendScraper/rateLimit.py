@@ -0,0 +1,53 @@
+import os
+import threading
+import time
+
+
+# Requests per second each search engine gets from this process, and how many may go out back to back
+SEARCH_RATE = float(os.environ.get('SCRAPER_SEARCH_RATE', 2))
+SEARCH_BURST = float(os.environ.get('SCRAPER_SEARCH_BURST', 4))
+
+# A search that would have to wait longer than this for its engine's rate limit is skipped
+SEARCH_MAX_WAIT = float(os.environ.get('SCRAPER_SEARCH_MAX_WAIT', 5))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    reserve() takes a token immediately and returns how long the caller has to sleep before
+    using it.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """Return the seconds to wait for the reserved token, or None when that exceeds max_wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def engine_bucket(name):
+    """Return the process-wide token bucket for one search engine"""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = TokenBucket(SEARCH_RATE, SEARCH_BURST)
+            _buckets[name] = bucket
+        return bucket
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import deque
+
+from hostHealth import host_available, host_of
+
+
+# Background threads re-resolving entries that were served stale
+REFRESH_WORKERS = int(os.environ.get('SCRAPER_REFRESH_WORKERS', 4))
+
+# Refreshes waiting beyond this many are dropped; the stale entry is simply served again
+REFRESH_QUEUE_SIZE = int(os.environ.get('SCRAPER_REFRESH_QUEUE_SIZE', 256))
+
+# Refreshes running against one host at a time, so a burst of stale hits does not hammer a wiki
+REFRESH_PER_HOST = int(os.environ.get('SCRAPER_REFRESH_PER_HOST', 2))
+
+
+class _Refresh:
+    def __init__(self, key, host, fn, low_priority):
+        self.key = key
+        self.host = host
+        self.fn = fn
+        self.low_priority = low_priority
+
+
+class Refresher:
+    """
+    Bounded, deduplicated queue of background refreshes run by a small worker pool.
+
+    submit() never blocks: a key already queued or running is not queued again, and a full
+    queue drops the refresh. Workers take the oldest refresh whose host is below per_host
+    running refreshes, and drop refreshes for hosts whose circuit breaker is open.
+
+    Low-priority work (prefetches) only runs when no regular refresh can, and is refused
+    once the queue is half full so it never crowds out refreshes of entries already served.
+    """
+
+    def __init__(self, workers=REFRESH_WORKERS, max_queue=REFRESH_QUEUE_SIZE, per_host=REFRESH_PER_HOST):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_host = per_host
+        self._queue = deque()
+        self._keys = set()
+        self._running = {}
+        self._threads = []
+        self._condition = threading.Condition()
+        self.counters = {'submitted': 0, 'deduplicated': 0, 'dropped': 0, 'skipped': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, key, url, fn, low_priority=False):
+        """Queue fn() to refresh key, whose upstream is the host of url. Returns True when queued"""
+        with self._condition:
+            if key in self._keys:
+                self.counters['deduplicated'] += 1
+                return False
+            if len(self._queue) >= (self.max_queue // 2 if low_priority else self.max_queue):
+                self.counters['dropped'] += 1
+                if not low_priority:
+                    print(f"[REFRESH] ⚠️ Queue full, not refreshing {key}")
+                return False
+            self._keys.add(key)
+            self._queue.append(_Refresh(key, host_of(url), fn, low_priority))
+            self.counters['submitted'] += 1
+            self._start_workers()
+            self._condition.notify()
+        return True
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'refresh-{len(self._threads)}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        with self._condition:
+            while True:
+                for low_priority in (False, True):
+                    for index, refresh in enumerate(self._queue):
+                        if refresh.low_priority == low_priority and self._running.get(refresh.host, 0) < self.per_host:
+                            del self._queue[index]
+                            self._running[refresh.host] = self._running.get(refresh.host, 0) + 1
+                            return refresh
+                self._condition.wait()
+
+    def _finish(self, refresh, outcome):
+        with self._condition:
+            self._running[refresh.host] -= 1
+            self._keys.discard(refresh.key)
+            self.counters[outcome] += 1
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            refresh = self._next()
+            if not host_available(refresh.host):
+                print(f"[REFRESH] ⛔ {refresh.host} unavailable, keeping stale {refresh.key}")
+                self._finish(refresh, 'skipped')
+                continue
+            try:
+                print(f"[REFRESH] 🔄 Refreshing {refresh.key}")
+                refresh.fn()
+            except Exception as e:
+                print(f"[REFRESH] ❌ Refresh of {refresh.key} failed: {e}")
+                self._finish(refresh, 'failed')
+            else:
+                self._finish(refresh, 'completed')
+
+    def stats(self):
+        with self._condition:
+            return {
+                'queued': len(self._queue),
+                'running': sum(self._running.values()),
+                **self.counters,
+            }
+
+
+refresher = Refresher()
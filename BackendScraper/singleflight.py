@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+import uuid
+
+from cache import CACHE_DB, get_connection
+from deadline import DeadlineExceeded, expired, remaining
+
+
+# Coalesce across worker processes as well, through a lease row in the shared SQLite cache
+SHARED_ENABLED = os.environ.get('SCRAPER_SINGLEFLIGHT_SHARED', '0') == '1'
+
+# A worker holding a lease longer than this is assumed dead and the lease can be taken over
+LEASE_SECONDS = float(os.environ.get('SCRAPER_SINGLEFLIGHT_LEASE', 60))
+
+# How often a worker waiting on another worker's lease re-checks the cache
+POLL_INTERVAL = float(os.environ.get('SCRAPER_SINGLEFLIGHT_POLL', 0.2))
+
+
+class LeaseTable:
+    """Cross-process leases on keys, stored in the shared SQLite cache database"""
+
+    def __init__(self, path=CACHE_DB):
+        self.path = path
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._connection = None
+        self._db_lock = None
+
+    def _db(self):
+        if self._connection is None:
+            connection, lock = get_connection(self.path)
+            with lock:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS flight_leases (
+                        key TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )""")
+            self._db_lock = lock
+            self._connection = connection
+        return self._connection, self._db_lock
+
+    def acquire(self, key, ttl=LEASE_SECONDS):
+        """Take the lease on key unless another live owner holds it; returns True when acquired"""
+        now = time.time()
+        connection, lock = self._db()
+        with lock:
+            connection.execute("DELETE FROM flight_leases WHERE key = ? AND expires_at <= ?", (key, now))
+            return connection.execute(
+                "INSERT OR IGNORE INTO flight_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + ttl)
+            ).rowcount == 1
+
+    def release(self, key):
+        connection, lock = self._db()
+        with lock:
+            connection.execute("DELETE FROM flight_leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+_leases = None
+_leases_lock = threading.Lock()
+
+
+def get_leases():
+    global _leases
+    with _leases_lock:
+        if _leases is None:
+            _leases = LeaseTable()
+        return _leases
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.shared = False
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs fn(); callers arriving while it is in flight wait for
+    it and receive the same value (or exception). With shared=True, callers in other worker
+    processes coalesce too: only the lease holder runs fn(), the others poll recheck() (the
+    cache lookup) until the holder has stored its result.
+
+    Waiting on another caller or worker is bounded by the request deadline: once it has
+    passed, do() raises DeadlineExceeded while the resolution goes on for everyone else.
+    """
+
+    def __init__(self, name, shared=SHARED_ENABLED, lease=LEASE_SECONDS):
+        self.name = name
+        self.shared = shared
+        self.lease = lease
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, recheck=None):
+        """
+        Return (value, shared) for key, where shared is True when the value was produced by
+        another caller rather than by running fn() here.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            print(f"[FLIGHT] 🔗 Joined in-flight {self.name} resolution for {key}")
+            if not call.done.wait(remaining()):
+                raise DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value, call.shared = self._run(key, fn, recheck)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, call.shared
+
+    def _run(self, key, fn, recheck):
+        if not self.shared or recheck is None:
+            return fn(), False
+
+        leases = get_leases()
+        lease_key = f"{self.name}|{key}"
+        lease_expires = time.time() + self.lease
+        acquired = leases.acquire(lease_key, self.lease)
+        while not acquired:
+            value = recheck()
+            if value is not None:
+                print(f"[FLIGHT] 🔗 Another worker resolved {self.name} {key}")
+                return value, True
+            if time.time() >= lease_expires:
+                break
+            if expired():
+                raise DeadlineExceeded()
+            left = remaining()
+            time.sleep(POLL_INTERVAL if left is None else min(POLL_INTERVAL, left))
+            acquired = leases.acquire(lease_key, self.lease)
+
+        try:
+            # Another worker may have stored the result between our cache miss and the lease
+            value = recheck()
+            if value is not None:
+                return value, True
+            return fn(), False
+        finally:
+            if acquired:
+                leases.release(lease_key)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
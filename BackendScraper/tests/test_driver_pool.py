@@ -0,0 +1,172 @@
+"""
+DriverPool checkout, recycling and failure handling with fake browsers standing in for Chrome.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driverPool import DriverPool, DriverUnavailable  # noqa: E402
+
+
+class FakeDriver:
+    """The part of a selenium driver DriverPool uses; `rss_mb` is what the pool's rss_reader reports"""
+
+    def __init__(self, number):
+        self.number = number
+        self.page_source = '<html></html>'
+        self.rss_mb = 100
+        self.healthy = True
+        self.fail_loads = False
+        self.quit_called = False
+
+    def get(self, url):
+        if self.fail_loads:
+            raise RuntimeError("tab crashed")
+        self.page_source = f'<html><div class="portable-infobox"><div class="pi-data">{url}</div></div></html>'
+
+    def set_page_load_timeout(self, timeout):
+        pass
+
+    def find_element(self, by, selector):
+        return object()
+
+    def execute_script(self, script, *args):
+        if not self.healthy:
+            raise RuntimeError("browser is gone")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.drivers = []
+
+    def make_pool(self, size=1, **kwargs):
+        def factory():
+            driver = FakeDriver(len(self.drivers))
+            self.drivers.append(driver)
+            return driver
+
+        options = {'max_pages': 50, 'max_rss_mb': 700, 'checkout_timeout': 1, 'rss_reader': lambda driver: driver.rss_mb}
+        pool = DriverPool(size, factory, **{**options, **kwargs})
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuses_a_warm_driver(self):
+        pool = self.make_pool()
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_checkout_times_out_while_every_driver_is_busy(self):
+        pool = self.make_pool(size=1)
+        with pool.checkout():
+            started = time.monotonic()
+            with self.assertRaises(DriverUnavailable):
+                with pool.checkout(timeout=0.2):
+                    pass
+            self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+        # Once given back the driver is available again
+        with pool.checkout(timeout=0.2) as driver:
+            self.assertIs(driver, self.drivers[0])
+
+    def test_waiting_checkout_gets_the_released_driver(self):
+        pool = self.make_pool(size=1)
+        borrowed = []
+
+        def borrow():
+            with pool.checkout(timeout=2) as driver:
+                borrowed.append(driver)
+
+        with pool.checkout():
+            waiter = threading.Thread(target=borrow)
+            waiter.start()
+            time.sleep(0.1)
+            self.assertEqual(borrowed, [])
+        waiter.join(2)
+        self.assertEqual(borrowed, [self.drivers[0]])
+
+    def test_recycles_after_max_pages(self):
+        pool = self.make_pool(max_pages=3)
+        for _ in range(3):
+            with pool.checkout():
+                pass
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+        with pool.checkout() as driver:
+            self.assertIs(driver, self.drivers[1])
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_recycles_on_memory_growth(self):
+        pool = self.make_pool(max_rss_mb=500)
+        with pool.checkout() as driver:
+            driver.rss_mb = 300
+        self.assertFalse(self.drivers[0].quit_called)
+
+        with pool.checkout() as driver:
+            driver.rss_mb = 900
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.stats(), {'size': 1, 'open': 0, 'idle': 0, 'created': 1, 'recycled': 1,
+                                        'unhealthy': 0, 'timeouts': 0})
+
+    def test_discards_a_driver_whose_render_failed(self):
+        pool = self.make_pool()
+        with self.assertRaises(RuntimeError):
+            with pool.checkout() as driver:
+                raise RuntimeError("render failed")
+        self.assertTrue(driver.quit_called)
+        self.assertEqual(pool.stats()['unhealthy'], 1)
+
+        with pool.checkout() as replacement:
+            self.assertIsNot(replacement, driver)
+
+    def test_discards_an_idle_driver_that_fails_its_health_check(self):
+        pool = self.make_pool()
+        with pool.checkout() as driver:
+            pass
+        driver.healthy = False
+
+        with pool.checkout() as replacement:
+            self.assertIsNot(replacement, driver)
+        self.assertTrue(driver.quit_called)
+        self.assertEqual(pool.stats()['unhealthy'], 1)
+
+    def test_render_page(self):
+        pool = self.make_pool()
+        html = pool.render_page('https://haikyuu.fandom.com/wiki/Episode_1')
+        self.assertIn('https://haikyuu.fandom.com/wiki/Episode_1', html)
+
+        # A failed load returns None and replaces the browser
+        self.drivers[0].fail_loads = True
+        self.assertIsNone(pool.render_page('https://haikyuu.fandom.com/wiki/Episode_2'))
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertIsNotNone(pool.render_page('https://haikyuu.fandom.com/wiki/Episode_2'))
+        self.assertEqual(len(self.drivers), 2)
+
+    def test_closed_pool_refuses_checkouts(self):
+        pool = self.make_pool()
+        with pool.checkout() as driver:
+            pass
+        pool.close()
+        self.assertTrue(driver.quit_called)
+        with self.assertRaises(DriverUnavailable):
+            with pool.checkout():
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
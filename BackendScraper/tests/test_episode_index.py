@@ -0,0 +1,147 @@
+"""
+EpisodeIndex builds and refreshes against recorded api.php and list page responses.
+
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import episodeIndex  # noqa: E402
+from deadline import DeadlineExceeded  # noqa: E402
+from episodeIndex import MISS_REFRESH_INTERVAL, REFRESH_INTERVAL, EpisodeIndex  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200, text=''):
+        self.data = data
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+ALLPAGES = {'query': {'allpages': [{'title': 'Episode 1'}, {'title': 'The First Step'}, {'title': 'Episode 2'}]}}
+RECENT = {'query': {'recentchanges': [{'title': 'Episode 3'}]}}
+EMPTY = {'query': {}}
+
+
+class FakeWiki:
+    """Answers api.php queries from recorded responses, or fails them while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.calls = []
+
+    def fetch(self, url, params=None, **kwargs):
+        self.calls.append((url, dict(params or {})))
+        if self.down:
+            raise DeadlineExceeded()
+        list_name = params['list']
+        if list_name == 'allpages':
+            return FakeResponse(ALLPAGES)
+        if list_name == 'recentchanges':
+            return FakeResponse(RECENT)
+        return FakeResponse(EMPTY)
+
+    def fetch_page(self, url, **kwargs):
+        self.calls.append((url, {}))
+        raise ConnectionError("list pages down too")
+
+
+class FakeRefresher:
+    """Records submitted work so the test decides when the background build runs"""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, key, url, fn, low_priority=False):
+        self.pending.append(fn)
+        return True
+
+    def run(self):
+        pending, self.pending = self.pending, []
+        for fn in pending:
+            fn()
+
+
+class EpisodeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.wiki = FakeWiki()
+        self.refresher = FakeRefresher()
+        for name, value in (('fetch', self.wiki.fetch), ('fetch_page', self.wiki.fetch_page),
+                            ('refresher', self.refresher)):
+            patcher = mock.patch.object(episodeIndex, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.index = EpisodeIndex(os.path.join(self.directory, 'cache.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_lookup_builds_in_background(self):
+        self.assertEqual(self.index.lookup('naruto', 'The First Step', 1), [])
+        self.assertEqual(self.wiki.calls, [])
+
+        self.refresher.run()
+        urls = self.index.lookup('naruto', 'The First Step', 1)
+        self.assertEqual(urls, ['https://naruto.fandom.com/wiki/Episode_1',
+                                'https://naruto.fandom.com/wiki/The_First_Step'])
+
+    def test_failed_build_is_not_saved(self):
+        self.wiki.down = True
+        self.index.lookup('naruto', '', 1)
+        self.refresher.run()
+        self.assertIsNone(self.index._load('naruto'))
+
+        # Retried once MISS_REFRESH_INTERVAL has passed, and found after the API recovered
+        self.index.lookup('naruto', '', 1)
+        self.assertEqual(self.refresher.pending, [])
+        self.index._attempted_at['naruto'] -= MISS_REFRESH_INTERVAL + 1
+        self.wiki.down = False
+        self.index.lookup('naruto', '', 1)
+        self.refresher.run()
+        self.assertEqual(self.index.lookup('naruto', '', 2), ['https://naruto.fandom.com/wiki/Episode_2'])
+
+    def test_failed_refresh_keeps_refreshed_at(self):
+        self.index.update('naruto')
+        refreshed_at = self.index._load('naruto')['refreshed_at'] - REFRESH_INTERVAL
+        self.index._load('naruto')['refreshed_at'] = refreshed_at
+
+        self.wiki.down = True
+        self.index.refresh('naruto')
+        self.assertEqual(self.index._load('naruto')['refreshed_at'], refreshed_at)
+
+        self.wiki.down = False
+        self.index.refresh('naruto')
+        self.assertGreater(self.index._load('naruto')['refreshed_at'], refreshed_at)
+        self.assertEqual(self.index.lookup('naruto', '', 3), ['https://naruto.fandom.com/wiki/Episode_3'])
+
+    def test_miss_refreshes_api_index_in_background(self):
+        self.index.update('naruto')
+        self.index._load('naruto')['refreshed_at'] = time.time() - MISS_REFRESH_INTERVAL - 1
+        self.wiki.calls.clear()
+        self.assertEqual(self.index.lookup('naruto', '', 3), [])
+        self.assertEqual(self.wiki.calls, [])
+
+        # The refresh swaps in a new index instead of adding to the one readers hold
+        before = self.index._load('naruto')
+        self.refresher.run()
+        self.assertNotIn('3', before['by_number'])
+        self.assertEqual(self.index.lookup('naruto', '', 3), ['https://naruto.fandom.com/wiki/Episode_3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
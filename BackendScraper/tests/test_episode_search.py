@@ -0,0 +1,161 @@
+"""
+The search engine stage (google_episode_search) against stubbed Google and DuckDuckGo
+result pages: priority order, the winning-search-only rule, engine rate limits and the
+SERP cache.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import EScraper  # noqa: E402
+from cache import MemoryTTLCache  # noqa: E402
+from prober import PROBE_WORKERS  # noqa: E402
+from rateLimit import TokenBucket  # noqa: E402
+
+
+SUBDOMAIN = 'haikyuu'
+TITLE = 'The End and the Beginning'
+NUMBER = '1'
+
+
+def wiki(path):
+    return f"https://{SUBDOMAIN}.fandom.com/wiki/{path}"
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+def google_serp(urls):
+    return ''.join(f'<div class="g"><a href="/url?q={url}&amp;sa=U">{url}</a></div>' for url in urls)
+
+
+def duckduckgo_serp(urls):
+    return ''.join(f'<div class="result"><a class="result__a" href="{url}">{url}</a></div>' for url in urls)
+
+
+class StubSearchEngines:
+    """Serves a results page per search URL, optionally after a delay; unknown searches find nothing"""
+
+    def __init__(self):
+        self.results = {}
+        self.delays = {}
+        self.status = {}
+        self.fetched = []
+        self._lock = threading.Lock()
+
+    def fetch(self, url, **kwargs):
+        with self._lock:
+            self.fetched.append(url)
+        time.sleep(self.delays.get(url, 0))
+        if url in self.status:
+            return FakeResponse('', self.status[url])
+        urls = self.results.get(url, [])
+        serp = google_serp(urls) if url.startswith('https://www.google.com/') else duckduckgo_serp(urls)
+        return FakeResponse(serp)
+
+
+class GoogleEpisodeSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.engines = StubSearchEngines()
+        self.buckets = {}
+        patches = [
+            mock.patch.object(EScraper, 'fetch', self.engines.fetch),
+            mock.patch.object(EScraper, 'serp_cache', MemoryTTLCache(60)),
+            mock.patch.object(EScraper, 'engine_bucket', self.bucket),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # In priority order: most specific query first, Google before DuckDuckGo
+        self.searches = [
+            url
+            for query in EScraper.episode_search_queries(SUBDOMAIN, TITLE, NUMBER)
+            for _, url in EScraper.search_engine_urls(query)
+        ]
+
+    def bucket(self, engine_name):
+        return self.buckets.setdefault(engine_name, TokenBucket(rate=100, burst=100))
+
+    def search(self):
+        return EScraper.google_episode_search(SUBDOMAIN, TITLE, NUMBER)
+
+    def test_searches_are_in_priority_order(self):
+        self.assertEqual(len(self.searches), 10)
+        self.assertTrue(self.searches[0].startswith('https://www.google.com/'))
+        self.assertTrue(self.searches[1].startswith('https://duckduckgo.com/'))
+        self.assertIn(EScraper.quote_plus(f'"episode {NUMBER}" "{TITLE}"'), self.searches[0])
+
+    def test_higher_priority_search_wins_even_when_slower(self):
+        self.engines.results[self.searches[0]] = [wiki('The_End_and_the_Beginning')]
+        self.engines.delays[self.searches[0]] = 0.2
+        self.engines.results[self.searches[1]] = [wiki('Episode_1')]
+        self.assertEqual(self.search(), [wiki('The_End_and_the_Beginning')])
+
+    def test_only_the_winning_search_is_used(self):
+        # Google finds nothing for the first query; DuckDuckGo's results for it win and the
+        # results of the less specific queries are not merged in
+        self.engines.results[self.searches[1]] = [wiki('The_End_and_the_Beginning'), wiki('Episode_1')]
+        self.engines.results[self.searches[2]] = [wiki('Hinata_Shoyo')]
+        self.engines.results[self.searches[4]] = [wiki('Karasuno_High')]
+        self.assertEqual(self.search(), [wiki('The_End_and_the_Beginning'), wiki('Episode_1')])
+
+    def test_no_search_starts_after_a_hit(self):
+        self.engines.results[self.searches[0]] = [wiki('Episode_1')]
+        for url in self.searches[1:]:
+            self.engines.delays[url] = 0.2
+        self.assertEqual(self.search(), [wiki('Episode_1')])
+        # Only the first batch of probes was started before the top-ranked search answered
+        self.assertLessEqual(len(self.engines.fetched), PROBE_WORKERS)
+        self.assertNotIn(self.searches[-1], self.engines.fetched)
+
+    def test_result_lists_and_guide_pages_are_filtered(self):
+        self.engines.results[self.searches[0]] = [
+            wiki('Episode_Guide'), wiki('Episode_1'), wiki('Episode_1'), 'https://naruto.fandom.com/wiki/Episode_1',
+            wiki('Category:Episodes')]
+        self.assertEqual(self.search(), [wiki('Episode_1')])
+
+    def test_nothing_found(self):
+        self.engines.status[self.searches[0]] = 429
+        self.assertEqual(self.search(), [])
+        self.assertEqual(sorted(self.engines.fetched), sorted(self.searches))
+
+    def test_results_are_cached_per_search(self):
+        self.engines.results[self.searches[0]] = [wiki('Episode_1')]
+        self.search()
+        self.engines.fetched.clear()
+
+        self.assertEqual(self.search(), [wiki('Episode_1')])
+        self.assertEqual(self.engines.fetched, [])
+
+    def test_failed_searches_are_not_cached(self):
+        self.engines.status[self.searches[0]] = 503
+        self.assertEqual(EScraper.search_result_urls('Google', self.searches[0], SUBDOMAIN), [])
+        self.assertIsNone(EScraper.serp_cache.get(self.searches[0]))
+
+        # A search that found nothing is, so the miss is not repeated
+        self.assertEqual(EScraper.search_result_urls('DuckDuckGo', self.searches[1], SUBDOMAIN), [])
+        self.assertEqual(EScraper.serp_cache.get(self.searches[1]), [])
+
+    def test_rate_limited_engine_is_skipped(self):
+        self.buckets['Google'] = TokenBucket(rate=0.01, burst=1)
+        with mock.patch.object(EScraper, 'SEARCH_MAX_WAIT', 0.5):
+            self.assertEqual(EScraper.search_result_urls('Google', self.searches[0], SUBDOMAIN), [])
+            self.assertEqual(EScraper.search_result_urls('Google', self.searches[2], SUBDOMAIN), [])
+            # DuckDuckGo has its own bucket
+            self.assertEqual(EScraper.search_result_urls('DuckDuckGo', self.searches[1], SUBDOMAIN), [])
+        self.assertEqual(self.engines.fetched, [self.searches[0], self.searches[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
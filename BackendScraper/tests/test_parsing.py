@@ -0,0 +1,106 @@
+"""
+Parser parity: every installed BeautifulSoup backend, with and without the strainers,
+must read the same title, heading, chapters and wiki header from a page as a full
+html.parser parse did before parsing.make_soup existed.
+
+The pages under tests/pages reproduce fandom markup, including the malformed parts
+parsers disagree on. Pages recorded with bench/record_fixtures.py can be checked too:
+
+    SCRAPER_PARSER_CORPUS=bench/recorded python -m unittest discover -s tests
+"""
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsing  # noqa: E402
+from EScraper import extract_chapter_info  # noqa: E402
+from parsing import EPISODE_PAGE_STRAINER, WIKI_HEADER_STRAINER, available_parsers, make_soup  # noqa: E402
+
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def corpus():
+    directories = [PAGES_DIR]
+    if os.environ.get('SCRAPER_PARSER_CORPUS'):
+        directories.append(os.environ['SCRAPER_PARSER_CORPUS'])
+    pages = {}
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if name.endswith(('.html', '.htm')):
+                    path = os.path.join(root, name)
+                    with open(path, encoding='utf-8', errors='replace') as f:
+                        pages[os.path.relpath(path, directory)] = f.read()
+    return pages
+
+
+def episode_fields(html, parser, strained):
+    """What episode validation and /get-episode-content read from a page"""
+    soup = make_soup(html, EPISODE_PAGE_STRAINER if strained else None, parser=parser)
+    with contextlib.redirect_stdout(io.StringIO()):
+        chapters = extract_chapter_info(soup)
+    title = soup.title.get_text() if soup.title else ''
+    heading = soup.find('h1').get_text() if soup.find('h1') else ''
+    return title, heading, chapters
+
+
+def wiki_header(html, parser, strained):
+    """What has_wiki_structure reads from a wiki page"""
+    soup = make_soup(html, WIKI_HEADER_STRAINER if strained else None, parser=parser)
+    wrapper = soup.find('div', class_='page-header__title-wrapper')
+    return wrapper.get_text(strip=True) if wrapper else None
+
+
+class ParserParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pages = corpus()
+        cls.expected = {name: (episode_fields(html, 'html.parser', False), wiki_header(html, 'html.parser', False))
+                        for name, html in cls.pages.items()}
+
+    def assert_parity(self, parser):
+        for name, html in self.pages.items():
+            expected_fields, expected_header = self.expected[name]
+            for strained in (False, True):
+                with self.subTest(page=name, parser=parser, strained=strained):
+                    self.assertEqual(episode_fields(html, parser, strained), expected_fields)
+                    self.assertEqual(wiki_header(html, parser, strained), expected_header)
+
+    def test_corpus(self):
+        self.assertGreaterEqual(len(self.pages), 6)
+        self.assertEqual(self.expected['infobox_links.html'][0],
+                         ('The End and the Beginning | Haikyu!! Wiki | Fandom', '\nThe End and the Beginning\n', ['1', '2']))
+
+    def test_strained_html_parser(self):
+        self.assert_parity('html.parser')
+
+    @unittest.skipUnless('lxml' in available_parsers(), "lxml is not installed")
+    def test_lxml(self):
+        self.assert_parity('lxml')
+
+    @unittest.skipUnless('html5lib' in available_parsers(), "html5lib is not installed")
+    def test_html5lib(self):
+        self.assert_parity('html5lib')
+
+
+class ResolveParserTest(unittest.TestCase):
+    def test_auto_prefers_lxml(self):
+        with mock.patch.object(parsing, 'available_parsers', return_value=['lxml', 'html.parser']):
+            self.assertEqual(parsing._resolve_parser('auto'), 'lxml')
+        with mock.patch.object(parsing, 'available_parsers', return_value=['html.parser']):
+            self.assertEqual(parsing._resolve_parser('auto'), 'html.parser')
+
+    def test_missing_parser_falls_back_to_html_parser(self):
+        with mock.patch.object(parsing, 'available_parsers', return_value=['html.parser']), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(parsing._resolve_parser('lxml'), 'html.parser')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+TokenBucket refill and waits, on a fake clock.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rateLimit  # noqa: E402
+from rateLimit import TokenBucket, engine_bucket  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rateLimit, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+        # Each further token is reserved behind the previous one
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+
+    def test_refills_at_rate_up_to_burst(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        for _ in range(3):
+            bucket.reserve()
+
+        self.clock.now += 0.5
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+        # A long idle period refills no more than the burst
+        self.clock.now += 60
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+    def test_wait_beyond_max_wait_takes_no_token(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        self.assertEqual(bucket.reserve(max_wait=0.5), 0.0)
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+
+        # The refused reservations did not push the next token further out
+        self.clock.now += 0.6
+        self.assertAlmostEqual(bucket.reserve(max_wait=0.5), 0.4)
+
+    def test_engine_buckets_are_per_engine(self):
+        with mock.patch.dict(rateLimit._buckets, clear=True):
+            self.assertIs(engine_bucket('Google'), engine_bucket('Google'))
+            self.assertIsNot(engine_bucket('Google'), engine_bucket('DuckDuckGo'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Episode title matching on real title pairs: containment, TitleIndex.search and
+EScraper.evaluate_episode_page. The rejected pairs share a fragment of the title, which
+the substring check these replaced was enough to accept.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import EScraper  # noqa: E402
+from titleIndex import TITLE_CONTAINMENT_THRESHOLD, TITLE_MATCH_THRESHOLD, TitleIndex, containment  # noqa: E402
+
+
+def page_text(title, wiki, url):
+    """The title, heading and URL text evaluate_episode_page scores a title against"""
+    return f"{title.lower()} | {wiki.lower()} | fandom {title.lower()} {url}"
+
+
+def episode_page(title, wiki, chapters=('1',)):
+    chapter_links = ', '.join(f'<a href="/wiki/Chapter_{chapter}">Chapter {chapter}</a>' for chapter in chapters)
+    return (
+        f'<html><head><title>{title} | {wiki} | Fandom</title></head><body>'
+        f'<h1 class="page-header__title">{title}</h1>'
+        f'<aside class="portable-infobox"><div class="pi-item pi-data">'
+        f'<h3 class="pi-data-label">Manga Chapters</h3><div class="pi-data-value">{chapter_links}</div>'
+        f'</div></aside></body></html>'
+    )
+
+
+class ContainmentTest(unittest.TestCase):
+    def test_accepts_the_episode_page(self):
+        pairs = [
+            ("The Boy in the Iceberg",
+             page_text("The Boy in the Iceberg", "Avatar Wiki", "https://avatar.fandom.com/wiki/The_Boy_in_the_Iceberg")),
+            ("To You, in 2000 Years: The Fall of Shiganshina, Part 1",
+             page_text("To You, in 2000 Years: The Fall of Shiganshina, Part 1", "Attack on Titan Wiki",
+                       "https://attackontitan.fandom.com/wiki/To_You,_in_2000_Years")),
+            # The page is named by number; the title only appears in the heading
+            ("I'm Luffy! The Man Who's Gonna Be King of the Pirates!",
+             "episode 1 | one piece wiki | fandom i'm luffy! the man who's gonna be king of the pirates! "
+             "https://onepiece.fandom.com/wiki/Episode_1"),
+            # Only the URL names it
+            ("The Boy in the Iceberg", "https://avatar.fandom.com/wiki/The_Boy_in_the_Iceberg"),
+        ]
+        for title, text in pairs:
+            with self.subTest(title=title):
+                self.assertGreaterEqual(containment(title, text), TITLE_CONTAINMENT_THRESHOLD)
+
+    def test_rejects_pages_sharing_a_fragment(self):
+        pairs = [
+            # Character page named after part of the episode title
+            ("Ryomen Sukuna", page_text("Sukuna", "Jujutsu Kaisen Wiki", "https://jujutsu-kaisen.fandom.com/wiki/Sukuna")),
+            ("The Hashira Meeting", page_text("Hashira", "Demon Slayer Wiki", "https://kimetsu-no-yaiba.fandom.com/wiki/Hashira")),
+            ("Sasuke and Sakura: Friends or Foes?",
+             page_text("Sakura's Decision", "Narutopedia", "https://naruto.fandom.com/wiki/Sakura%27s_Decision")),
+            # Romanised title against an English page that shares only "no"
+            ("Shingeki no Kyojin",
+             page_text("Attack on Titan: No Regrets", "Attack on Titan Wiki", "https://attackontitan.fandom.com/wiki/No_Regrets")),
+            # English title against the romanised page of the series
+            ("Kaguya Wants to Be Confessed To",
+             page_text("Kaguya-sama wa Kokurasetai", "Kaguya-sama: Love is War Wiki",
+                       "https://kaguyasama-wa-kokurasetai.fandom.com/wiki/Kaguya-sama_wa_Kokurasetai")),
+            ("Cruelty", page_text("Zankoku", "Demon Slayer Wiki", "https://kimetsu-no-yaiba.fandom.com/wiki/Zankoku")),
+        ]
+        for title, text in pairs:
+            with self.subTest(title=title):
+                self.assertLess(containment(title, text), TITLE_CONTAINMENT_THRESHOLD)
+
+    def test_numbers_must_match(self):
+        title = "To You, in 2000 Years: The Fall of Shiganshina, Part 1"
+        text = page_text("To You, in 2000 Years: The Fall of Shiganshina, Part 2", "Attack on Titan Wiki",
+                         "https://attackontitan.fandom.com/wiki/The_Fall_of_Shiganshina,_Part_2")
+        self.assertEqual(containment(title, text), 0.0)
+
+
+class TitleIndexSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TitleIndex([
+            ("Episode 3", "https://onepiece.fandom.com/wiki/Episode_3"),
+            ("Episode 31", "https://onepiece.fandom.com/wiki/Episode_31"),
+            ("Romance Dawn", "https://onepiece.fandom.com/wiki/Romance_Dawn"),
+            ("I'm Luffy! The Man Who's Gonna Be King of the Pirates!", "https://onepiece.fandom.com/wiki/Episode_1"),
+            ("Enter the Great Swordsman! Pirate Hunter Roronoa Zoro!", "https://onepiece.fandom.com/wiki/Episode_2"),
+            ("Roronoa Zoro", "https://onepiece.fandom.com/wiki/Roronoa_Zoro"),
+            ("Pirate Hunter", "https://onepiece.fandom.com/wiki/Pirate_Hunter"),
+        ])
+
+    def urls(self, query):
+        return [url for _, _, url in self.index.search(query)]
+
+    def test_finds_the_episode_despite_punctuation(self):
+        self.assertEqual(self.urls("Enter the Great Swordsman: Pirate Hunter Roronoa Zoro"),
+                         ["https://onepiece.fandom.com/wiki/Episode_2"])
+
+    def test_finds_the_episode_under_another_translation(self):
+        # The 4Kids/Funimation title of the episode the wiki lists under its subbed title
+        matches = self.index.search("I'm Luffy! The Man Who Will Become the Pirate King!")
+        self.assertEqual([url for _, _, url in matches], ["https://onepiece.fandom.com/wiki/Episode_1"])
+        self.assertGreaterEqual(matches[0][0], TITLE_MATCH_THRESHOLD)
+
+    def test_fragments_are_not_offered(self):
+        # Every one of these titles contains "zoro"; the character page is the only close match
+        self.assertEqual(self.urls("Roronoa Zoro"), ["https://onepiece.fandom.com/wiki/Roronoa_Zoro"])
+        self.assertEqual(self.urls("Zoro"), [])
+
+    def test_numbers_must_match(self):
+        self.assertEqual(self.urls("Episode 3"), ["https://onepiece.fandom.com/wiki/Episode_3"])
+        self.assertEqual(self.urls("Episode 4"), [])
+
+
+class EvaluateEpisodePageTest(unittest.TestCase):
+    def test_accepts_the_episode_page(self):
+        url = "https://avatar.fandom.com/wiki/The_Boy_in_the_Iceberg"
+        result, matched = EScraper.evaluate_episode_page(
+            url, episode_page("The Boy in the Iceberg", "Avatar Wiki", ('1', '2')), "The Boy in the Iceberg")
+        self.assertTrue(matched)
+        self.assertEqual(result, {"url": url, "chapters": ['1', '2']})
+
+    def test_accepts_by_number(self):
+        url = "https://onepiece.fandom.com/wiki/Episode_1"
+        result, matched = EScraper.evaluate_episode_page(
+            url, episode_page("Episode 1", "One Piece Wiki"), "Romance Dawn", "1")
+        self.assertTrue(matched)
+        self.assertEqual(result['chapters'], ['1'])
+
+    def test_rejects_a_page_sharing_a_fragment(self):
+        url = "https://jujutsu-kaisen.fandom.com/wiki/Sukuna"
+        result, matched = EScraper.evaluate_episode_page(
+            url, episode_page("Sukuna", "Jujutsu Kaisen Wiki"), "Ryomen Sukuna")
+        self.assertFalse(matched)
+        self.assertIsNone(result)
+
+    def test_rejects_a_romanised_page_of_the_series(self):
+        url = "https://kimetsu-no-yaiba.fandom.com/wiki/Kimetsu_no_Yaiba"
+        result, matched = EScraper.evaluate_episode_page(
+            url, episode_page("Kimetsu no Yaiba", "Demon Slayer Wiki"), "Kimetsu no Yaiba: Cruelty")
+        self.assertFalse(matched)
+
+    def test_episode_without_chapters_is_matched_but_not_accepted(self):
+        html = ('<html><head><title>The Boy in the Iceberg | Avatar Wiki | Fandom</title></head>'
+                '<body><h1>The Boy in the Iceberg</h1></body></html>')
+        result, matched = EScraper.evaluate_episode_page(
+            "https://avatar.fandom.com/wiki/The_Boy_in_the_Iceberg", html, "The Boy in the Iceberg")
+        self.assertTrue(matched)
+        self.assertIsNone(result)
+
+    def test_rejects_list_pages(self):
+        url = "https://onepiece.fandom.com/wiki/Episode_Guide"
+        result, matched = EScraper.evaluate_episode_page(
+            url, episode_page("Episode Guide", "One Piece Wiki"), "Romance Dawn", "1")
+        self.assertFalse(matched)
+        self.assertIsNone(result)
+
+
+if __name__ == '__main__':
+    unittest.main()
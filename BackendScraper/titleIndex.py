@@ -0,0 +1,103 @@
+import os
+from collections import Counter, defaultdict
+
+from cache import normalize_key
+
+
+# Candidate links or pages less similar than this to the episode title are not worth a validation fetch
+TITLE_MATCH_THRESHOLD = float(os.environ.get('SCRAPER_TITLE_MATCH_THRESHOLD', 0.6))
+
+# A fetched page confirms the episode title when its title, heading and URL contain this share of the title's trigrams
+TITLE_CONTAINMENT_THRESHOLD = float(os.environ.get('SCRAPER_TITLE_CONTAINMENT_THRESHOLD', 0.8))
+
+
+def normalize_title(text):
+    """normalize_key for titles that may come from URLs, where underscores stand for spaces"""
+    return normalize_key(str(text or '').replace('_', ' '))
+
+
+def trigrams(text):
+    """Character trigrams of each word of a normalized title, padded so short words still count"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def numbers(text):
+    """The numbers in a normalized title; "Episode 3" and "Episode 31" differ by one trigram but never match"""
+    return {word for word in text.split() if word.isdigit()}
+
+
+def containment(title, text):
+    """
+    Share of title's trigrams found in text, from 0 to 1: how fully text mentions title.
+    0 when text lacks one of the numbers in title.
+    """
+    title = normalize_title(title)
+    text = normalize_title(text)
+    grams = trigrams(title)
+    if not grams or not numbers(title) <= numbers(text):
+        return 0.0
+    return len(grams & trigrams(text)) / len(grams)
+
+
+class TitleIndex:
+    """
+    Trigram index of page titles, each pointing at a URL.
+
+    search() only scores the titles that share a trigram with the query, found through the
+    posting lists, and ranks them by Dice similarity, so matching an episode title against
+    every link or page of a wiki costs one pass over the query's postings. Titles missing a
+    number the query has are never returned.
+    """
+
+    def __init__(self, entries=()):
+        self._entries = []
+        self._postings = defaultdict(list)
+        for title, url in entries:
+            self.add(title, url)
+
+    def add(self, title, url):
+        normalized = normalize_title(title)
+        grams = trigrams(normalized)
+        if not grams:
+            return
+        entry_id = len(self._entries)
+        self._entries.append((normalized, url, len(grams), numbers(normalized)))
+        for gram in grams:
+            self._postings[gram].append(entry_id)
+
+    def search(self, query, limit=5, threshold=TITLE_MATCH_THRESHOLD):
+        """Return up to limit (score, title, url) at least threshold similar to query, best first, one per URL"""
+        query = normalize_title(query)
+        query_grams = trigrams(query)
+        query_numbers = numbers(query)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for entry_id, count in shared.items():
+            title, url, gram_count, title_numbers = self._entries[entry_id]
+            score = 2 * count / (len(query_grams) + gram_count)
+            if score >= threshold and query_numbers <= title_numbers:
+                scored.append((score, title, url))
+        scored.sort(key=lambda match: (-match[0], match[1]))
+
+        matches = []
+        seen = set()
+        for match in scored:
+            if match[2] not in seen:
+                seen.add(match[2])
+                matches.append(match)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def __len__(self):
+        return len(self._entries)